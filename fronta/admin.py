@@ -0,0 +1,27 @@
+from django.contrib import admin
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from .models import Uloha
+
+
+@admin.register(Uloha)
+class UlohaAdmin(admin.ModelAdmin):
+    list_display = ('nazev', 'stav', 'pokusy', 'spustit_po', 'datum_vytvoreni', 'datum_dokonceni')
+    list_filter = ('stav', 'nazev')
+    search_fields = ('nazev', 'klic')
+    readonly_fields = ('datum_vytvoreni', 'datum_dokonceni', 'zamceno_do', 'posledni_chyba')
+    actions = ['spustit_znovu']
+
+    @admin.action(description='Spustit znovu')
+    def spustit_znovu(self, request, queryset):
+        pocet = 0
+        for uloha in queryset.exclude(stav=Uloha.BEZI):
+            try:
+                with transaction.atomic():
+                    pocet += Uloha.objects.filter(pk=uloha.pk).exclude(stav=Uloha.BEZI).update(
+                        stav=Uloha.CEKA, pokusy=0, spustit_po=timezone.now(), zamceno_do=None,
+                    )
+            except IntegrityError:
+                # Úloha se stejným klíčem už čeká
+                pass
+        self.message_user(request, f'Znovu zařazeno úloh: {pocet}.')
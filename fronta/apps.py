@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class FrontaConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'fronta'
+    verbose_name = 'Fronta úloh'
+
+    def ready(self):
+        # Úlohy se registrují v modulech <aplikace>/ulohy.py
+        autodiscover_modules('ulohy')
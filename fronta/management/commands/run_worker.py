@@ -0,0 +1,69 @@
+import logging
+import signal
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections, connections
+
+from fronta.worker import smazat_stare_hotove, vykonat, zabrat
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        'Spustí worker, který zpracovává úlohy z fronty. Každé vlákno si samo '
+        'zabírá úlohy z databáze, takže lze spustit víc workerů souběžně.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=settings.FRONTA_WORKERS, help='Počet vláken zpracovávajících úlohy.')
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Prodleva v sekundách, když je fronta prázdná.')
+        parser.add_argument('--lock-timeout', type=int, default=600, help='Po kolika sekundách bez prodloužení zámku může úlohu převzít jiný worker.')
+        parser.add_argument('--burst', action='store_true', help='Skončit, jakmile je fronta prázdná.')
+
+    def handle(self, *args, **options):
+        self.zastavit = threading.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, self._zastavit)
+
+        smazano = smazat_stare_hotove(timedelta(days=settings.FRONTA_UCHOVAT_HOTOVE_DNI))
+        if smazano:
+            self.stdout.write(f'Smazáno {smazano} starých dokončených úloh.')
+
+        vlakna = [
+            threading.Thread(target=self._smycka, args=(options,), name=f'fronta-{i}')
+            for i in range(options['concurrency'])
+        ]
+        for vlakno in vlakna:
+            vlakno.start()
+        self.stdout.write(f"Worker běží ({options['concurrency']} vláken).")
+        for vlakno in vlakna:
+            vlakno.join()
+        self.stdout.write('Worker ukončen.')
+
+    def _zastavit(self, signum, frame):
+        self.stdout.write('Dokončuji rozpracované úlohy...')
+        self.zastavit.set()
+
+    def _smycka(self, options):
+        doba_zamku = timedelta(seconds=options['lock_timeout'])
+        try:
+            while not self.zastavit.is_set():
+                close_old_connections()
+                try:
+                    uloha = zabrat(doba_zamku)
+                except DatabaseError:
+                    logger.exception('Nepodařilo se zabrat úlohu')
+                    self.zastavit.wait(options['poll_interval'])
+                    continue
+                if uloha is None:
+                    if options['burst']:
+                        return
+                    self.zastavit.wait(options['poll_interval'])
+                    continue
+                vykonat(uloha, doba_zamku)
+        finally:
+            connections.close_all()
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:47
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Uloha',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nazev', models.CharField(max_length=100, verbose_name='Úloha')),
+                ('parametry', models.JSONField(blank=True, default=dict)),
+                ('klic', models.CharField(blank=True, db_index=True, help_text='Čekající úlohy se stejným klíčem se nezařazují znovu', max_length=200)),
+                ('stav', models.CharField(choices=[('ceka', 'Čeká'), ('bezi', 'Běží'), ('hotovo', 'Hotovo'), ('chyba', 'Chyba')], default='ceka', max_length=10)),
+                ('pokusy', models.PositiveIntegerField(default=0)),
+                ('max_pokusu', models.PositiveIntegerField(default=5, verbose_name='Max. pokusů')),
+                ('spustit_po', models.DateTimeField(default=django.utils.timezone.now)),
+                ('zamceno_do', models.DateTimeField(blank=True, help_text='Po vypršení může úlohu převzít jiný worker', null=True)),
+                ('posledni_chyba', models.TextField(blank=True)),
+                ('datum_vytvoreni', models.DateTimeField(auto_now_add=True)),
+                ('datum_dokonceni', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Úloha',
+                'verbose_name_plural': 'Úlohy',
+                'indexes': [models.Index(fields=['stav', 'spustit_po'], name='uloha_stav_spustit_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fronta', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='uloha',
+            name='klic',
+            field=models.CharField(blank=True, db_index=True, help_text='Úlohy se stejným klíčem se nezařazují znovu, dokud jiná čeká nebo běží', max_length=200),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:49
+
+from django.db import migrations, models
+
+
+def odstranit_duplicitni_cekajici(apps, schema_editor):
+    # Z čekajících úloh se stejným klíčem ponechá nejstarší, ostatní by udělaly totéž
+    Uloha = apps.get_model('fronta', 'Uloha')
+    cekajici = Uloha.objects.filter(stav='ceka').exclude(klic='')
+    duplicitni = cekajici.values('klic').annotate(pocet=models.Count('pk')).filter(pocet__gt=1)
+    for radek in duplicitni:
+        nejstarsi = cekajici.filter(klic=radek['klic']).order_by('pk').first()
+        cekajici.filter(klic=radek['klic']).exclude(pk=nejstarsi.pk).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fronta', '0002_klic_i_bezici'),
+    ]
+
+    operations = [
+        migrations.RunPython(odstranit_duplicitni_cekajici, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='uloha',
+            constraint=models.UniqueConstraint(condition=models.Q(('stav', 'ceka'), models.Q(('klic', ''), _negated=True)), fields=('klic',), name='uloha_klic_ceka_uniq'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Uloha(models.Model):
+    CEKA = 'ceka'
+    BEZI = 'bezi'
+    HOTOVO = 'hotovo'
+    CHYBA = 'chyba'
+
+    STAV_CHOICES = [
+        (CEKA, 'Čeká'),
+        (BEZI, 'Běží'),
+        (HOTOVO, 'Hotovo'),
+        (CHYBA, 'Chyba'),
+    ]
+
+    nazev = models.CharField(max_length=100, verbose_name="Úloha")
+    parametry = models.JSONField(default=dict, blank=True)
+    klic = models.CharField(max_length=200, blank=True, db_index=True, help_text="Úlohy se stejným klíčem se nezařazují znovu, dokud jiná čeká nebo běží")
+    stav = models.CharField(max_length=10, choices=STAV_CHOICES, default=CEKA)
+    pokusy = models.PositiveIntegerField(default=0)
+    max_pokusu = models.PositiveIntegerField(default=5, verbose_name="Max. pokusů")
+    spustit_po = models.DateTimeField(default=timezone.now)
+    zamceno_do = models.DateTimeField(null=True, blank=True, help_text="Po vypršení může úlohu převzít jiný worker")
+    posledni_chyba = models.TextField(blank=True)
+    datum_vytvoreni = models.DateTimeField(auto_now_add=True)
+    datum_dokonceni = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Úloha'
+        verbose_name_plural = 'Úlohy'
+        indexes = [
+            models.Index(fields=['stav', 'spustit_po'], name='uloha_stav_spustit_idx'),
+        ]
+        constraints = [
+            # Pojistka deduplikace v zaradit() proti souběžnému zařazení; běžící úlohy
+            # omezit nelze, čekající úloha se zabere i vedle běžící (i_pri_behu)
+            models.UniqueConstraint(
+                fields=['klic'],
+                condition=models.Q(stav='ceka') & ~models.Q(klic=''),
+                name='uloha_klic_ceka_uniq',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.nazev} #{self.pk} ({self.get_stav_display()})'
@@ -0,0 +1,66 @@
+"""
+Registrace a zařazování úloh.
+
+Úloha je obyčejná funkce s parametry serializovatelnými do JSON, označená
+dekorátorem @uloha v modulu <aplikace>/ulohy.py. Worker ji může spustit
+víckrát (po pádu nebo vypršení zámku), proto musí být idempotentní.
+"""
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+Definice = namedtuple('Definice', ['funkce', 'max_pokusu'])
+
+REGISTR = {}
+
+
+def uloha(nazev, max_pokusu=5):
+    def dekorator(funkce):
+        REGISTR[nazev] = Definice(funkce, max_pokusu)
+        return funkce
+    return dekorator
+
+
+def zaradit(nazev, *, klic='', zpozdeni=None, i_pri_behu=False, **parametry):
+    """
+    Zařadí úlohu do fronty a vrátí její záznam (nebo None, pokud se nezařadila).
+
+    Se zadaným `klic` se úloha nezařadí, pokud jiná se stejným klíčem čeká na
+    zpracování nebo právě běží; dvě čekající se stejným klíčem nepustí ani
+    databáze (uloha_klic_ceka_uniq). S `i_pri_behu` se zařadí i při běžící, což
+    potřebují úlohy zpracovávající frontu záznamů: běžící úloha už nemusí
+    vidět záznamy přidané po svém startu. Při FRONTA_SYNCHRONNE se úloha místo
+    zařazení spustí hned po potvrzení aktuální transakce (vývoj bez běžícího workeru).
+    """
+    from .models import Uloha
+
+    definice = REGISTR[nazev]
+    if settings.FRONTA_SYNCHRONNE:
+        transaction.on_commit(lambda: definice.funkce(**parametry))
+        return None
+    if klic:
+        stavy = [Uloha.CEKA] if i_pri_behu else [Uloha.CEKA, Uloha.BEZI]
+        if Uloha.objects.filter(klic=klic, stav__in=stavy).exists():
+            return None
+    try:
+        with transaction.atomic():
+            return Uloha.objects.create(
+                nazev=nazev,
+                parametry=parametry,
+                klic=klic,
+                max_pokusu=definice.max_pokusu,
+                spustit_po=timezone.now() + (zpozdeni or timedelta()),
+            )
+    except IntegrityError:
+        # Čekající úlohu se stejným klíčem mezitím zařadil souběžný požadavek
+        return None
+
+
+def posledni_uloha(klic):
+    """Naposledy zařazená úloha s klíčem `klic`, nebo None."""
+    from .models import Uloha
+
+    return Uloha.objects.filter(klic=klic).order_by('-pk').first()
@@ -0,0 +1,192 @@
+import threading
+from datetime import timedelta
+from unittest import mock
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models.query import QuerySet
+from django.test import TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.utils import timezone
+
+from . import worker
+from .models import Uloha
+from .registr import REGISTR, uloha, zaradit
+
+ZAMEK = timedelta(minutes=10)
+
+
+@uloha('fronta.test_ok')
+def _ok(**parametry):
+    pass
+
+
+@uloha('fronta.test_chyba', max_pokusu=2)
+def _chyba(**parametry):
+    raise ValueError('selhalo')
+
+
+def _pripravena(nazev='fronta.test_ok', **pole):
+    pole.setdefault('spustit_po', timezone.now() - timedelta(seconds=1))
+    return Uloha.objects.create(nazev=nazev, **pole)
+
+
+@override_settings(FRONTA_SYNCHRONNE=False)
+class ZaraditTest(TestCase):
+    def test_klic_nezaradi_dalsi_pri_cekajici_nebo_bezici(self):
+        prvni = zaradit('fronta.test_ok', klic='k')
+        self.assertIsNotNone(prvni)
+        self.assertIsNone(zaradit('fronta.test_ok', klic='k'))
+
+        Uloha.objects.filter(pk=prvni.pk).update(stav=Uloha.BEZI)
+        self.assertIsNone(zaradit('fronta.test_ok', klic='k'))
+        self.assertIsNotNone(zaradit('fronta.test_ok', klic='k', i_pri_behu=True))
+
+    def test_dokoncena_uloha_nebrani_zarazeni(self):
+        for stav in (Uloha.HOTOVO, Uloha.CHYBA):
+            Uloha.objects.filter(klic='k').delete()
+            _pripravena(klic='k', stav=stav)
+            self.assertIsNotNone(zaradit('fronta.test_ok', klic='k'))
+
+    def test_bez_klice_se_nededuplikuje(self):
+        zaradit('fronta.test_ok')
+        zaradit('fronta.test_ok')
+        self.assertEqual(Uloha.objects.count(), 2)
+
+    def test_soubezne_zarazeni_zastavi_databaze(self):
+        _pripravena(klic='k')
+        # Souběžný požadavek ještě čekající úlohu neviděl
+        with mock.patch.object(QuerySet, 'exists', return_value=False):
+            self.assertIsNone(zaradit('fronta.test_ok', klic='k'))
+        self.assertEqual(Uloha.objects.count(), 1)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            _pripravena(klic='k')
+
+
+class ZabratTest(TestCase):
+    def test_zabere_nejstarsi_pripravenou(self):
+        _pripravena(spustit_po=timezone.now() + timedelta(hours=1))
+        druha = _pripravena()
+        prvni = _pripravena()
+        Uloha.objects.filter(pk=prvni.pk).update(spustit_po=druha.spustit_po - timedelta(seconds=1))
+
+        zabrana = worker.zabrat(ZAMEK)
+        self.assertEqual(zabrana.pk, prvni.pk)
+        self.assertEqual((zabrana.stav, zabrana.pokusy), (Uloha.BEZI, 1))
+        self.assertEqual(worker.zabrat(ZAMEK).pk, druha.pk)
+        self.assertIsNone(worker.zabrat(ZAMEK))
+
+    def test_souperici_worker_ulohu_nedostane(self):
+        kandidat = _pripravena()
+        first = QuerySet.first
+
+        def predbehnout(queryset):
+            # Jiný worker zabere kandidáta mezi výběrem a podmíněným UPDATE
+            vysledek = first(queryset)
+            Uloha.objects.filter(pk=kandidat.pk).update(stav=Uloha.BEZI, zamceno_do=timezone.now() + ZAMEK, pokusy=1)
+            return vysledek
+
+        with mock.patch.object(QuerySet, 'first', predbehnout):
+            self.assertIsNone(worker.zabrat(ZAMEK))
+        self.assertEqual(Uloha.objects.get(pk=kandidat.pk).pokusy, 1)
+
+    def test_prosly_zamek_prevezme_jiny_worker(self):
+        _pripravena()
+        puvodni = worker.zabrat(ZAMEK)
+        self.assertIsNone(worker.zabrat(ZAMEK))
+
+        Uloha.objects.filter(pk=puvodni.pk).update(zamceno_do=timezone.now() - timedelta(seconds=1))
+        prevzata = worker.zabrat(ZAMEK)
+        self.assertEqual((prevzata.pk, prevzata.pokusy), (puvodni.pk, 2))
+
+        # Původní worker už nesmí prodloužit zámek ani zapsat výsledek
+        self.assertFalse(worker.prodlouzit_zamek(puvodni, ZAMEK))
+        self.assertFalse(worker.vykonat(puvodni, ZAMEK))
+        self.assertEqual(Uloha.objects.get(pk=puvodni.pk).stav, Uloha.BEZI)
+
+        self.assertTrue(worker.vykonat(prevzata, ZAMEK))
+        self.assertEqual(Uloha.objects.get(pk=puvodni.pk).stav, Uloha.HOTOVO)
+
+    def test_prodlouzeni_zamku(self):
+        _pripravena()
+        zabrana = worker.zabrat(timedelta(seconds=1))
+        self.assertTrue(worker.prodlouzit_zamek(zabrana, ZAMEK))
+        self.assertGreater(Uloha.objects.get(pk=zabrana.pk).zamceno_do, timezone.now() + ZAMEK - timedelta(minutes=1))
+
+
+class VykonatTest(TestCase):
+    def test_chyba_naplanuje_pokus_s_odkladem(self):
+        _pripravena('fronta.test_chyba', max_pokusu=2)
+        zabrana = worker.zabrat(ZAMEK)
+        pred = timezone.now()
+        self.assertFalse(worker.vykonat(zabrana, ZAMEK))
+
+        uloha = Uloha.objects.get(pk=zabrana.pk)
+        self.assertEqual(uloha.stav, Uloha.CEKA)
+        self.assertIsNone(uloha.zamceno_do)
+        self.assertIn('selhalo', uloha.posledni_chyba)
+        self.assertGreaterEqual(uloha.spustit_po, pred + worker.ZAKLADNI_ODKLAD * 0.5)
+        self.assertIsNone(worker.zabrat(ZAMEK))
+
+    @override_settings(FRONTA_SYNCHRONNE=False)
+    def test_chyba_pri_cekajici_se_stejnym_klicem_neopakuje(self):
+        _pripravena('fronta.test_chyba', klic='k')
+        zabrana = worker.zabrat(ZAMEK)
+        dalsi = zaradit('fronta.test_chyba', klic='k', i_pri_behu=True)
+        self.assertFalse(worker.vykonat(zabrana, ZAMEK))
+
+        self.assertEqual(Uloha.objects.get(pk=zabrana.pk).stav, Uloha.CHYBA)
+        self.assertEqual(Uloha.objects.get(pk=dalsi.pk).stav, Uloha.CEKA)
+
+    def test_posledni_pokus_skonci_chybou(self):
+        _pripravena('fronta.test_chyba', max_pokusu=2, pokusy=1)
+        self.assertFalse(worker.vykonat(worker.zabrat(ZAMEK), ZAMEK))
+        uloha = Uloha.objects.get()
+        self.assertEqual(uloha.stav, Uloha.CHYBA)
+        self.assertIsNotNone(uloha.datum_dokonceni)
+
+    def test_odklad_roste_do_limitu(self):
+        with mock.patch('fronta.worker.random.uniform', return_value=1):
+            odklady = [worker.odklad(pokus) for pokus in range(1, 20)]
+        self.assertEqual(odklady[:3], [worker.ZAKLADNI_ODKLAD, worker.ZAKLADNI_ODKLAD * 2, worker.ZAKLADNI_ODKLAD * 4])
+        self.assertEqual(odklady, sorted(odklady))
+        self.assertEqual(odklady[-1], worker.MAX_ODKLAD)
+        for pokus in range(1, 20):
+            self.assertLessEqual(worker.odklad(pokus), worker.MAX_ODKLAD * 1.5)
+
+    def test_zamek_se_prodluzuje_po_dobu_behu(self):
+        _pripravena('fronta.test_pomala')
+        zabrana = worker.zabrat(timedelta(seconds=3))
+        prodlouzeno = threading.Event()
+
+        def pomala():
+            prodlouzeno.wait(5)
+
+        with mock.patch.dict(REGISTR, {'fronta.test_pomala': REGISTR['fronta.test_ok']._replace(funkce=pomala)}), \
+                mock.patch.object(worker, 'prodlouzit_zamek', side_effect=lambda *a: prodlouzeno.set() or True) as prodlouzit:
+            self.assertTrue(worker.vykonat(zabrana, timedelta(seconds=0.3)))
+        self.assertTrue(prodlouzit.called)
+
+
+@skipUnlessDBFeature('has_select_for_update_skip_locked')
+class SkipLockedTest(TransactionTestCase):
+    def test_zamcenou_ulohu_preskoci(self):
+        prvni = _pripravena()
+        druha = _pripravena()
+        zamceno, konec = threading.Event(), threading.Event()
+
+        def drzet_zamek():
+            try:
+                with transaction.atomic():
+                    Uloha.objects.select_for_update().get(pk=prvni.pk)
+                    zamceno.set()
+                    konec.wait(5)
+            finally:
+                connection.close()
+
+        vlakno = threading.Thread(target=drzet_zamek)
+        vlakno.start()
+        try:
+            self.assertTrue(zamceno.wait(5))
+            self.assertEqual(worker.zabrat(ZAMEK).pk, druha.pk)
+        finally:
+            konec.set()
+            vlakno.join()
@@ -0,0 +1,133 @@
+"""Zabírání a spouštění úloh z fronty (používá příkaz run_worker)."""
+import logging
+import random
+import threading
+import traceback
+from contextlib import nullcontext
+from datetime import timedelta
+
+from django.db import DatabaseError, IntegrityError, connection, connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Uloha
+from .registr import REGISTR
+
+logger = logging.getLogger(__name__)
+
+ZAKLADNI_ODKLAD = timedelta(seconds=10)
+MAX_ODKLAD = timedelta(hours=1)
+
+
+def odklad(pokus):
+    """Exponenciální odklad dalšího pokusu s náhodným rozptylem ±50 %."""
+    zaklad = min(ZAKLADNI_ODKLAD * 2 ** (pokus - 1), MAX_ODKLAD)
+    return zaklad * random.uniform(0.5, 1.5)
+
+
+def _k_dispozici(ted):
+    # Běžící úloha s prošlým zámkem patří workeru, který mezitím spadl
+    return Q(stav=Uloha.CEKA, spustit_po__lte=ted) | Q(stav=Uloha.BEZI, zamceno_do__lt=ted)
+
+
+def zabrat(doba_zamku):
+    """
+    Zabere nejstarší úlohu připravenou ke spuštění, nebo vrátí None.
+
+    Na PostgreSQL se kandidát vybírá přes SELECT ... FOR UPDATE SKIP LOCKED,
+    takže souběžné workery na sebe nečekají. Databáze bez zámků řádků
+    (SQLite) spoléhají jen na podmíněný UPDATE, který úlohu přidělí jedinému workeru.
+    """
+    ted = timezone.now()
+    zamky = connection.features.has_select_for_update_skip_locked
+    # Bez zámků řádků transakci neotevíráme: SQLite by při povýšení zámku
+    # ze čtení na zápis souběžné workery rovnou odmítl
+    with transaction.atomic() if zamky else nullcontext():
+        kandidati = Uloha.objects.filter(_k_dispozici(ted)).order_by('spustit_po', 'pk')
+        if zamky:
+            kandidati = kandidati.select_for_update(skip_locked=True)
+        uloha = kandidati.first()
+        if uloha is None:
+            return None
+        zabrano = Uloha.objects.filter(_k_dispozici(ted), pk=uloha.pk).update(
+            stav=Uloha.BEZI,
+            zamceno_do=ted + doba_zamku,
+            pokusy=F('pokusy') + 1,
+        )
+    if not zabrano:
+        return None
+    uloha.refresh_from_db()
+    return uloha
+
+
+def _zabrana(uloha):
+    # Počet pokusů slouží jako token zabrání: po převzetí jiným workerem se zvýší
+    return Uloha.objects.filter(pk=uloha.pk, stav=Uloha.BEZI, pokusy=uloha.pokusy)
+
+
+def prodlouzit_zamek(uloha, doba_zamku):
+    """Prodlouží zámek běžící úlohy; vrátí False, pokud ji mezitím převzal jiný worker."""
+    return bool(_zabrana(uloha).update(zamceno_do=timezone.now() + doba_zamku))
+
+
+def _udrzovat_zamek(uloha, doba_zamku, hotovo):
+    try:
+        while not hotovo.wait(doba_zamku.total_seconds() / 3):
+            try:
+                if not prodlouzit_zamek(uloha, doba_zamku):
+                    logger.warning('Úlohu %s mezitím převzal jiný worker', uloha)
+                    return
+            except DatabaseError:
+                logger.exception('Nepodařilo se prodloužit zámek úlohy %s', uloha)
+    finally:
+        connections.close_all()
+
+
+def vykonat(uloha, doba_zamku):
+    """
+    Spustí zabranou úlohu a zapíše výsledek; při chybě ji naplánuje znovu s odkladem.
+
+    Po dobu běhu vedlejší vlákno prodlužuje zámek, takže dlouhá úloha nepropadne
+    jinému workeru. Výsledek se zapíše, jen pokud úlohu mezitím nikdo nepřevzal.
+    """
+    ted = timezone.now()
+    hotovo = threading.Event()
+    threading.Thread(
+        target=_udrzovat_zamek, args=(uloha, doba_zamku, hotovo), name=f'zamek-{uloha.pk}', daemon=True,
+    ).start()
+    try:
+        if uloha.pokusy > uloha.max_pokusu:
+            raise RuntimeError('Úloha vyčerpala pokusy (worker opakovaně nedoběhl).')
+        definice = REGISTR.get(uloha.nazev)
+        if definice is None:
+            raise LookupError(f'Neznámá úloha {uloha.nazev}.')
+        definice.funkce(**uloha.parametry)
+    except Exception:
+        chyba = traceback.format_exc()
+        logger.exception('Úloha %s selhala (pokus %s/%s)', uloha, uloha.pokusy, uloha.max_pokusu)
+        konec = {'stav': Uloha.CHYBA, 'datum_dokonceni': timezone.now()}
+        if uloha.pokusy >= uloha.max_pokusu:
+            zmeny = konec
+        else:
+            zmeny = {'stav': Uloha.CEKA, 'spustit_po': timezone.now() + odklad(uloha.pokusy)}
+        try:
+            with transaction.atomic():
+                zapsano = _zabrana(uloha).update(zamceno_do=None, posledni_chyba=chyba, **zmeny)
+        except IntegrityError:
+            # Se stejným klíčem už čeká jiná úloha, opakování by udělalo totéž
+            zapsano = _zabrana(uloha).update(zamceno_do=None, posledni_chyba=chyba, **konec)
+        if not zapsano:
+            logger.warning('Výsledek úlohy %s se nezapsal, převzal ji jiný worker', uloha)
+        return False
+    finally:
+        hotovo.set()
+
+    if not _zabrana(uloha).update(stav=Uloha.HOTOVO, zamceno_do=None, datum_dokonceni=timezone.now()):
+        logger.warning('Výsledek úlohy %s se nezapsal, převzal ji jiný worker', uloha)
+        return False
+    logger.info('Úloha %s hotova za %.2f s', uloha, (timezone.now() - ted).total_seconds())
+    return True
+
+
+def smazat_stare_hotove(uchovat):
+    return Uloha.objects.filter(stav=Uloha.HOTOVO, datum_dokonceni__lt=timezone.now() - uchovat).delete()[0]
@@ -1,26 +1,200 @@
 # -*- coding: utf-8 -*-
+from datetime import datetime
+
+from django import forms
 from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.db import models
+from django.utils import timezone
 from .models import Preprava, Partner, Dokument, Holiday
+from .pagination import OdhadovanyPaginator
+
+
+class AutocompleteFilter(admin.FieldListFilter):
+    """
+    Filtr podle cizího klíče s našeptávačem (autocomplete adminu) místo
+    seznamu všech záznamů v postranním panelu. Cílový model musí mít v adminu
+    search_fields; ModelAdmin musí dědit z AutocompleteFiltryMixin kvůli JS.
+    """
+
+    template = 'admin/logistika/autocomplete_filtr.html'
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.lookup_kwarg = f'{field_path}__{field.target_field.name}__exact'
+        self.lookup_val = params.get(self.lookup_kwarg)
+        super().__init__(field, request, params, model, model_admin, field_path)
+        self.pole = field.formfield(widget=AutocompleteSelect(field, model_admin.admin_site), required=False)
+
+    def expected_parameters(self):
+        return [self.lookup_kwarg]
+
+    def has_output(self):
+        return True
+
+    def choices(self, changelist):
+        yield {
+            'selected': self.lookup_val is None,
+            'query_string': changelist.get_query_string(remove=[self.lookup_kwarg]),
+            'display': 'Vše',
+        }
+
+    def vykreslit(self):
+        # Vybraný záznam načte widget jedním dotazem podle pk
+        return self.pole.widget.render(self.lookup_kwarg, self.lookup_val, attrs={'id': f'filtr_{self.lookup_kwarg}'})
+
+
+class ObdobiFilter(admin.FieldListFilter):
+    """
+    Filtr podle roku a měsíce pro velké tabulky místo date_hierarchy.
+
+    date_hierarchy zjišťuje nabízené roky a měsíce přes SELECT DISTINCT nad
+    zkrácenými daty, tedy průchodem všech řádků v rozsahu. Tady se roky
+    odvodí jen z nejstaršího a nejnovějšího záznamu (dva dotazy na konce
+    indexu) a vybrané období se filtruje jako rozsah od–do.
+    """
+
+    MESICE = ['leden', 'únor', 'březen', 'duben', 'květen', 'červen',
+              'červenec', 'srpen', 'září', 'říjen', 'listopad', 'prosinec']
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.kwarg_rok = f'{field_path}__rok'
+        self.kwarg_mesic = f'{field_path}__mesic'
+        super().__init__(field, request, params, model, model_admin, field_path)
+        try:
+            self.rok = int(self.used_parameters[self.kwarg_rok]) if self.kwarg_rok in self.used_parameters else None
+            self.mesic = int(self.used_parameters[self.kwarg_mesic]) if self.rok and self.kwarg_mesic in self.used_parameters else None
+            if self.mesic is not None and not 1 <= self.mesic <= 12:
+                raise ValueError
+            if self.rok is not None:
+                self._zacatek(self.rok, 1)
+        except (TypeError, ValueError, OverflowError):
+            raise IncorrectLookupParameters('Neplatné období.')
+        self.model = model
+
+    def expected_parameters(self):
+        return [self.kwarg_rok, self.kwarg_mesic]
+
+    def has_output(self):
+        return True
+
+    def _zacatek(self, rok, mesic):
+        if mesic > 12:
+            rok, mesic = rok + 1, 1
+        zacatek = datetime(rok, mesic, 1)
+        if isinstance(self.field, models.DateTimeField):
+            return timezone.make_aware(zacatek)
+        return zacatek.date()
+
+    def _krajni(self, razeni):
+        return self.model._default_manager.order_by(razeni).values_list(self.field_path, flat=True).first()
+
+    def _rok_a_mesic(self, hodnota):
+        if isinstance(self.field, models.DateTimeField):
+            hodnota = timezone.localtime(hodnota)
+        return hodnota.year, hodnota.month
+
+    def queryset(self, request, queryset):
+        if self.rok is None:
+            return queryset
+        if self.mesic is None:
+            od, do = self._zacatek(self.rok, 1), self._zacatek(self.rok + 1, 1)
+        else:
+            od, do = self._zacatek(self.rok, self.mesic), self._zacatek(self.rok, self.mesic + 1)
+        return queryset.filter(**{f'{self.field_path}__gte': od, f'{self.field_path}__lt': do})
+
+    def choices(self, changelist):
+        yield {
+            'selected': self.rok is None,
+            'query_string': changelist.get_query_string(remove=[self.kwarg_rok, self.kwarg_mesic]),
+            'display': 'Vše',
+        }
+        nejstarsi, nejnovejsi = self._krajni(self.field_path), self._krajni(f'-{self.field_path}')
+        if nejstarsi is None:
+            return
+        (rok_od, mesic_od), (rok_do, mesic_do) = self._rok_a_mesic(nejstarsi), self._rok_a_mesic(nejnovejsi)
+        if self.rok is None:
+            for rok in range(rok_do, rok_od - 1, -1):
+                yield {
+                    'selected': False,
+                    'query_string': changelist.get_query_string({self.kwarg_rok: rok}, [self.kwarg_mesic]),
+                    'display': str(rok),
+                }
+            return
+        yield {
+            'selected': self.mesic is None,
+            'query_string': changelist.get_query_string({self.kwarg_rok: self.rok}, [self.kwarg_mesic]),
+            'display': f'Celý rok {self.rok}',
+        }
+        prvni = mesic_od if self.rok == rok_od else 1
+        posledni = mesic_do if self.rok == rok_do else 12
+        for mesic in range(prvni, posledni + 1):
+            yield {
+                'selected': self.mesic == mesic,
+                'query_string': changelist.get_query_string({self.kwarg_rok: self.rok, self.kwarg_mesic: mesic}),
+                'display': f'{self.MESICE[mesic - 1]} {self.rok}',
+            }
+
+
+class AutocompleteFiltryMixin:
+    @property
+    def media(self):
+        return super().media + AutocompleteSelect(None, self.admin_site).media + forms.Media(js=['js/admin_filtry.js'])
+
+
+class VelkaTabulkaAdmin(AutocompleteFiltryMixin, admin.ModelAdmin):
+    """Společné nastavení pro tabulky se statisíci řádků: odhad počtu místo COUNT(*)."""
+
+    paginator = OdhadovanyPaginator
+    # Jinak by se při filtrování navíc počítal celkový počet řádků tabulky
+    show_full_result_count = False
 
 @admin.register(Partner)
 class PartnerAdmin(admin.ModelAdmin):
-    list_display = ('nazev', 'ic', 'typ_partnera')
+    list_display = ('nazev', 'ic', 'typ_partnera', 'pocet_preprav_zakaznik', 'pocet_realizovanych_dopravce', 'posledni_preprava')
+    list_select_related = ('statistika',)
     search_fields = ('nazev', 'ic')
 
+    # Hodnoty z předpočítané StatistikaPartnera (logistika.statistiky_partneru)
+    def _statistika(self, obj, pole, vychozi=0):
+        statistika = getattr(obj, 'statistika', None)
+        return getattr(statistika, pole) if statistika else vychozi
+
+    @admin.display(description='Přeprav jako zákazník', ordering='statistika__pocet_preprav_zakaznik')
+    def pocet_preprav_zakaznik(self, obj):
+        return self._statistika(obj, 'pocet_preprav_zakaznik')
+
+    @admin.display(description='Realizováno jako dopravce', ordering='statistika__pocet_realizovanych_dopravce')
+    def pocet_realizovanych_dopravce(self, obj):
+        return self._statistika(obj, 'pocet_realizovanych_dopravce')
+
+    @admin.display(description='Poslední přeprava', ordering='statistika__posledni_preprava')
+    def posledni_preprava(self, obj):
+        return self._statistika(obj, 'posledni_preprava', None)
+
 @admin.register(Preprava)
-class PrepravaAdmin(admin.ModelAdmin):
+class PrepravaAdmin(VelkaTabulkaAdmin):
     list_display = ('referencni_cislo', 'zakaznik', 'dopravce', 'stav', 'datum_cas_nakladky')
+    list_select_related = ('zakaznik', 'dopravce')
     search_fields = ('referencni_cislo', 'zakaznik__nazev', 'dopravce__nazev')
-    list_filter = ('stav', 'typ_vozidla')
+    list_filter = (
+        'stav', 'typ_vozidla', ('zakaznik', AutocompleteFilter), ('dopravce', AutocompleteFilter),
+        ('datum_vytvoreni', ObdobiFilter),
+    )
     autocomplete_fields = ['zakaznik', 'dopravce']
+    # Konce rozsahu pro ObdobiFilter i řazení jdou přes index preprava_vytvoreni_id_idx
+    ordering = ('-datum_vytvoreni', '-id')
 
 
 @admin.register(Dokument)
-class DokumentAdmin(admin.ModelAdmin):
+class DokumentAdmin(VelkaTabulkaAdmin):
     list_display = ('nazev', 'get_preprava_info', 'datum_nahrani')
+    list_select_related = ('preprava__zakaznik',)
     search_fields = ('nazev', 'preprava__referencni_cislo', 'preprava__zakaznik__nazev')
-    list_filter = ('preprava',)
+    list_filter = (('preprava', AutocompleteFilter), ('datum_nahrani', ObdobiFilter))
     autocomplete_fields = ['preprava']
+    # Konce rozsahu pro ObdobiFilter i řazení jdou přes index dokument_nahrani_id_idx
+    ordering = ('-datum_nahrani', '-id')
 
     @admin.display(description='Přeprava', ordering='preprava')
     def get_preprava_info(self, obj):
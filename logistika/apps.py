@@ -5,3 +5,6 @@ class LogistikaConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'logistika'
     verbose_name = 'Logistika'
+
+    def ready(self):
+        from . import signals  # noqa: F401
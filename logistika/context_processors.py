@@ -1,12 +1,8 @@
-from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
 
-from .models import Holiday
+from .svatky import nadchazejici_svatky
 
 
 def upcoming_holidays(request):
-    today = timezone.now().date()
-    holidays = (
-        Holiday.objects.filter(date__gte=today)
-        .order_by("date")[:3]
-    )
-    return {"upcoming_holidays": holidays}
+    # Dotaz proběhne, jen pokud šablona svátky opravdu vykreslí
+    return {"upcoming_holidays": SimpleLazyObject(nadchazejici_svatky)}
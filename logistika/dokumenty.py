@@ -0,0 +1,250 @@
+"""
+Práce se soubory dokumentů přeprav v úložišti.
+
+Soubory jsou adresované obsahem: dokumenty se stejným SHA-256 sdílejí jeden
+ObsahDokumentu (a tedy jeden objekt v úložišti) s počtem odkazů. Soubor
+nahraný přes formulář se zahashuje ještě před uložením, takže se duplicita
+do úložiště vůbec nezapíše. Soubory nahrané jinudy (přímo do S3, v adminu)
+se deduplikují dodatečně úlohou logistika.deduplikovat_dokument.
+"""
+import hashlib
+import posixpath
+from contextlib import nullcontext
+from datetime import timedelta
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils.text import get_valid_filename
+
+from fronta.registr import zaradit
+
+from .models import Dokument, ObsahDokumentu, SouborKeSmazani
+from .obrazky import je_obrazek, zmensit
+
+VELIKOST_BLOKU = 1024 * 1024
+
+# S3 DeleteObjects přijme nejvýše 1000 klíčů
+DAVKA_MAZANI = 1000
+# Smazání se o chvíli odloží, aby se do jedné dávky sešlo víc souborů
+ODKLAD_MAZANI = timedelta(seconds=30)
+
+
+class ChybaMazani(Exception):
+    pass
+
+
+def _klic_v_bucketu(nazev):
+    return posixpath.join(default_storage.location, nazev) if default_storage.location else nazev
+
+
+def cist_po_blocich(soubor, velikost_bloku=VELIKOST_BLOKU):
+    """
+    Vrací obsah souboru z úložiště po blocích.
+
+    Z S3 se čte přímo tělo odpovědi GET, takže se soubor nestahuje celý
+    do dočasného souboru jako při FieldFile.open().
+    """
+    if hasattr(default_storage, 'bucket'):
+        telo = default_storage.bucket.Object(_klic_v_bucketu(soubor.name)).get()['Body']
+        try:
+            yield from telo.iter_chunks(velikost_bloku)
+        finally:
+            telo.close()
+        return
+    with default_storage.open(soubor.name, 'rb') as f:
+        while blok := f.read(velikost_bloku):
+            yield blok
+
+
+def _nazev_v_archivu(text, vychozi):
+    try:
+        return get_valid_filename(text)
+    except SuspiciousFileOperation:
+        return vychozi
+
+
+def soubory_do_archivu(dokumenty, slozka_podle_prepravy=False):
+    """
+    Z dokumentů vytvoří dvojice (název v archivu, bloky obsahu) pro zip_proud().
+
+    Název v archivu vychází z názvu dokumentu a přípony souboru; shodné názvy
+    se rozliší pořadovým číslem. S `slozka_podle_prepravy` se dokumenty
+    rozdělí do složek podle referenčního čísla přepravy.
+    """
+    pouzite = set()
+    for dokument in dokumenty:
+        pripona = posixpath.splitext(dokument.soubor.name)[1]
+        zaklad = _nazev_v_archivu(dokument.nazev, 'dokument')
+        if slozka_podle_prepravy:
+            zaklad = posixpath.join(_nazev_v_archivu(dokument.preprava.referencni_cislo, 'preprava'), zaklad)
+        nazev = f'{zaklad}{pripona}'
+        poradi = 1
+        while nazev in pouzite:
+            poradi += 1
+            nazev = f'{zaklad}_{poradi}{pripona}'
+        pouzite.add(nazev)
+        yield nazev, cist_po_blocich(dokument.soubor)
+
+
+def _pridat_odkaz(obsah, dokument):
+    ObsahDokumentu.objects.filter(pk=obsah.pk).update(pocet_odkazu=F('pocet_odkazu') + 1)
+    dokument.obsah = obsah
+    dokument.soubor = obsah.soubor.name
+
+
+def ulozit_dokument(dokument, soubor):
+    """
+    Uloží nový dokument s nahraným souborem (UploadedFile).
+
+    Pokud už úložiště obsahuje soubor se stejným obsahem, dokument na něj jen
+    odkáže a nic se nenahrává.
+    """
+    hash_ = hashlib.sha256()
+    for blok in soubor.chunks():
+        hash_.update(blok)
+    sha256 = hash_.hexdigest()
+
+    for _ in range(2):
+        with transaction.atomic():
+            obsah = ObsahDokumentu.objects.select_for_update().filter(sha256=sha256).first()
+            if obsah is not None:
+                _pridat_odkaz(obsah, dokument)
+                dokument.save()
+                return dokument
+        nazev = None
+        try:
+            with transaction.atomic():
+                pole = Dokument._meta.get_field('soubor')
+                nazev = default_storage.save(pole.generate_filename(dokument, soubor.name), soubor, max_length=pole.max_length)
+                obsah = ObsahDokumentu.objects.create(sha256=sha256, soubor=nazev, velikost=soubor.size)
+                _pridat_odkaz(obsah, dokument)
+                dokument.save()
+                return dokument
+        except IntegrityError:
+            # Stejný obsah mezitím uložil někdo jiný, příště ho najdeme
+            if nazev:
+                default_storage.delete(nazev)
+    raise RuntimeError(f'Obsah {sha256} se nepodařilo uložit.')
+
+
+def deduplikovat(dokument_pk):
+    """
+    Spočítá hash souboru dokumentu bez obsahu a připojí ho ke sdílenému obsahu.
+
+    Pokud stejný obsah už existuje, dokument se na něj přesměruje a jeho
+    vlastní kopie se z úložiště smaže.
+    """
+    dokument = Dokument.objects.filter(pk=dokument_pk, obsah__isnull=True).first()
+    if dokument is None:
+        return
+    hash_ = hashlib.sha256()
+    velikost = 0
+    for blok in cist_po_blocich(dokument.soubor):
+        hash_.update(blok)
+        velikost += len(blok)
+
+    with transaction.atomic():
+        # Dokument mohl být mezitím smazán nebo deduplikován
+        if not Dokument.objects.select_for_update().filter(pk=dokument.pk, obsah__isnull=True, soubor=dokument.soubor.name).exists():
+            return
+        obsah, _ = ObsahDokumentu.objects.select_for_update().get_or_create(
+            sha256=hash_.hexdigest(), defaults={'soubor': dokument.soubor.name, 'velikost': velikost},
+        )
+        puvodni = dokument.soubor.name
+        _pridat_odkaz(obsah, dokument)
+        Dokument.objects.filter(pk=dokument.pk).update(obsah=obsah, soubor=obsah.soubor.name)
+        if obsah.soubor.name != puvodni:
+            naplanovat_smazani([puvodni])
+
+
+def uvolnit_soubor(dokument):
+    """Po smazání dokumentu ubere odkaz na jeho obsah; poslední odkaz soubor z úložiště smaže."""
+    if dokument.obsah_id is None:
+        if dokument.soubor.name:
+            naplanovat_smazani([dokument.soubor.name])
+        return
+    with transaction.atomic():
+        obsah = ObsahDokumentu.objects.select_for_update().filter(pk=dokument.obsah_id).first()
+        if obsah is None:
+            return
+        if obsah.pocet_odkazu > 1:
+            ObsahDokumentu.objects.filter(pk=obsah.pk).update(pocet_odkazu=F('pocet_odkazu') - 1)
+            return
+        obsah.delete()
+        naplanovat_smazani(obsah.nazvy_souboru())
+
+
+def vytvorit_zmensene_verze(obsah_pk):
+    """Vyrobí zmenšenou verzi a náhled obsahu, pokud jde o obrázek (viz logistika.obrazky)."""
+    obsah = ObsahDokumentu.objects.filter(pk=obsah_pk, zpracovano=False).first()
+    if obsah is None:
+        return
+    if je_obrazek(obsah.soubor.name):
+        with obsah.soubor.open('rb') as f:
+            zmenseny, nahled = zmensit(f, obsah.velikost)
+        nazev = posixpath.splitext(posixpath.basename(obsah.soubor.name))[0] + '.jpg'
+        if zmenseny:
+            obsah.zmenseny.save(nazev, zmenseny, save=False)
+        if nahled:
+            obsah.nahled.save(nazev, nahled, save=False)
+
+    ulozeno = ObsahDokumentu.objects.filter(pk=obsah.pk).update(
+        zmenseny=obsah.zmenseny.name, nahled=obsah.nahled.name, zpracovano=True,
+    )
+    if not ulozeno:
+        # Poslední dokument s tímto obsahem byl mezitím smazán
+        odvozene = [f.name for f in (obsah.zmenseny, obsah.nahled) if f]
+        if odvozene:
+            naplanovat_smazani(odvozene)
+
+
+def naplanovat_smazani(nazvy):
+    """Zařadí soubory ke smazání z úložiště; smažou se dávkově na pozadí."""
+    nazvy = [n for n in nazvy if n]
+    if not nazvy:
+        return
+    SouborKeSmazani.objects.bulk_create(SouborKeSmazani(nazev=n) for n in nazvy)
+    zaradit('logistika.smazat_soubory', klic='smazat_soubory', zpozdeni=ODKLAD_MAZANI, i_pri_behu=True)
+
+
+def smazat_z_uloziste(nazvy):
+    """
+    Smaže soubory z úložiště a vrátí názvy, které se smazat nepodařilo.
+
+    Na S3 jde o jediný požadavek DeleteObjects na dávku (nejvýše DAVKA_MAZANI názvů).
+    """
+    if not hasattr(default_storage, 'bucket'):
+        for nazev in nazvy:
+            default_storage.delete(nazev)
+        return []
+    odpoved = default_storage.bucket.meta.client.delete_objects(
+        Bucket=default_storage.bucket_name,
+        Delete={'Objects': [{'Key': _klic_v_bucketu(n)} for n in nazvy], 'Quiet': True},
+    )
+    chybne = {chyba['Key'] for chyba in odpoved.get('Errors', [])}
+    return [n for n in nazvy if _klic_v_bucketu(n) in chybne]
+
+
+def smazat_naplanovane():
+    """Smaže z úložiště všechny soubory zařazené ke smazání, po dávkách."""
+    zamky = connection.features.has_select_for_update_skip_locked
+    neuspesne = []
+    posledni_pk = 0
+    while True:
+        # Bez zámků řádků (SQLite) transakci neotevíráme, viz fronta.worker.zabrat
+        with transaction.atomic() if zamky else nullcontext():
+            davka = SouborKeSmazani.objects.filter(pk__gt=posledni_pk).order_by('pk')
+            if zamky:
+                davka = davka.select_for_update(skip_locked=True)
+            davka = list(davka[:DAVKA_MAZANI])
+            if not davka:
+                break
+            posledni_pk = davka[-1].pk
+            chybne = set(smazat_z_uloziste(sorted({s.nazev for s in davka})))
+            SouborKeSmazani.objects.filter(pk__in=[s.pk for s in davka if s.nazev not in chybne]).delete()
+            neuspesne.extend(chybne)
+    if neuspesne:
+        # Úloha se zopakuje s odkladem, řádky zůstávají ve frontě
+        raise ChybaMazani(f'Nepodařilo se smazat {len(neuspesne)} souborů, např. {neuspesne[0]}.')
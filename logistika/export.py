@@ -0,0 +1,223 @@
+"""
+Proudový export přeprav a partnerů do CSV a XLSX.
+
+Řádky se čtou přes queryset.iterator() (na PostgreSQL serverový kurzor)
+a hned se převádějí na výstup, takže paměť nezávisí na počtu záznamů a klient
+dostává data od prvního řádku. XLSX se skládá ručně jako ZIP se SpreadsheetML
+listem, který se zapisuje průběžně přes zip_proud(); openpyxl by celý soubor
+musel nejdřív dopsat na disk.
+"""
+import csv
+import io
+import re
+from datetime import date, datetime
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.utils import timezone
+
+from .podklady import zip_proud
+from .statistiky import business_timezone
+
+CHUNK_SIZE = 2000
+# Kolik bajtů výstupu se nasbírá, než se odešle klientovi
+VELIKOST_BLOKU = 64 * 1024
+
+_SETINY = Decimal('0.01')
+
+
+def _zaokrouhlit(castka):
+    return castka.quantize(_SETINY) if castka is not None else None
+
+
+def _hodnoty_prepravy(p):
+    # Uložené částky jsou přesné (5 desetinných míst), do exportu jdou zaokrouhlené na haléře/centy
+    cena = _zaokrouhlit(p.celkova_cena_zakaznik) if p.cena_za_tunu_zakaznik is not None else None
+    naklad = _zaokrouhlit(p.celkovy_naklad_dopravce) if p.naklad_za_tunu_dopravce is not None else None
+    marze = _zaokrouhlit(p.marze) if cena is not None and naklad is not None else None
+    return [
+        p.referencni_cislo,
+        p.get_stav_display(),
+        timezone.localtime(p.datum_vytvoreni, business_timezone()).date(),
+        p.zakaznik.nazev,
+        p.zakaznik.ic or '',
+        p.dopravce.nazev if p.dopravce else '',
+        (p.dopravce.ic or '') if p.dopravce else '',
+        p.misto_nakladky,
+        p.datum_cas_nakladky,
+        p.datum_nakladky,
+        p.misto_vykladky,
+        p.datum_cas_vykladky,
+        p.datum_vykladky,
+        p.get_typ_vozidla_display(),
+        p.popis_zbozi,
+        p.odhadovana_hmotnost_kg,
+        p.finalni_hmotnost_kg,
+        p.cena_za_tunu_zakaznik,
+        p.mena_zakaznik,
+        cena,
+        p.naklad_za_tunu_dopravce,
+        p.mena_dopravce,
+        naklad,
+        marze,
+    ]
+
+
+SLOUPCE_PREPRAV = [
+    'Referenční číslo', 'Stav', 'Datum vytvoření', 'Zákazník', 'IČ zákazníka', 'Dopravce', 'IČ dopravce',
+    'Místo nakládky', 'Termín nakládky', 'Datum nakládky', 'Místo vykládky', 'Termín vykládky', 'Datum vykládky',
+    'Typ vozidla', 'Zboží', 'Odhadovaná hmotnost (kg)', 'Finální hmotnost (kg)',
+    'Cena za tunu', 'Měna zákazník', 'Celková cena', 'Náklad za tunu', 'Měna dopravce', 'Celkový náklad', 'Marže',
+]
+
+SLOUPCE_PARTNERU = [
+    'Název', 'IČ', 'DIČ', 'Typ', 'Adresa', 'Kontaktní osoba', 'E-mail', 'Telefon',
+    'Fakturační údaje', 'Splatnost faktur (dní)',
+]
+
+
+def radky_preprav(queryset):
+    prepravy = queryset.select_related('zakaznik', 'dopravce').order_by('pk')
+    for preprava in prepravy.iterator(chunk_size=CHUNK_SIZE):
+        yield _hodnoty_prepravy(preprava)
+
+
+def radky_partneru(queryset):
+    for p in queryset.order_by('nazev', 'pk').iterator(chunk_size=CHUNK_SIZE):
+        yield [
+            p.nazev, p.ic or '', p.dic, p.get_typ_partnera_display(), p.adresa, p.kontaktni_osoba,
+            p.email, p.telefon, p.fakturacni_udaje, p.splatnost_faktur_dny,
+        ]
+
+
+def _text_pro_csv(hodnota):
+    if hodnota is None:
+        return ''
+    if isinstance(hodnota, date):
+        return f'{hodnota:%d.%m.%Y}'
+    if isinstance(hodnota, Decimal):
+        # Český Excel čte desetinnou čárku
+        return str(hodnota).replace('.', ',')
+    return hodnota
+
+
+def csv_proud(hlavicka, radky):
+    """CSV pro český Excel (UTF-8 s BOM, středník, desetinná čárka) po blocích bajtů."""
+    buf = io.StringIO()
+    zapisovac = csv.writer(buf, delimiter=';')
+    buf.write('\ufeff')
+    zapisovac.writerow(hlavicka)
+    for radek in radky:
+        zapisovac.writerow([_text_pro_csv(h) for h in radek])
+        if buf.tell() >= VELIKOST_BLOKU:
+            yield buf.getvalue().encode('utf-8')
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue().encode('utf-8')
+
+
+_XLSX_SOUBORY = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+        '</Relationships>'
+    ),
+    # Styl 1 = datum (vestavěný formát 14), styl 2 = tučná hlavička
+    'xl/styles.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font><font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+        '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        '<cellXfs count="3"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+        '<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+        '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>'
+        '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+        '</styleSheet>'
+    ),
+}
+
+_EXCEL_EPOCHA = date(1899, 12, 30)
+
+# Řídicí znaky, které XML nepovoluje (vyskytují se v textech vložených z jiných systémů)
+_NEPLATNE_ZNAKY_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def _xlsx_sesit(nazev_listu):
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        f'<sheets><sheet name="{escape(nazev_listu)}" sheetId="1" r:id="rId1"/></sheets></workbook>'
+    )
+
+
+def _xlsx_bunka(hodnota, styl=0):
+    if hodnota is None or hodnota == '':
+        return '<c/>'
+    if isinstance(hodnota, bool):
+        return f'<c t="b"><v>{int(hodnota)}</v></c>'
+    if isinstance(hodnota, (int, Decimal, float)):
+        return f'<c><v>{hodnota}</v></c>'
+    if isinstance(hodnota, datetime):
+        hodnota = hodnota.date()
+    if isinstance(hodnota, date):
+        return f'<c s="1"><v>{(hodnota - _EXCEL_EPOCHA).days}</v></c>'
+    text = escape(_NEPLATNE_ZNAKY_XML.sub('', str(hodnota)))
+    styl = f' s="{styl}"' if styl else ''
+    return f'<c t="inlineStr"{styl}><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _xlsx_list(hlavicka, radky):
+    buf = io.StringIO()
+    buf.write(
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<sheetViews><sheetView workbookViewId="0"><pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/></sheetView></sheetViews>'
+        '<sheetData><row>'
+    )
+    buf.write(''.join(_xlsx_bunka(h, styl=2) for h in hlavicka))
+    buf.write('</row>')
+    for radek in radky:
+        buf.write('<row>')
+        buf.write(''.join(_xlsx_bunka(h) for h in radek))
+        buf.write('</row>')
+        if buf.tell() >= VELIKOST_BLOKU:
+            yield buf.getvalue().encode('utf-8')
+            buf.seek(0)
+            buf.truncate()
+    buf.write('</sheetData></worksheet>')
+    yield buf.getvalue().encode('utf-8')
+
+
+def xlsx_proud(hlavicka, radky, nazev_listu='Export'):
+    """Jednolistový XLSX po blocích bajtů; list se zapisuje do ZIPu průběžně."""
+    soubory = [(nazev, obsah.encode('utf-8')) for nazev, obsah in _XLSX_SOUBORY.items()]
+    soubory.append(('xl/workbook.xml', _xlsx_sesit(nazev_listu).encode('utf-8')))
+    soubory.append(('xl/worksheets/sheet1.xml', _xlsx_list(hlavicka, radky)))
+    return zip_proud(soubory)
+
+
+FORMATY = {
+    'csv': ('text/csv; charset=utf-8', csv_proud),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', xlsx_proud),
+}
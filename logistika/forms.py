@@ -1,12 +1,13 @@
 from django import forms
 from .models import Preprava, Partner, Dokument
+from .vyhledavani import je_prefix_referencniho_cisla, vyfiltrovat
 
 class PrepravaForm(forms.ModelForm):
     class Meta:
         model = Preprava
         fields = [
-            'zakaznik', 'misto_nakladky', 'datum_cas_nakladky',
-            'misto_vykladky', 'datum_cas_vykladky', 'odesilatel_cmr', 'prijemce_cmr', 'typ_vozidla', 'popis_zbozi',
+            'zakaznik', 'misto_nakladky', 'datum_cas_nakladky', 'datum_nakladky', 'cas_nakladky_od', 'cas_nakladky_do',
+            'misto_vykladky', 'datum_cas_vykladky', 'datum_vykladky', 'cas_vykladky_od', 'cas_vykladky_do', 'odesilatel_cmr', 'prijemce_cmr', 'typ_vozidla', 'popis_zbozi',
             'odhadovana_hmotnost_kg', 'poznamka_odhad_hmotnost', 'finalni_hmotnost_kg', 'poznamka_final_hmotnost',
             'cena_za_tunu_zakaznik', 'mena_zakaznik', 'naklad_za_tunu_dopravce', 'mena_dopravce'
         ]
@@ -14,8 +15,14 @@ class PrepravaForm(forms.ModelForm):
             'zakaznik': forms.Select(attrs={'class': 'form-select'}),
             'misto_nakladky': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
             'datum_cas_nakladky': forms.TextInput(attrs={'class': 'form-control'}),
+            'datum_nakladky': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}, format='%Y-%m-%d'),
+            'cas_nakladky_od': forms.TimeInput(attrs={'class': 'form-control', 'type': 'time'}, format='%H:%M'),
+            'cas_nakladky_do': forms.TimeInput(attrs={'class': 'form-control', 'type': 'time'}, format='%H:%M'),
             'misto_vykladky': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
             'datum_cas_vykladky': forms.TextInput(attrs={'class': 'form-control'}),
+            'datum_vykladky': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}, format='%Y-%m-%d'),
+            'cas_vykladky_od': forms.TimeInput(attrs={'class': 'form-control', 'type': 'time'}, format='%H:%M'),
+            'cas_vykladky_do': forms.TimeInput(attrs={'class': 'form-control', 'type': 'time'}, format='%H:%M'),
             'odesilatel_cmr': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
             'prijemce_cmr': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
             'typ_vozidla': forms.Select(attrs={'class': 'form-select'}),
@@ -37,6 +44,19 @@ class PrepravaForm(forms.ModelForm):
         self.fields['naklad_za_tunu_dopravce'].required = False
         self.fields['cena_za_tunu_zakaznik'].required = False
 
+    def clean(self):
+        cleaned_data = super().clean()
+        for typ in ('nakladky', 'vykladky'):
+            # Změnil-li se jen volný text termínu, strukturovaný termín se z něj při uložení odvodí znovu
+            if f'datum_cas_{typ}' in self.changed_data and f'datum_{typ}' not in self.changed_data:
+                cleaned_data[f'datum_{typ}'] = None
+                cleaned_data[f'cas_{typ}_od'] = None
+                cleaned_data[f'cas_{typ}_do'] = None
+            od, do = cleaned_data.get(f'cas_{typ}_od'), cleaned_data.get(f'cas_{typ}_do')
+            if od and do and do < od:
+                self.add_error(f'cas_{typ}_do', 'Konec časového okna musí být po jeho začátku.')
+        return cleaned_data
+
 class PartnerForm(forms.ModelForm):
     class Meta:
         model = Partner
@@ -89,6 +109,13 @@ class DokumentForm(forms.ModelForm):
         model = Dokument
         fields = ['nazev', 'soubor']
 
+class PrimeNahravaniForm(forms.Form):
+    """Údaje, které prohlížeč posílá při zahájení přímého nahrávání do úložiště."""
+    nazev = forms.CharField(max_length=200)
+    nazev_souboru = forms.CharField(max_length=255)
+    velikost = forms.IntegerField(min_value=1)
+    content_type = forms.CharField(max_length=255, required=False)
+
 class PrepravaFilterForm(forms.Form):
     referencni_cislo = forms.CharField(label='Referenční číslo', required=False, widget=forms.TextInput(attrs={'class': 'form-control'}))
     zakaznik = forms.ModelChoiceField(
@@ -103,3 +130,92 @@ class PrepravaFilterForm(forms.Form):
         label='Stav',
         widget=forms.Select(attrs={'class': 'form-select'})
     )
+    nakladka_od = forms.DateField(label='Nakládka od', required=False, widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}))
+    nakladka_do = forms.DateField(label='Nakládka do', required=False, widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}))
+    vykladka_od = forms.DateField(label='Vykládka od', required=False, widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}))
+    vykladka_do = forms.DateField(label='Vykládka do', required=False, widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}))
+
+    def filtrovat(self, queryset):
+        """Použije vyplněné filtry na queryset přeprav (formulář musí být validní)."""
+        data = self.cleaned_data
+        if data.get('referencni_cislo'):
+            cislo = data['referencni_cislo'].strip()
+            if je_prefix_referencniho_cisla(cislo):
+                queryset = queryset.filter(referencni_cislo__startswith=cislo.upper())
+            else:
+                # Kandidáty zúží fulltextový index, přesnou shodu pak ověří icontains
+                queryset = vyfiltrovat(queryset, cislo).filter(referencni_cislo__icontains=cislo)
+        if data.get('zakaznik'):
+            queryset = queryset.filter(zakaznik=data['zakaznik'])
+        if data.get('stav'):
+            queryset = queryset.filter(stav=data['stav'])
+        # Rozsahy termínů jdou přes indexované sloupce datum_nakladky / datum_vykladky
+        if data.get('nakladka_od'):
+            queryset = queryset.filter(datum_nakladky__gte=data['nakladka_od'])
+        if data.get('nakladka_do'):
+            queryset = queryset.filter(datum_nakladky__lte=data['nakladka_do'])
+        if data.get('vykladka_od'):
+            queryset = queryset.filter(datum_vykladky__gte=data['vykladka_od'])
+        if data.get('vykladka_do'):
+            queryset = queryset.filter(datum_vykladky__lte=data['vykladka_do'])
+        return queryset
+
+class ImportPrepravForm(forms.Form):
+    soubor = forms.FileField(label='Soubor (CSV nebo XLSX)', widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.xlsx'}))
+    jen_kontrola = forms.BooleanField(label='Jen zkontrolovat, nic neukládat', required=False)
+
+    def clean_soubor(self):
+        soubor = self.cleaned_data['soubor']
+        if not soubor.name.lower().endswith(('.csv', '.xlsx')):
+            raise forms.ValidationError('Podporované jsou soubory CSV a XLSX.')
+        return soubor
+
+class ImportRadekForm(forms.ModelForm):
+    """
+    Pole jednoho řádku importu přeprav. Formulář se vytvoří jednou na celý
+    import a řádky se kontrolují metodou zkontrolovat(); partneři se hledají
+    podle IČ v předem načtené mapě `partneri`, takže kontrola řádku nedělá
+    žádný dotaz do DB.
+    """
+    zakaznik_ic = forms.CharField(label='IČ zákazníka', max_length=20)
+    dopravce_ic = forms.CharField(label='IČ dopravce', max_length=20, required=False)
+
+    class Meta:
+        model = Preprava
+        fields = [
+            'misto_nakladky', 'datum_cas_nakladky', 'misto_vykladky', 'datum_cas_vykladky',
+            'odesilatel_cmr', 'prijemce_cmr', 'typ_vozidla', 'popis_zbozi',
+            'odhadovana_hmotnost_kg', 'poznamka_odhad_hmotnost',
+            'cena_za_tunu_zakaznik', 'mena_zakaznik', 'naklad_za_tunu_dopravce', 'mena_dopravce',
+        ]
+
+    def __init__(self, *args, partneri, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.partneri = partneri
+
+    def _partner(self, ic, typy, popis):
+        ic = ic.replace(' ', '')
+        if not ic:
+            return None
+        partner = self.partneri.get(ic)
+        if partner is None:
+            raise forms.ValidationError(f'{popis} s IČ {ic} neexistuje.')
+        if partner.typ_partnera not in typy:
+            raise forms.ValidationError(f'Partner {partner.nazev} není {popis.lower()}.')
+        return partner
+
+    def zkontrolovat(self, data):
+        """Zvaliduje jeden řádek a vrátí (neuloženou přepravu, None), nebo (None, {popisek pole: chyby})."""
+        hodnoty, chyby = {}, {}
+        for nazev, pole in self.fields.items():
+            try:
+                hodnoty[nazev] = pole.clean(data.get(nazev, ''))
+                if nazev == 'zakaznik_ic':
+                    hodnoty[nazev] = self._partner(hodnoty[nazev], ['zakaznik', 'zakaznik_dopravce'], 'Zákazník')
+                elif nazev == 'dopravce_ic':
+                    hodnoty[nazev] = self._partner(hodnoty[nazev], ['dopravce', 'zakaznik_dopravce'], 'Dopravce')
+            except forms.ValidationError as e:
+                chyby[pole.label] = e.messages
+        if chyby:
+            return None, chyby
+        return Preprava(zakaznik=hodnoty.pop('zakaznik_ic'), dopravce=hodnoty.pop('dopravce_ic'), **hodnoty), None
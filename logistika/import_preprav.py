@@ -0,0 +1,196 @@
+"""
+Hromadný import přeprav z CSV a XLSX.
+
+Soubor se čte po řádcích (CSV přes csv.reader, XLSX přes openpyxl v režimu
+read_only), řádky se kontrolují jedinou instancí ImportRadekForm a platné se ukládají
+po dávkách: jeden blok referenčních čísel, jeden bulk_create, jeden zápis do
+vyhledávacího indexu a do DenniMarze. Partneři se předem načtou do mapy
+podle IČ, takže počet dotazů nezávisí na počtu řádků.
+"""
+import codecs
+import csv
+import io
+import re
+from dataclasses import dataclass, field
+from datetime import date, datetime, time
+
+from django.db import transaction
+
+from . import statistiky_partneru
+from .forms import ImportRadekForm
+from .models import Partner, Preprava
+from .statistiky import prispevek, pricist_denni_marze
+from .vyhledavani import normalizovat_text, pridat_do_indexu
+
+DAVKA_IMPORTU = 500
+UKAZKA_CSV = 64 * 1024
+
+POVINNE_SLOUPCE = ['zakaznik_ic', 'misto_nakladky', 'datum_cas_nakladky', 'misto_vykladky', 'datum_cas_vykladky', 'popis_zbozi']
+
+_CISELNA_POLE = {'odhadovana_hmotnost_kg', 'cena_za_tunu_zakaznik', 'naklad_za_tunu_dopravce'}
+
+
+class ChybaImportu(Exception):
+    pass
+
+
+@dataclass
+class VysledekImportu:
+    vlozeno: int = 0
+    platnych: int = 0
+    chyby: list = field(default_factory=list)  # dvojice (číslo řádku, popis chyby)
+
+
+def _normalizovat_hlavicku(text):
+    return re.sub(r'[^a-z0-9]+', '_', normalizovat_text(str(text or ''))).strip('_')
+
+
+def _sloupce():
+    """Přijímané názvy sloupců (název pole i jeho popisek) -> pole formuláře."""
+    sloupce = {}
+    for nazev, pole in ImportRadekForm.base_fields.items():
+        sloupce[_normalizovat_hlavicku(nazev)] = nazev
+        sloupce[_normalizovat_hlavicku(pole.label)] = nazev
+    sloupce.update({'zakaznik': 'zakaznik_ic', 'ic_zakaznika': 'zakaznik_ic', 'dopravce': 'dopravce_ic', 'ic_dopravce': 'dopravce_ic'})
+    return sloupce
+
+
+def _volby(pole):
+    """Kódy i popisky voleb pole přepravy (např. 'EUR' i '€') -> kód."""
+    volby = {}
+    for kod, popisek in Preprava._meta.get_field(pole).choices:
+        volby[kod.casefold()] = kod
+        volby[str(popisek).casefold()] = kod
+    return volby
+
+
+_VOLBY = {pole: _volby(pole) for pole in ('typ_vozidla', 'mena_zakaznik', 'mena_dopravce')}
+
+
+def _radky_csv(soubor):
+    ukazka = soubor.read(UKAZKA_CSV)
+    soubor.seek(0)
+    # Excel v české lokalizaci ukládá CSV ve windows-1250 a se středníky
+    try:
+        text_ukazky = codecs.getincrementaldecoder('utf-8-sig')().decode(ukazka)
+        kodovani = 'utf-8-sig'
+    except UnicodeDecodeError:
+        text_ukazky = ukazka.decode('cp1250', errors='replace')
+        kodovani = 'cp1250'
+    try:
+        dialekt = csv.Sniffer().sniff(text_ukazky, delimiters=';,\t')
+    except csv.Error:
+        dialekt = csv.excel
+    yield from csv.reader(io.TextIOWrapper(soubor, encoding=kodovani, newline=''), dialekt)
+
+
+def _radky_xlsx(soubor):
+    from openpyxl import load_workbook
+
+    kniha = load_workbook(soubor, read_only=True, data_only=True)
+    try:
+        yield from kniha.worksheets[0].iter_rows(values_only=True)
+    finally:
+        kniha.close()
+
+
+def _hodnota(pole, hodnota):
+    """Převede buňku na text, který očekává formulář (čísla s desetinnou čárkou, data z XLSX, popisky voleb)."""
+    if hodnota is None:
+        return ''
+    if isinstance(hodnota, datetime):
+        return f'{hodnota:%d.%m.%Y}' if hodnota.time() == time.min else f'{hodnota:%d.%m.%Y %H:%M}'
+    if isinstance(hodnota, date):
+        return f'{hodnota:%d.%m.%Y}'
+    hodnota = str(hodnota).strip()
+    if pole in _CISELNA_POLE:
+        hodnota = hodnota.replace(' ', '').replace('\xa0', '')
+        if ',' in hodnota and '.' not in hodnota:
+            hodnota = hodnota.replace(',', '.')
+    elif pole in _VOLBY:
+        hodnota = _VOLBY[pole].get(hodnota.casefold(), hodnota)
+    return hodnota
+
+
+def cist_soubor(soubor, nazev):
+    """
+    Průběžně vrací dvojice (číslo řádku v souboru, data pro ImportRadekForm).
+
+    První řádek je hlavička; neznámé sloupce se ignorují, prázdné řádky
+    přeskakují. Chybí-li povinný sloupec, vyhodí ChybaImportu hned na začátku.
+    """
+    radky = _radky_xlsx(soubor) if nazev.lower().endswith('.xlsx') else _radky_csv(soubor)
+    try:
+        hlavicka = next(radky, None)
+    except Exception as e:
+        raise ChybaImportu(f'Soubor nelze přečíst: {e}')
+    if not hlavicka:
+        raise ChybaImportu('Soubor je prázdný.')
+
+    sloupce = _sloupce()
+    pole = [sloupce.get(_normalizovat_hlavicku(h)) for h in hlavicka]
+    chybejici = [nazev for nazev in POVINNE_SLOUPCE if nazev not in pole]
+    if chybejici:
+        raise ChybaImportu(f'V hlavičce chybí sloupce: {", ".join(chybejici)}.')
+
+    for cislo, radek in enumerate(radky, start=2):
+        data = {p: _hodnota(p, h) for p, h in zip(pole, radek) if p}
+        if any(data.values()):
+            yield cislo, data
+
+
+def _doplnit_vychozi(data):
+    """Prázdné sloupce s výchozí hodnotou v modelu (hmotnost, měny, typ vozidla) doplní výchozí hodnotou."""
+    for nazev in ImportRadekForm._meta.fields:
+        pole = Preprava._meta.get_field(nazev)
+        if not data.get(nazev) and pole.has_default():
+            data[nazev] = pole.get_default()
+    return data
+
+
+def _popis_chyb(chyby):
+    return '; '.join(f'{popisek}: {" ".join(zpravy)}' for popisek, zpravy in chyby.items())
+
+
+def mapa_partneru():
+    return {p.ic.replace(' ', ''): p for p in Partner.objects.exclude(ic__isnull=True).exclude(ic='').only('pk', 'ic', 'nazev', 'typ_partnera')}
+
+
+def _ulozit(prepravy):
+    with transaction.atomic():
+        for preprava, cislo in zip(prepravy, Preprava.rezervovat_referencni_cisla(len(prepravy))):
+            preprava.referencni_cislo = cislo
+            preprava.doplnit_terminy()
+            preprava.aktualizovat_hledaci_text()
+        # bulk_create neposílá signály, index a souhrny se proto aktualizují dávkově tady
+        Preprava.objects.bulk_create(prepravy)
+        pridat_do_indexu(prepravy)
+        pricist_denni_marze(prispevek(preprava) for preprava in prepravy)
+        statistiky_partneru.pricist_statistiky(statistiky_partneru.prispevek(preprava) for preprava in prepravy)
+
+
+def importovat(radky, jen_kontrola=False, davka=DAVKA_IMPORTU):
+    """
+    Zvaliduje a uloží řádky z cist_soubor(). Platné řádky se uloží i tehdy,
+    když jiné řádky obsahují chyby; ty se vrátí ve VysledekImportu.chyby.
+    """
+    form = ImportRadekForm(partneri=mapa_partneru())
+    vysledek = VysledekImportu()
+    platne = []
+    for cislo, data in radky:
+        preprava, chyby = form.zkontrolovat(_doplnit_vychozi(data))
+        if chyby:
+            vysledek.chyby.append((cislo, _popis_chyb(chyby)))
+            continue
+        vysledek.platnych += 1
+        if jen_kontrola:
+            continue
+        platne.append(preprava)
+        if len(platne) >= davka:
+            _ulozit(platne)
+            vysledek.vlozeno += len(platne)
+            platne = []
+    if platne:
+        _ulozit(platne)
+        vysledek.vlozeno += len(platne)
+    return vysledek
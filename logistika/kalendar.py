@@ -0,0 +1,187 @@
+"""
+Kalendář pracovních dnů a zákazů jízdy nad tabulkou Holiday.
+
+Pro každou zemi, region (spolková země u DE) a rok se jednou za proces
+předpočítají dvě bitové mapy dnů v roce: nepracovní dny (víkendy a svátky)
+a dny se zákazem jízdy nákladních vozidel (v Německu neděle a svátky,
+Sonn- und Feiertagsfahrverbot). K nim se drží kumulativní počty pracovních
+dnů a seznam pořadových čísel pracovních dnů, takže dotazy typu "je den
+volný", "kolik pracovních dnů je mezi nakládkou a vykládkou" i "přičti N
+pracovních dnů" jsou jen indexace do polí, bez dotazu do DB.
+
+Svátky se načítají jedním dotazem za zemi a rok. Změny tabulky Holiday
+kalendář vyprázdní přes signály; ostatní procesy se dorovnají
+nejpozději po PLATNOST_CACHE.
+"""
+import time
+from array import array
+from datetime import date, timedelta
+
+from .models import Holiday
+
+VYCHOZI_ZEME = 'CZ'
+PLATNOST_CACHE = 10 * 60
+
+# Země, kde v neděli a ve svátek platí celodenní zákaz jízdy nákladních vozidel
+ZEME_SE_ZAKAZEM_JIZDY = {'DE'}
+
+_svatky = {}
+_kalendare = {}
+_platnost = 0.0
+
+
+def _zkontrolovat_platnost():
+    global _platnost
+    if _platnost < time.monotonic():
+        zneplatnit_cache()
+        _platnost = time.monotonic() + PLATNOST_CACHE
+
+
+def _svatky_roku(zeme, rok):
+    """Dvojice (den v roce, množina regionů nebo None pro celostátní svátek) pro zemi a rok."""
+    klic = (zeme, rok)
+    # Výsledek se vrací z lokální proměnné: jiné vlákno může cache mezitím vyprázdnit
+    svatky = _svatky.get(klic)
+    if svatky is None:
+        zacatek = date(rok, 1, 1)
+        svatky = _svatky[klic] = [
+            ((den - zacatek).days, set(regiony.split(',')) if regiony else None)
+            for den, regiony in Holiday.objects.filter(country_code=zeme, date__year=rok).values_list('date', 'regions')
+        ]
+    return svatky
+
+
+class _Rok:
+    """Předpočítaný rok: bitové mapy, kumulativní počty a pořadí pracovních dnů."""
+
+    __slots__ = ('zacatek', 'nepracovni', 'zakaz_jizdy', 'pred', 'pracovni')
+
+    def __init__(self, zeme, region, rok):
+        self.zacatek = date(rok, 1, 1)
+        dnu = (date(rok + 1, 1, 1) - self.zacatek).days
+        prvni_den_tydne = self.zacatek.weekday()
+
+        sobota = nedele = svatek = 0
+        for i in range(dnu):
+            tyden = (prvni_den_tydne + i) % 7
+            if tyden == 5:
+                sobota |= 1 << i
+            elif tyden == 6:
+                nedele |= 1 << i
+        for i, regiony in _svatky_roku(zeme, rok):
+            if regiony is None or region in regiony:
+                svatek |= 1 << i
+
+        self.nepracovni = sobota | nedele | svatek
+        self.zakaz_jizdy = nedele | svatek if zeme in ZEME_SE_ZAKAZEM_JIZDY else 0
+
+        # pred[i] = počet pracovních dnů před i-tým dnem roku
+        self.pred = array('H', [0]) * (dnu + 1)
+        self.pracovni = array('H')
+        for i in range(dnu):
+            volny = self.nepracovni >> i & 1
+            self.pred[i + 1] = self.pred[i] + (not volny)
+            if not volny:
+                self.pracovni.append(i)
+
+    def den(self, i):
+        return self.zacatek + timedelta(days=i)
+
+
+class Kalendar:
+    """Pracovní kalendář jedné země a regionu. Získává se přes kalendar()."""
+
+    def __init__(self, zeme, region=None):
+        self.zeme = zeme
+        self.region = region
+        self._roky = {}
+
+    def _rok(self, rok):
+        data = self._roky.get(rok)
+        if data is None:
+            data = self._roky[rok] = _Rok(self.zeme, self.region, rok)
+        return data
+
+    def _poloha(self, den):
+        rok = self._rok(den.year)
+        return rok, (den - rok.zacatek).days
+
+    def je_pracovni_den(self, den):
+        rok, i = self._poloha(den)
+        return not rok.nepracovni >> i & 1
+
+    def je_zakaz_jizdy(self, den):
+        rok, i = self._poloha(den)
+        return bool(rok.zakaz_jizdy >> i & 1)
+
+    def pocet_pracovnich_dnu(self, od, do):
+        """
+        Počet pracovních dnů d, pro které od < d <= do (den nakládky se nepočítá,
+        den vykládky ano). Pro do < od vrací záporné číslo.
+        """
+        if do < od:
+            return -self.pocet_pracovnich_dnu(do, od)
+        rok_od, i_od = self._poloha(od)
+        rok_do, i_do = self._poloha(do)
+        pocet = rok_do.pred[i_do + 1] - rok_od.pred[i_od + 1]
+        for rok in range(od.year, do.year):
+            pocet += len(self._rok(rok).pracovni)
+        return pocet
+
+    def pridat_pracovni_dny(self, den, n):
+        """
+        Vrátí n-tý pracovní den po dni `den` (pro záporné n před ním).
+        Pro n == 0 vrátí `den` beze změny, i když není pracovní.
+        """
+        if n == 0:
+            return den
+        rok, i = self._poloha(den)
+        cislo_roku = den.year
+        # Pořadí (od 1) cílového pracovního dne v rámci roku
+        poradi = rok.pred[i + 1] + n if n > 0 else rok.pred[i] + n + 1
+        while poradi > len(rok.pracovni):
+            poradi -= len(rok.pracovni)
+            cislo_roku += 1
+            rok = self._rok(cislo_roku)
+        while poradi < 1:
+            cislo_roku -= 1
+            rok = self._rok(cislo_roku)
+            poradi += len(rok.pracovni)
+        return rok.den(rok.pracovni[poradi - 1])
+
+
+def kalendar(zeme=VYCHOZI_ZEME, region=None):
+    """Sdílený kalendář pro zemi a region (kód spolkové země, např. 'BY')."""
+    _zkontrolovat_platnost()
+    klic = (zeme, region)
+    vysledek = _kalendare.get(klic)
+    if vysledek is None:
+        vysledek = _kalendare[klic] = Kalendar(zeme, region)
+    return vysledek
+
+
+def zneplatnit_cache():
+    _svatky.clear()
+    _kalendare.clear()
+
+
+def upozorneni_k_terminum(datum_nakladky, datum_vykladky, zeme=VYCHOZI_ZEME, region=None):
+    """
+    Seznam upozornění k termínům přepravy pro formuláře a přehledy.
+
+    Kontroluje nepracovní dny v zemi `zeme` a celostátní zákaz jízdy
+    v Německu. Chybějící termíny se přeskakují.
+    """
+    prac = kalendar(zeme, region)
+    de = kalendar('DE')
+    upozorneni = []
+    for nazev, den in (('Nakládka', datum_nakladky), ('Vykládka', datum_vykladky)):
+        if den is None:
+            continue
+        if not prac.je_pracovni_den(den):
+            upozorneni.append(f'{nazev} {den:%d.%m.%Y} připadá na nepracovní den ({zeme}).')
+        if de.je_zakaz_jizdy(den):
+            upozorneni.append(f'{nazev} {den:%d.%m.%Y}: v Německu platí zákaz jízdy nákladních vozidel.')
+    if datum_nakladky and datum_vykladky and datum_vykladky < datum_nakladky:
+        upozorneni.append('Vykládka je dříve než nakládka.')
+    return upozorneni
@@ -0,0 +1,128 @@
+"""
+Kurzy ČNB: čtení kurzovních lístků a přepočet částek jednotlivých přeprav.
+
+Kurzy se v procesu drží po měnách jako seřazené řady (datum, kurz), takže
+zobrazení marže přepravy v jiné měně je vyhledání půlením bez dotazu do
+databáze. Změny tabulky KurzMeny cache vyprázdní přes signály; ostatní
+procesy (gunicorn workery) se dorovnají nejpozději po PLATNOST_CACHE.
+Souhrnné marže se přepočítávají přímo v SQL, viz statistiky.marze_ve_mene().
+"""
+import time
+from bisect import bisect_right
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import KurzMeny
+from .statistiky import business_timezone
+
+PLATNOST_CACHE = 10 * 60
+# KurzMeny.kurz má 6 desetinných míst: kurz ČNB (3 místa) vydělený množstvím až 1000
+PRESNOST_KURZU = Decimal('0.000001')
+
+_cache = {}
+
+
+class ChybaKurzovnihoListku(Exception):
+    pass
+
+
+def _cislo(text, radek):
+    try:
+        return Decimal(text.strip().replace(',', '.'))
+    except InvalidOperation:
+        raise ChybaKurzovnihoListku(f'Řádek {radek}: neplatné číslo "{text}".')
+
+
+def _datum(text, radek):
+    try:
+        return datetime.strptime(text.strip(), '%d.%m.%Y').date()
+    except ValueError:
+        raise ChybaKurzovnihoListku(f'Řádek {radek}: neplatné datum "{text}".')
+
+
+def cist_kurzy_cnb(radky):
+    """
+    Z řádků souboru ČNB průběžně vrací trojice (datum, měna, Kč za 1 jednotku).
+
+    Umí denní kurzovní lístek (denni_kurz.txt: "16.10.2026 #200", hlavička
+    "země|měna|množství|kód|kurz" a řádek za každou měnu) i roční přehled
+    (rok.txt: hlavička "Datum|1 AUD|100 HUF|..." a řádek za každý den; při
+    změně sady měn se hlavička uprostřed souboru opakuje). Kurz se dělí
+    množstvím, takže např. 100 HUF = 6,123 se uloží jako 0,06123.
+    """
+    datum = None
+    sloupce = None
+    for cislo, radek in enumerate(radky, start=1):
+        radek = radek.strip()
+        if not radek:
+            continue
+        casti = radek.split('|')
+        if casti[0] == 'Datum':
+            # Roční přehled: sloupce "množství kód"
+            sloupce = []
+            for sloupec in casti[1:]:
+                mnozstvi, _, kod = sloupec.strip().partition(' ')
+                sloupce.append((kod, _cislo(mnozstvi, cislo)))
+        elif sloupce is not None:
+            den = _datum(casti[0], cislo)
+            for (kod, mnozstvi), kurz in zip(sloupce, casti[1:]):
+                if kurz.strip():
+                    yield den, kod, (_cislo(kurz, cislo) / mnozstvi).quantize(PRESNOST_KURZU)
+        elif datum is None:
+            datum = _datum(radek.split('#')[0], cislo)
+        elif casti[0].lower() == 'země':
+            continue
+        elif len(casti) == 5:
+            yield datum, casti[3].strip(), (_cislo(casti[4], cislo) / _cislo(casti[2], cislo)).quantize(PRESNOST_KURZU)
+        else:
+            raise ChybaKurzovnihoListku(f'Řádek {cislo}: neznámý formát "{radek}".')
+
+
+def _rada(mena):
+    zaznam = _cache.get(mena)
+    if zaznam is None or zaznam[0] < time.monotonic():
+        kurzy = list(KurzMeny.objects.filter(mena=mena).order_by('datum').values_list('datum', 'kurz'))
+        zaznam = (time.monotonic() + PLATNOST_CACHE, [d for d, _ in kurzy], [k for _, k in kurzy])
+        _cache[mena] = zaznam
+    return zaznam[1], zaznam[2]
+
+
+def kurz(mena, den):
+    """Kolik Kč stojí jednotka měny ke dni `den` (poslední vyhlášený kurz); None, pokud kurz chybí."""
+    if mena == 'CZK':
+        return Decimal('1')
+    data, kurzy = _rada(mena)
+    i = bisect_right(data, den)
+    return kurzy[i - 1] if i else None
+
+
+def prevest(castka, z_meny, do_meny, den):
+    if castka is None or z_meny == do_meny:
+        return castka
+    kurz_z, kurz_do = kurz(z_meny, den), kurz(do_meny, den)
+    if kurz_z is None or kurz_do is None:
+        return None
+    return castka * kurz_z / kurz_do
+
+
+def marze_prepravy(preprava, mena=None):
+    """
+    Marže přepravy v měně `mena` (výchozí MENA_VYKAZU) podle kurzu ke dni vytvoření
+    přepravy, stejně jako v souhrnech z DenniMarze. None, pokud některý kurz chybí.
+    """
+    mena = mena or settings.MENA_VYKAZU
+    if preprava.cena_za_tunu_zakaznik is None or preprava.naklad_za_tunu_dopravce is None:
+        return Decimal('0')
+    den = timezone.localtime(preprava.datum_vytvoreni, business_timezone()).date()
+    cena = prevest(preprava.celkova_cena_zakaznik, preprava.mena_zakaznik, mena, den)
+    naklad = prevest(preprava.celkovy_naklad_dopravce, preprava.mena_dopravce, mena, den)
+    if cena is None or naklad is None:
+        return None
+    return cena - naklad
+
+
+def zneplatnit_cache():
+    _cache.clear()
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+
+from logistika.models import Preprava
+
+TERMIN_POLE = [
+    'datum_nakladky', 'cas_nakladky_od', 'cas_nakladky_do',
+    'datum_vykladky', 'cas_vykladky_od', 'cas_vykladky_do',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Doplní strukturované termíny nakládky/vykládky z volného textu datum_cas_nakladky/vykladky. '
+        'Přepravy čte po dávkách a vypíše ty, jejichž text se nepodařilo rozpoznat.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--all', action='store_true', help='Přepočítat i přepravy, které už termín mají.')
+        parser.add_argument('--dry-run', action='store_true', help='Nic neukládat, jen vypsat výsledek.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        prepravy = Preprava.objects.only(
+            'referencni_cislo', 'datum_vytvoreni', 'datum_cas_nakladky', 'datum_cas_vykladky', *TERMIN_POLE
+        ).order_by('pk')
+        if not options['all']:
+            prepravy = prepravy.filter(datum_nakladky__isnull=True) | prepravy.filter(datum_vykladky__isnull=True)
+
+        davka, doplneno, nerozpoznano = [], 0, 0
+        for preprava in prepravy.iterator(chunk_size=batch_size):
+            if options['all']:
+                for pole in TERMIN_POLE:
+                    setattr(preprava, pole, None)
+            if preprava.doplnit_terminy():
+                davka.append(preprava)
+                doplneno += 1
+            for typ in ('nakladky', 'vykladky'):
+                if getattr(preprava, f'datum_{typ}') is None:
+                    nerozpoznano += 1
+                    self.stdout.write(
+                        f'{preprava.referencni_cislo}: nerozpoznán termín {typ} "{getattr(preprava, f"datum_cas_{typ}")}"'
+                    )
+            if len(davka) >= batch_size:
+                self._ulozit(davka, options['dry_run'])
+                davka = []
+        self._ulozit(davka, options['dry_run'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Doplněno {doplneno} přeprav, nerozpoznaných termínů: {nerozpoznano}.'
+        ))
+
+    def _ulozit(self, davka, dry_run):
+        if davka and not dry_run:
+            Preprava.objects.bulk_update(davka, TERMIN_POLE)
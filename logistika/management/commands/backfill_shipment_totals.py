@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from logistika.models import Preprava
+
+
+class Command(BaseCommand):
+    help = (
+        'Přepočítá uložené částky přeprav (celková cena, náklad, marže) ze sazeb za tunu a hmotnosti. '
+        'Migrace je naplní sama; příkaz slouží k opravě po zásazích mimo ORM (SQL, loaddata). '
+        'S --check jen ověří, že uložené částky odpovídají.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--check', action='store_true', help='Jen zkontrolovat odchylky, nic neměnit.')
+
+    def handle(self, *args, **options):
+        odchylky = Preprava.objects.order_by('pk').prepocitat_castky(davka=options['batch_size'], ulozit=not options['check'])
+        if options['check']:
+            if odchylky:
+                raise CommandError(f'{odchylky} přeprav má neaktuální částky, spusťte příkaz bez --check.')
+            self.stdout.write(self.style.SUCCESS('Uložené částky odpovídají.'))
+            return
+        self.stdout.write(self.style.SUCCESS(f'Přepočítáno, opraveno {odchylky} přeprav.'))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from logistika.dokumenty import deduplikovat
+from logistika.models import Dokument, ObsahDokumentu
+
+
+class Command(BaseCommand):
+    help = (
+        'Připojí dokumenty, které ještě nemají ObsahDokumentu (nahrané před zavedením '
+        'deduplikace), ke sdílenému obsahu a smaže jejich duplicitní kopie z úložiště.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        pocet_obsahu = ObsahDokumentu.objects.count()
+        zpracovano = 0
+        posledni_pk = 0
+        while True:
+            davka = list(
+                Dokument.objects.filter(obsah__isnull=True, pk__gt=posledni_pk)
+                .order_by('pk').values_list('pk', flat=True)[:options['batch_size']]
+            )
+            if not davka:
+                break
+            for pk in davka:
+                try:
+                    deduplikovat(pk)
+                except FileNotFoundError:
+                    self.stderr.write(f'Dokument {pk}: soubor v úložišti chybí.')
+                    continue
+                zpracovano += 1
+            posledni_pk = davka[-1]
+            self.stdout.write(f'Zpracováno {zpracovano} dokumentů...')
+
+        nove = ObsahDokumentu.objects.count() - pocet_obsahu
+        self.stdout.write(self.style.SUCCESS(
+            f'Hotovo: {zpracovano} dokumentů, {nove} nových obsahů, {zpracovano - nove} duplicit odstraněno.'
+        ))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from logistika.export import FORMATY, SLOUPCE_PARTNERU, radky_partneru
+from logistika.management.commands.export_shipments import zapsat
+from logistika.models import Partner
+
+
+class Command(BaseCommand):
+    help = 'Vyexportuje partnery do CSV nebo XLSX.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(FORMATY), default='csv')
+        parser.add_argument('--output', default='-', help='Cílový soubor, "-" = standardní výstup.')
+        parser.add_argument('--type', choices=[typ for typ, _ in Partner.TYP_PARTNERA_CHOICES], help='Jen partneři daného typu.')
+
+    def handle(self, *args, **options):
+        partneri = Partner.objects.all()
+        if options['type']:
+            partneri = partneri.filter(typ_partnera=options['type'])
+        _, proud = FORMATY[options['format']]
+        zapsat(proud(SLOUPCE_PARTNERU, radky_partneru(partneri)), options['output'])
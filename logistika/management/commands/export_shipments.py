@@ -0,0 +1,55 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from logistika.export import FORMATY, SLOUPCE_PREPRAV, radky_preprav
+from logistika.forms import PrepravaFilterForm
+from logistika.models import Preprava
+
+# Volba příkazu -> pole PrepravaFilterForm
+FILTRY = {
+    'reference': 'referencni_cislo',
+    'customer': 'zakaznik',
+    'status': 'stav',
+    'loading_from': 'nakladka_od',
+    'loading_to': 'nakladka_do',
+    'unloading_from': 'vykladka_od',
+    'unloading_to': 'vykladka_do',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Vyexportuje přepravy včetně cen a marže do CSV nebo XLSX. Filtry odpovídají '
+        'filtru v seznamu přeprav; data se zapisují průběžně, paměť nezávisí na počtu přeprav.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(FORMATY), default='csv')
+        parser.add_argument('--output', default='-', help='Cílový soubor, "-" = standardní výstup.')
+        parser.add_argument('--reference', help='Referenční číslo nebo jeho začátek.')
+        parser.add_argument('--customer', help='ID zákazníka.')
+        parser.add_argument('--status', help='Stav přepravy (např. uzavrena).')
+        parser.add_argument('--loading-from', help='Nakládka od (RRRR-MM-DD).')
+        parser.add_argument('--loading-to', help='Nakládka do (RRRR-MM-DD).')
+        parser.add_argument('--unloading-from', help='Vykládka od (RRRR-MM-DD).')
+        parser.add_argument('--unloading-to', help='Vykládka do (RRRR-MM-DD).')
+
+    def handle(self, *args, **options):
+        form = PrepravaFilterForm({pole: options[volba] for volba, pole in FILTRY.items() if options[volba]})
+        if not form.is_valid():
+            raise CommandError(f'Neplatný filtr: {form.errors.as_text()}')
+        _, proud = FORMATY[options['format']]
+        bloky = proud(SLOUPCE_PREPRAV, radky_preprav(form.filtrovat(Preprava.objects.all())))
+        zapsat(bloky, options['output'])
+
+
+def zapsat(bloky, cesta):
+    if cesta == '-':
+        for blok in bloky:
+            sys.stdout.buffer.write(blok)
+        sys.stdout.buffer.flush()
+        return
+    with open(cesta, 'wb') as vystup:
+        for blok in bloky:
+            vystup.write(blok)
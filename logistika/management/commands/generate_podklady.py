@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from logistika.forms import PrepravaFilterForm
+from logistika.models import Partner, Preprava
+from logistika.podklady import podklady_prepravy, zip_proud
+
+
+class Command(BaseCommand):
+    help = 'Vygeneruje PDF podklady pro přepravy odpovídající filtru a uloží je do jednoho ZIP souboru.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Cesta k výslednému ZIP souboru.')
+        parser.add_argument('--stav', choices=[k for k, _ in Preprava.STAV_CHOICES])
+        parser.add_argument('--zakaznik-ic', help='IČ zákazníka.')
+        parser.add_argument('--nakladka-od', help='Datum nakládky od (RRRR-MM-DD).')
+        parser.add_argument('--nakladka-do', help='Datum nakládky do (RRRR-MM-DD).')
+        parser.add_argument('--workers', type=int, default=settings.PODKLADY_PDF_WORKERS)
+
+    def handle(self, *args, **options):
+        data = {
+            'stav': options['stav'] or '',
+            'nakladka_od': options['nakladka_od'] or '',
+            'nakladka_do': options['nakladka_do'] or '',
+        }
+        if options['zakaznik_ic']:
+            zakaznik = Partner.objects.filter(ic=options['zakaznik_ic']).first()
+            if zakaznik is None:
+                raise CommandError(f"Zákazník s IČ {options['zakaznik_ic']} neexistuje.")
+            data['zakaznik'] = zakaznik.pk
+        form = PrepravaFilterForm(data)
+        if not form.is_valid():
+            raise CommandError(form.errors.as_text())
+
+        prepravy = form.filtrovat(Preprava.objects.select_related('zakaznik', 'dopravce')).order_by('pk')
+        pocet = 0
+
+        def prepravy_iter():
+            nonlocal pocet
+            for preprava in prepravy.iterator(chunk_size=200):
+                pocet += 1
+                yield preprava
+
+        with open(options['output'], 'wb') as f:
+            for kus in zip_proud(podklady_prepravy(prepravy_iter(), workers=options['workers'])):
+                f.write(kus)
+        self.stdout.write(self.style.SUCCESS(f"Vygenerováno {pocet} podkladů do {options['output']}."))
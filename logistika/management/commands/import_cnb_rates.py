@@ -0,0 +1,51 @@
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+
+from logistika import kurzy
+from logistika.models import KurzMeny
+
+DAVKA = 1000
+
+
+class Command(BaseCommand):
+    help = (
+        'Naimportuje kurzy ČNB z lokálních souborů: denního kurzovního lístku (denni_kurz.txt) '
+        'nebo ročního přehledu (rok.txt). Existující kurzy se přepíšou, příkaz lze tedy '
+        'spouštět opakovaně.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('soubory', nargs='+', help='Cesty k souborům ČNB.')
+        parser.add_argument('--encoding', default='utf-8-sig', help='Kódování souborů (starší přehledy jsou v cp1250).')
+
+    def handle(self, *args, **options):
+        celkem = 0
+        for cesta in options['soubory']:
+            try:
+                soubor = open(cesta, encoding=options['encoding'])
+            except OSError as e:
+                raise CommandError(f'Soubor nelze otevřít: {e}')
+            with soubor:
+                try:
+                    pocet = self._ulozit(
+                        KurzMeny(datum=datum, mena=mena, kurz=kurz)
+                        for datum, mena, kurz in kurzy.cist_kurzy_cnb(soubor)
+                    )
+                except (kurzy.ChybaKurzovnihoListku, UnicodeDecodeError) as e:
+                    raise CommandError(f'{cesta}: {e}')
+            self.stdout.write(f'{cesta}: {pocet} kurzů.')
+            celkem += pocet
+
+        # bulk_create neposílá signály, cache v tomto procesu je potřeba vyprázdnit ručně
+        kurzy.zneplatnit_cache()
+        self.stdout.write(self.style.SUCCESS(f'Uloženo {celkem} kurzů.'))
+
+    def _ulozit(self, kurzy_iter):
+        pocet = 0
+        while davka := list(islice(kurzy_iter, DAVKA)):
+            KurzMeny.objects.bulk_create(
+                davka, update_conflicts=True, unique_fields=['mena', 'datum'], update_fields=['kurz'],
+            )
+            pocet += len(davka)
+        return pocet
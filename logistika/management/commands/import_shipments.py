@@ -0,0 +1,49 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from logistika.import_preprav import DAVKA_IMPORTU, ChybaImportu, cist_soubor, importovat
+
+
+class Command(BaseCommand):
+    help = (
+        'Naimportuje přepravy z CSV nebo XLSX souboru (první řádek je hlavička, zákazník '
+        'a dopravce se zadávají IČ). Platné řádky se uloží, chybné se vypíšou.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('soubor', help='Cesta k .csv nebo .xlsx souboru.')
+        parser.add_argument('--dry-run', action='store_true', help='Jen zkontrolovat, nic neukládat.')
+        parser.add_argument('--errors', help='Uložit chybné řádky do CSV souboru místo výpisu.')
+        parser.add_argument('--batch-size', type=int, default=DAVKA_IMPORTU)
+
+    def handle(self, *args, **options):
+        zacatek = time.monotonic()
+        try:
+            with open(options['soubor'], 'rb') as soubor:
+                vysledek = importovat(
+                    cist_soubor(soubor, options['soubor']),
+                    jen_kontrola=options['dry_run'],
+                    davka=options['batch_size'],
+                )
+        except (OSError, ChybaImportu) as e:
+            raise CommandError(str(e))
+
+        if options['errors']:
+            with open(options['errors'], 'w', encoding='utf-8-sig', newline='') as vystup:
+                zapisovac = csv.writer(vystup, delimiter=';')
+                zapisovac.writerow(['Řádek', 'Chyba'])
+                zapisovac.writerows(vysledek.chyby)
+        else:
+            for cislo, chyba in vysledek.chyby:
+                self.stderr.write(f'Řádek {cislo}: {chyba}')
+
+        self.stdout.write(
+            f'Platných řádků {vysledek.platnych}, uloženo {vysledek.vlozeno}, chybných {len(vysledek.chyby)} '
+            f'({time.monotonic() - zacatek:.1f} s).'
+        )
+        if vysledek.chyby:
+            self.stdout.write(self.style.WARNING('Některé řádky se nepodařilo naimportovat.'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Hotovo.'))
@@ -0,0 +1,68 @@
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+
+from logistika import kalendar, svatky
+from logistika.models import Holiday
+from logistika.pravidla_svatku import ZEME_S_PRAVIDLY, cist_ical, generovat_svatky
+from logistika.statistiky import business_today
+
+DAVKA = 1000
+
+
+class Command(BaseCommand):
+    help = (
+        'Doplní svátky do tabulky Holiday. Bez --ical je spočítá z pravidel (CZ, DE) '
+        'pro zadané roky, s --ical je načte z iCalendar souboru pro jednu zemi. '
+        'Existující svátky se přeskočí, příkaz lze tedy spouštět opakovaně.'
+    )
+
+    def add_arguments(self, parser):
+        rok = business_today().year
+        parser.add_argument('--from-year', type=int, default=rok, help='První rok (výchozí letošní).')
+        parser.add_argument('--to-year', type=int, default=rok + 2, help='Poslední rok včetně (výchozí letošní + 2).')
+        parser.add_argument('--country', action='append', help='Kód země; lze zadat vícekrát. U --ical povinný.')
+        parser.add_argument('--ical', help='Cesta k .ics souboru se svátky.')
+        parser.add_argument('--regions', default='', help='Regiony pro svátky z --ical (např. "BY,BW"), výchozí celostátní.')
+
+    def handle(self, *args, **options):
+        od, do = options['from_year'], options['to_year']
+        if od > do:
+            raise CommandError('--from-year musí být nejvýše --to-year.')
+        zeme = [kod.upper() for kod in options['country'] or []]
+
+        if options['ical']:
+            if len(zeme) != 1:
+                raise CommandError('U --ical zadejte právě jednu zemi přes --country.')
+            try:
+                soubor = open(options['ical'], encoding='utf-8-sig')
+            except OSError as e:
+                raise CommandError(f'Soubor nelze otevřít: {e}')
+            with soubor:
+                svatky_iter = (
+                    Holiday(date=den, name=nazev[:150], country_code=zeme[0], regions=options['regions'])
+                    for den, nazev in cist_ical(soubor)
+                    if od <= den.year <= do
+                )
+                vlozeno = self._vlozit(svatky_iter)
+        else:
+            nezname = set(zeme) - set(ZEME_S_PRAVIDLY)
+            if nezname:
+                raise CommandError(f'Pro {", ".join(sorted(nezname))} nejsou pravidla, použijte --ical.')
+            svatky_iter = (
+                Holiday(date=den, name=nazev, country_code=kod, regions=regiony)
+                for rok in range(od, do + 1)
+                for den, nazev, kod, regiony in generovat_svatky(rok, zeme)
+            )
+            vlozeno = self._vlozit(svatky_iter)
+
+        # bulk_create neposílá signály, cache v tomto procesu je potřeba vyprázdnit ručně
+        svatky.zneplatnit_cache()
+        kalendar.zneplatnit_cache()
+        self.stdout.write(self.style.SUCCESS(f'Vloženo {vlozeno} nových svátků ({od}–{do}).'))
+
+    def _vlozit(self, svatky_iter):
+        pred = Holiday.objects.count()
+        while davka := list(islice(svatky_iter, DAVKA)):
+            Holiday.objects.bulk_create(davka, ignore_conflicts=True)
+        return Holiday.objects.count() - pred
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from fronta.registr import zaradit
+from logistika.models import ObsahDokumentu
+
+
+class Command(BaseCommand):
+    help = 'Zařadí do fronty výrobu zmenšených verzí a náhledů pro dosud nezpracované obsahy dokumentů.'
+
+    def handle(self, *args, **options):
+        pocet = 0
+        for pk in ObsahDokumentu.objects.filter(zpracovano=False).values_list('pk', flat=True).iterator():
+            zaradit('logistika.zpracovat_obsah', klic=f'obsah:{pk}', obsah_pk=pk)
+            pocet += 1
+        self.stdout.write(self.style.SUCCESS(f'Zařazeno {pocet} obsahů ke zpracování.'))
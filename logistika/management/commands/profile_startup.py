@@ -0,0 +1,74 @@
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Moduly, které se smí načíst až při prvním použití, ne při startu workeru
+LINE_MODULY = ['reportlab', 'PIL']
+
+_SKRIPT = '''
+import sys, time
+t = time.perf_counter()
+import spedice_project.wsgi
+from django.urls import get_resolver
+get_resolver().url_patterns
+print(time.perf_counter() - t)
+print(','.join(m for m in {line} if m in sys.modules))
+'''
+
+
+class Command(BaseCommand):
+    help = (
+        'Změří dobu studeného startu workeru (import spedice_project.wsgi a URLconf) '
+        'v čistých procesech a vypíše nejdražší importy podle python -X importtime.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help='Počet měření (výsledkem je medián).')
+        parser.add_argument('--top', type=int, default=15, help='Kolik nejdražších importů vypsat.')
+        parser.add_argument('--max-ms', type=float, help='Selže, pokud medián startu překročí tuto hodnotu.')
+
+    def handle(self, *args, **options):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'spedice_project.settings'))
+        skript = _SKRIPT.format(line=LINE_MODULY)
+
+        casy = []
+        importy = None
+        nactene_line = set()
+        for _ in range(options['runs']):
+            proces = subprocess.run(
+                [sys.executable, '-X', 'importtime', '-c', skript],
+                cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+            )
+            if proces.returncode:
+                raise CommandError(proces.stderr.strip().splitlines()[-1])
+            cas, line = proces.stdout.splitlines()[-2:]
+            casy.append(float(cas) * 1000)
+            nactene_line.update(filter(None, line.split(',')))
+            if importy is None:
+                importy = self._parsovat_importtime(proces.stderr)
+
+        median = statistics.median(casy)
+        self.stdout.write(f'Start workeru: medián {median:.0f} ms (min {min(casy):.0f}, max {max(casy):.0f}, {len(casy)} běhů)')
+        self.stdout.write('Nejdražší importy (kumulativně, ms):')
+        for kumulativne, modul in importy[:options['top']]:
+            self.stdout.write(f'  {kumulativne / 1000:8.1f}  {modul}')
+
+        if nactene_line:
+            raise CommandError(f'Při startu se načítají moduly, které mají být líné: {", ".join(sorted(nactene_line))}')
+        if options['max_ms'] is not None and median > options['max_ms']:
+            raise CommandError(f'Start trvá {median:.0f} ms, limit je {options["max_ms"]:.0f} ms.')
+
+    @staticmethod
+    def _parsovat_importtime(vystup):
+        """Z výstupu -X importtime vrátí dvojice (kumulativní µs, modul) seřazené sestupně."""
+        importy = []
+        for radek in vystup.splitlines():
+            if not radek.startswith('import time:') or 'cumulative' in radek:
+                continue
+            _, kumulativne, modul = radek.split(':', 1)[1].split('|')
+            importy.append((int(kumulativne), modul.strip()))
+        return sorted(importy, reverse=True)
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from logistika.models import DenniMarze
+from logistika.statistiky import spocitat_denni_marze
+
+
+class Command(BaseCommand):
+    help = (
+        'Přepočítá tabulku DenniMarze z přeprav. S --check pouze porovná uložený '
+        'souhrn se skutečností a vypíše odchylky.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='Jen zkontrolovat odchylky, nic neměnit.')
+
+    def handle(self, *args, **options):
+        spravne = spocitat_denni_marze()
+
+        if options['check']:
+            ulozene = {
+                (r.den, r.mena, r.skupina): (r.pocet_preprav, r.marze, r.trzby, r.naklady)
+                for r in DenniMarze.objects.iterator()
+                if r.pocet_preprav or r.marze or r.trzby or r.naklady
+            }
+            odchylky = 0
+            for klic in sorted(set(spravne) | set(ulozene)):
+                ocekavano = tuple(spravne.get(klic, (0, 0, 0, 0)))
+                nalezeno = ulozene.get(klic, (0, 0, 0, 0))
+                if any(o != n for o, n in zip(ocekavano, nalezeno)):
+                    odchylky += 1
+                    self.stdout.write(f'{klic[0]} {klic[1]} {klic[2]}: uloženo {nalezeno}, má být {ocekavano}')
+            if odchylky:
+                raise CommandError(f'Nalezeno {odchylky} odchylek, spusťte příkaz bez --check.')
+            self.stdout.write(self.style.SUCCESS('DenniMarze odpovídá přepravám.'))
+            return
+
+        with transaction.atomic():
+            DenniMarze.objects.all().delete()
+            DenniMarze.objects.bulk_create(
+                DenniMarze(
+                    den=den, mena=mena, skupina=skupina,
+                    pocet_preprav=pocet, marze=marze, trzby=trzby, naklady=naklady,
+                )
+                for (den, mena, skupina), (pocet, marze, trzby, naklady) in spravne.items()
+                if pocet or marze or trzby or naklady
+            )
+        self.stdout.write(self.style.SUCCESS(f'DenniMarze přepočítána ({len(spravne)} řádků).'))
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from logistika.models import StatistikaPartnera
+from logistika.statistiky_partneru import CITACE, spocitat_statistiky
+
+POROVNAVANA_POLE = [*CITACE, 'pocty_podle_stavu', 'posledni_preprava']
+
+
+class Command(BaseCommand):
+    help = (
+        'Přepočítá tabulku StatistikaPartnera z přeprav a dokumentů. S --check pouze '
+        'porovná uložené statistiky se skutečností a vypíše odchylky.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='Jen zkontrolovat odchylky, nic neměnit.')
+
+    def handle(self, *args, **options):
+        spravne = spocitat_statistiky()
+
+        if options['check']:
+            ulozene = {s.partner_id: s for s in StatistikaPartnera.objects.iterator()}
+            prazdna = StatistikaPartnera()
+            odchylky = 0
+            for pk in sorted(set(spravne) | set(ulozene)):
+                ocekavano = spravne.get(pk)
+                nalezeno = ulozene.get(pk, prazdna)
+                for pole in POROVNAVANA_POLE:
+                    hodnota = ocekavano[pole] if ocekavano else getattr(prazdna, pole)
+                    if getattr(nalezeno, pole) != hodnota:
+                        odchylky += 1
+                        self.stdout.write(f'Partner {pk}, {pole}: uloženo {getattr(nalezeno, pole)}, má být {hodnota}')
+            if odchylky:
+                raise CommandError(f'Nalezeno {odchylky} odchylek, spusťte příkaz bez --check.')
+            self.stdout.write(self.style.SUCCESS('StatistikaPartnera odpovídá přepravám.'))
+            return
+
+        with transaction.atomic():
+            StatistikaPartnera.objects.all().delete()
+            StatistikaPartnera.objects.bulk_create(
+                (StatistikaPartnera(partner_id=pk, **hodnoty) for pk, hodnoty in spravne.items()),
+                batch_size=1000,
+            )
+        self.stdout.write(self.style.SUCCESS(f'StatistikaPartnera přepočítána ({len(spravne)} partnerů).'))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from logistika.models import Partner, Preprava
+from logistika.vyhledavani import prebudovat_index
+
+
+class Command(BaseCommand):
+    help = (
+        'Přepočítá sloupec hledaci_text a znovu naplní vyhledávací index '
+        '(např. po loaddata nebo po změně normalizace textu).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        self._prepocitat(Partner.objects.only('pk', *Partner.HLEDANA_POLE), options['batch_size'])
+        self._prepocitat(
+            Preprava.objects.select_related('zakaznik', 'dopravce').only(
+                'pk', 'zakaznik__nazev', 'dopravce__nazev', *Preprava.HLEDANA_POLE
+            ),
+            options['batch_size'],
+        )
+
+    def _prepocitat(self, queryset, batch_size):
+        model = queryset.model
+        davka, celkem = [], 0
+        for obj in queryset.iterator(chunk_size=batch_size):
+            obj.aktualizovat_hledaci_text()
+            davka.append(obj)
+            if len(davka) >= batch_size:
+                model.objects.bulk_update(davka, ['hledaci_text'])
+                celkem += len(davka)
+                davka = []
+        model.objects.bulk_update(davka, ['hledaci_text'])
+        celkem += len(davka)
+        prebudovat_index(model)
+        self.stdout.write(self.style.SUCCESS(f'{model._meta.verbose_name_plural}: přeindexováno {celkem} záznamů.'))
@@ -0,0 +1,155 @@
+import heapq
+import os
+import queue
+import threading
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models.functions import Collate
+from django.utils import timezone
+
+from logistika.dokumenty import DAVKA_MAZANI, smazat_z_uloziste
+from logistika.models import Dokument, ObsahDokumentu, SouborKeSmazani
+
+_KONEC = object()
+
+
+def _na_pozadi(iterator, fronta_max=2000):
+    """Čte iterátor ve vedlejším vlákně, aby výpis bucketu běžel souběžně se čtením z DB."""
+    fronta = queue.Queue(maxsize=fronta_max)
+
+    def cist():
+        try:
+            for polozka in iterator:
+                fronta.put(polozka)
+        except Exception as e:
+            fronta.put(e)
+        fronta.put(_KONEC)
+
+    threading.Thread(target=cist, daemon=True).start()
+    while (polozka := fronta.get()) is not _KONEC:
+        if isinstance(polozka, Exception):
+            raise polozka
+        yield polozka
+
+
+def _soubory_v_ulozisti(prefix):
+    """Dvojice (název, čas změny) všech souborů pod prefixem, seřazené podle názvu (bytově, jako S3)."""
+    if hasattr(default_storage, 'bucket'):
+        location = default_storage.location.rstrip('/') + '/' if default_storage.location else ''
+        strankovac = default_storage.bucket.meta.client.get_paginator('list_objects_v2')
+        for stranka in strankovac.paginate(Bucket=default_storage.bucket_name, Prefix=location + prefix):
+            for objekt in stranka.get('Contents', []):
+                yield objekt['Key'][len(location):], objekt['LastModified']
+        return
+
+    def prochazet(adresar):
+        cesta = default_storage.path(adresar)
+        if not os.path.isdir(cesta):
+            return
+        # Adresář se řadí jako "nazev/", aby pořadí odpovídalo řazení celých cest
+        polozky = sorted(os.scandir(cesta), key=lambda e: e.name + '/' if e.is_dir() else e.name)
+        for polozka in polozky:
+            nazev = f'{adresar}/{polozka.name}'
+            if polozka.is_dir():
+                yield from prochazet(nazev)
+            else:
+                yield nazev, datetime.fromtimestamp(polozka.stat().st_mtime, tz=dt_timezone.utc)
+
+    yield from prochazet(prefix.rstrip('/'))
+
+
+def _serazene_nazvy(queryset, pole, prefix):
+    """Názvy souborů z jednoho sloupce seřazené bytově (na PostgreSQL přes collation "C")."""
+    razeni = Collate(pole, 'C') if connection.vendor == 'postgresql' else pole
+    return (
+        queryset.filter(**{f'{pole}__startswith': prefix})
+        .order_by(razeni)
+        .values_list(pole, flat=True)
+        .iterator(chunk_size=5000)
+    )
+
+
+def _zname_nazvy(prefix):
+    """Všechny názvy souborů, na které odkazuje databáze, seřazené a bez duplicit."""
+    proudy = [
+        _serazene_nazvy(Dokument.objects.all(), 'soubor', prefix),
+        _serazene_nazvy(ObsahDokumentu.objects.all(), 'soubor', prefix),
+        _serazene_nazvy(ObsahDokumentu.objects.all(), 'zmenseny', prefix),
+        _serazene_nazvy(ObsahDokumentu.objects.all(), 'nahled', prefix),
+        _serazene_nazvy(SouborKeSmazani.objects.all(), 'nazev', prefix),
+    ]
+    posledni = None
+    for nazev in heapq.merge(*proudy):
+        if nazev != posledni:
+            yield nazev
+            posledni = nazev
+
+
+class Command(BaseCommand):
+    help = (
+        'Porovná soubory v úložišti s databází a najde osiřelé soubory (bez záznamu v DB). '
+        'Výpis úložiště i tabulky se čtou jako seřazené proudy a slučují se, takže paměť '
+        'nezávisí na počtu souborů. Bez --delete jen vypisuje.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default='dokumenty/', help='Prohledávaná část úložiště.')
+        parser.add_argument('--min-age-hours', type=float, default=24,
+                            help='Mladší soubory přeskočit (mohou patřit právě probíhajícímu nahrávání).')
+        parser.add_argument('--delete', action='store_true', help='Osiřelé soubory smazat.')
+        parser.add_argument('--verbose-list', action='store_true', help='Vypsat každý nalezený soubor.')
+
+    def handle(self, *args, **options):
+        hranice = timezone.now() - timedelta(hours=options['min_age_hours'])
+        v_ulozisti = _na_pozadi(_soubory_v_ulozisti(options['prefix']))
+        zname = _zname_nazvy(options['prefix'])
+
+        prohledano = osirele = smazano = chybejici = 0
+        davka = []
+
+        def smazat_davku():
+            nonlocal smazano
+            chybne = smazat_z_uloziste(davka)
+            smazano += len(davka) - len(chybne)
+            for nazev in chybne:
+                self.stderr.write(f'Nepodařilo se smazat {nazev}')
+            davka.clear()
+
+        znamy = next(zname, None)
+        for nazev, zmeneno in v_ulozisti:
+            prohledano += 1
+            if prohledano % 100000 == 0:
+                self.stdout.write(f'Prohledáno {prohledano} souborů, osiřelých {osirele}...')
+            while znamy is not None and znamy < nazev:
+                # Záznam v DB, ke kterému soubor v úložišti chybí
+                chybejici += 1
+                if options['verbose_list']:
+                    self.stdout.write(f'chybí v úložišti: {znamy}')
+                znamy = next(zname, None)
+            if znamy == nazev:
+                znamy = next(zname, None)
+                continue
+            if zmeneno > hranice:
+                continue
+            osirele += 1
+            if options['verbose_list']:
+                self.stdout.write(f'osiřelý: {nazev}')
+            if options['delete']:
+                davka.append(nazev)
+                if len(davka) >= DAVKA_MAZANI:
+                    smazat_davku()
+        while znamy is not None:
+            chybejici += 1
+            if options['verbose_list']:
+                self.stdout.write(f'chybí v úložišti: {znamy}')
+            znamy = next(zname, None)
+        if davka:
+            smazat_davku()
+
+        self.stdout.write(f'Prohledáno {prohledano} souborů, osiřelých {osirele}, smazáno {smazano}.')
+        if chybejici:
+            self.stdout.write(self.style.WARNING(f'{chybejici} souborů z databáze v úložišti chybí.'))
+        self.stdout.write(self.style.SUCCESS('Hotovo.'))
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logistika', '0021_alter_preprava_odhadovana_hmotnost_kg_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='preprava',
+            index=models.Index(fields=['-datum_vytvoreni', '-id'], name='preprava_vytvoreni_id_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logistika', '0022_preprava_vytvoreni_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='preprava',
+            index=models.Index(fields=['stav', 'datum_vytvoreni'], name='preprava_stav_vytvoreni_idx'),
+        ),
+    ]
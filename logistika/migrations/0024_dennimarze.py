@@ -0,0 +1,57 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:36
+
+from collections import defaultdict
+from decimal import Decimal
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+REALIZOVANE_STAVY = ['planovana', 'probiha', 'dokoncena', 'fakturace', 'uzavrena']
+
+
+def naplnit_denni_marze(apps, schema_editor):
+    Preprava = apps.get_model('logistika', 'Preprava')
+    DenniMarze = apps.get_model('logistika', 'DenniMarze')
+    tz = ZoneInfo(settings.BUSINESS_TIME_ZONE)
+    souhrn = defaultdict(lambda: [0, Decimal('0')])
+    for p in Preprava.objects.filter(mena_zakaznik=models.F('mena_dopravce')).iterator(chunk_size=2000):
+        den = timezone.localtime(p.datum_vytvoreni, tz).date()
+        skupina = 'realizovane' if p.stav in REALIZOVANE_STAVY else 'ostatni'
+        radek = souhrn[(den, p.mena_zakaznik, skupina)]
+        radek[0] += 1
+        if p.cena_za_tunu_zakaznik is not None and p.naklad_za_tunu_dopravce is not None:
+            hmotnost_kg = p.finalni_hmotnost_kg if p.finalni_hmotnost_kg is not None else p.odhadovana_hmotnost_kg
+            radek[1] += Decimal(hmotnost_kg) * (p.cena_za_tunu_zakaznik - p.naklad_za_tunu_dopravce) / Decimal(1000)
+    DenniMarze.objects.bulk_create(
+        DenniMarze(den=den, mena=mena, skupina=skupina, pocet_preprav=pocet, marze=marze)
+        for (den, mena, skupina), (pocet, marze) in souhrn.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logistika', '0023_preprava_stav_vytvoreni_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DenniMarze',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('den', models.DateField()),
+                ('mena', models.CharField(choices=[('CZK', 'Kč'), ('EUR', '€')], max_length=3)),
+                ('skupina', models.CharField(choices=[('realizovane', 'Realizované'), ('ostatni', 'Ostatní')], max_length=20)),
+                ('pocet_preprav', models.IntegerField(default=0)),
+                ('marze', models.DecimalField(decimal_places=5, default=0, max_digits=18)),
+            ],
+            options={
+                'verbose_name': 'Denní marže',
+                'verbose_name_plural': 'Denní marže',
+                'unique_together': {('den', 'mena', 'skupina')},
+            },
+        ),
+        migrations.RunPython(naplnit_denni_marze, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logistika', '0024_dennimarze'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CiselnaRada',
+            fields=[
+                ('rok', models.IntegerField(primary_key=True, serialize=False)),
+                ('posledni_cislo', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Číselná řada',
+                'verbose_name_plural': 'Číselné řady',
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logistika', '0025_ciselnarada'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='preprava',
+            name='cas_nakladky_do',
+            field=models.TimeField(blank=True, null=True, verbose_name='Čas nakládky do'),
+        ),
+        migrations.AddField(
+            model_name='preprava',
+            name='cas_nakladky_od',
+            field=models.TimeField(blank=True, null=True, verbose_name='Čas nakládky od'),
+        ),
+        migrations.AddField(
+            model_name='preprava',
+            name='cas_vykladky_do',
+            field=models.TimeField(blank=True, null=True, verbose_name='Čas vykládky do'),
+        ),
+        migrations.AddField(
+            model_name='preprava',
+            name='cas_vykladky_od',
+            field=models.TimeField(blank=True, null=True, verbose_name='Čas vykládky od'),
+        ),
+        migrations.AddField(
+            model_name='preprava',
+            name='datum_nakladky',
+            field=models.DateField(blank=True, db_index=True, null=True, verbose_name='Datum nakládky'),
+        ),
+        migrations.AddField(
+            model_name='preprava',
+            name='datum_vykladky',
+            field=models.DateField(blank=True, db_index=True, null=True, verbose_name='Datum vykládky'),
+        ),
+    ]
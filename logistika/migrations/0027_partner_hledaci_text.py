@@ -0,0 +1,61 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:40
+
+import unicodedata
+
+from django.db import migrations, models
+
+HLEDANA_POLE = ['nazev', 'ic', 'dic', 'kontaktni_osoba', 'email', 'telefon']
+
+
+def _normalizovat(text):
+    rozlozeny = unicodedata.normalize('NFKD', text)
+    return ''.join(znak for znak in rozlozeny if not unicodedata.combining(znak)).casefold()
+
+
+def naplnit_hledaci_text(apps, schema_editor):
+    Partner = apps.get_model('logistika', 'Partner')
+    partneri = list(Partner.objects.all())
+    for partner in partneri:
+        partner.hledaci_text = _normalizovat(' '.join(str(getattr(partner, p)) for p in HLEDANA_POLE if getattr(partner, p)))
+    Partner.objects.bulk_update(partneri, ['hledaci_text'], batch_size=500)
+
+
+def vytvorit_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        schema_editor.execute(
+            'CREATE INDEX partner_hledaci_text_trgm ON logistika_partner USING gin (hledaci_text gin_trgm_ops)'
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE logistika_partner_fts USING fts5(hledaci_text, tokenize='trigram')"
+        )
+        schema_editor.execute(
+            'INSERT INTO logistika_partner_fts (rowid, hledaci_text) SELECT id, hledaci_text FROM logistika_partner'
+        )
+
+
+def odstranit_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS partner_hledaci_text_trgm')
+    elif vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS logistika_partner_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logistika', '0026_preprava_strukturovane_terminy'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='partner',
+            name='hledaci_text',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(naplnit_hledaci_text, migrations.RunPython.noop),
+        migrations.RunPython(vytvorit_index, odstranit_index),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:41
+
+import unicodedata
+
+from django.db import migrations, models
+
+HLEDANA_POLE = ['referencni_cislo', 'misto_nakladky', 'misto_vykladky', 'odesilatel_cmr', 'prijemce_cmr', 'popis_zbozi']
+
+
+def _normalizovat(text):
+    rozlozeny = unicodedata.normalize('NFKD', text)
+    return ''.join(znak for znak in rozlozeny if not unicodedata.combining(znak)).casefold()
+
+
+def naplnit_hledaci_text(apps, schema_editor):
+    Preprava = apps.get_model('logistika', 'Preprava')
+    davka = []
+    for preprava in Preprava.objects.select_related('zakaznik', 'dopravce').iterator(chunk_size=1000):
+        hodnoty = [getattr(preprava, p) for p in HLEDANA_POLE]
+        hodnoty += [preprava.zakaznik.nazev, preprava.dopravce.nazev if preprava.dopravce else '']
+        preprava.hledaci_text = _normalizovat(' '.join(h for h in hodnoty if h))
+        davka.append(preprava)
+        if len(davka) >= 1000:
+            Preprava.objects.bulk_update(davka, ['hledaci_text'])
+            davka = []
+    Preprava.objects.bulk_update(davka, ['hledaci_text'])
+
+
+def vytvorit_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        schema_editor.execute(
+            'CREATE INDEX preprava_hledaci_text_trgm ON logistika_preprava USING gin (hledaci_text gin_trgm_ops)'
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE logistika_preprava_fts USING fts5(hledaci_text, tokenize='trigram')"
+        )
+        schema_editor.execute(
+            'INSERT INTO logistika_preprava_fts (rowid, hledaci_text) SELECT id, hledaci_text FROM logistika_preprava'
+        )
+
+
+def odstranit_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS preprava_hledaci_text_trgm')
+    elif vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS logistika_preprava_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logistika', '0027_partner_hledaci_text'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='preprava',
+            name='hledaci_text',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(naplnit_hledaci_text, migrations.RunPython.noop),
+        migrations.RunPython(vytvorit_index, odstranit_index),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logistika', '0028_preprava_hledaci_text'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ObsahDokumentu',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('soubor', models.FileField(upload_to='dokumenty/%Y/%m/%d/')),
+                ('velikost', models.BigIntegerField()),
+                ('pocet_odkazu', models.PositiveIntegerField(default=0, verbose_name='Počet odkazů')),
+            ],
+            options={
+                'verbose_name': 'Obsah dokumentu',
+                'verbose_name_plural': 'Obsahy dokumentů',
+            },
+        ),
+        migrations.AddField(
+            model_name='dokument',
+            name='obsah',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='dokumenty', to='logistika.obsahdokumentu'),
+        ),
+    ]
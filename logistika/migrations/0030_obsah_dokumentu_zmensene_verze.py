@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logistika', '0029_obsah_dokumentu'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='obsahdokumentu',
+            name='nahled',
+            field=models.FileField(blank=True, upload_to='dokumenty/nahledy/%Y/%m/%d/', verbose_name='Náhled'),
+        ),
+        migrations.AddField(
+            model_name='obsahdokumentu',
+            name='zmenseny',
+            field=models.FileField(blank=True, upload_to='dokumenty/zmensene/%Y/%m/%d/', verbose_name='Zmenšená verze'),
+        ),
+        migrations.AddField(
+            model_name='obsahdokumentu',
+            name='zpracovano',
+            field=models.BooleanField(default=False, verbose_name='Zpracováno'),
+        ),
+    ]
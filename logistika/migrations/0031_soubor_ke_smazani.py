@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logistika', '0030_obsah_dokumentu_zmensene_verze'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SouborKeSmazani',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nazev', models.CharField(max_length=500)),
+                ('datum_zarazeni', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Soubor ke smazání',
+                'verbose_name_plural': 'Soubory ke smazání',
+            },
+        ),
+    ]
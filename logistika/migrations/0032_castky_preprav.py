@@ -0,0 +1,60 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:09
+
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+def naplnit_castky(apps, schema_editor):
+    Preprava = apps.get_model('logistika', 'Preprava')
+    davka = []
+    for p in Preprava.objects.iterator(chunk_size=2000):
+        hmotnost = Decimal(p.finalni_hmotnost_kg if p.finalni_hmotnost_kg is not None else p.odhadovana_hmotnost_kg)
+        cena, naklad = p.cena_za_tunu_zakaznik, p.naklad_za_tunu_dopravce
+        p.celkova_cena_zakaznik = cena * hmotnost / 1000 if cena is not None else Decimal('0')
+        p.celkovy_naklad_dopravce = naklad * hmotnost / 1000 if naklad is not None else Decimal('0')
+        if p.mena_zakaznik != p.mena_dopravce:
+            p.marze = None
+        elif cena is None or naklad is None:
+            p.marze = Decimal('0')
+        else:
+            p.marze = p.celkova_cena_zakaznik - p.celkovy_naklad_dopravce
+        davka.append(p)
+        if len(davka) >= 2000:
+            Preprava.objects.bulk_update(davka, ['celkova_cena_zakaznik', 'celkovy_naklad_dopravce', 'marze'])
+            davka = []
+    Preprava.objects.bulk_update(davka, ['celkova_cena_zakaznik', 'celkovy_naklad_dopravce', 'marze'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logistika', '0031_soubor_ke_smazani'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='preprava',
+            name='celkova_cena_zakaznik',
+            field=models.DecimalField(decimal_places=5, default=0, editable=False, max_digits=18, verbose_name='Celková cena pro zákazníka'),
+        ),
+        migrations.AddField(
+            model_name='preprava',
+            name='celkovy_naklad_dopravce',
+            field=models.DecimalField(decimal_places=5, default=0, editable=False, max_digits=18, verbose_name='Celkový náklad pro dopravce'),
+        ),
+        migrations.AddField(
+            model_name='preprava',
+            name='marze',
+            field=models.DecimalField(blank=True, decimal_places=5, editable=False, max_digits=18, null=True, verbose_name='Marže'),
+        ),
+        migrations.RunPython(naplnit_castky, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='preprava',
+            index=models.Index(fields=['marze'], name='preprava_marze_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='preprava',
+            index=models.Index(condition=models.Q(('marze__lt', 0)), fields=['datum_vytvoreni'], name='preprava_zaporna_marze_idx'),
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:13
+
+from collections import defaultdict
+from decimal import Decimal
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+REALIZOVANE_STAVY = ['planovana', 'probiha', 'dokoncena', 'fakturace', 'uzavrena']
+
+
+def prepocitat_denni_marze(apps, schema_editor):
+    # Nově se počítají i přepravy s různou měnou zákazníka a dopravce (počet, tržby, náklady)
+    Preprava = apps.get_model('logistika', 'Preprava')
+    DenniMarze = apps.get_model('logistika', 'DenniMarze')
+    tz = ZoneInfo(settings.BUSINESS_TIME_ZONE)
+    souhrn = defaultdict(lambda: [0, Decimal('0'), Decimal('0'), Decimal('0')])
+    for p in Preprava.objects.iterator(chunk_size=2000):
+        den = timezone.localtime(p.datum_vytvoreni, tz).date()
+        skupina = 'realizovane' if p.stav in REALIZOVANE_STAVY else 'ostatni'
+        zakaznik = souhrn[(den, p.mena_zakaznik, skupina)]
+        zakaznik[0] += 1
+        if p.marze is not None:
+            zakaznik[1] += p.marze
+        if p.cena_za_tunu_zakaznik is not None and p.naklad_za_tunu_dopravce is not None:
+            zakaznik[2] += p.celkova_cena_zakaznik
+            souhrn[(den, p.mena_dopravce, skupina)][3] += p.celkovy_naklad_dopravce
+    DenniMarze.objects.all().delete()
+    DenniMarze.objects.bulk_create(
+        DenniMarze(den=den, mena=mena, skupina=skupina, pocet_preprav=pocet, marze=marze, trzby=trzby, naklady=naklady)
+        for (den, mena, skupina), (pocet, marze, trzby, naklady) in souhrn.items()
+        if pocet or trzby or naklady
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logistika', '0032_castky_preprav'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dennimarze',
+            name='naklady',
+            field=models.DecimalField(decimal_places=5, default=0, max_digits=18),
+        ),
+        migrations.AddField(
+            model_name='dennimarze',
+            name='trzby',
+            field=models.DecimalField(decimal_places=5, default=0, max_digits=18),
+        ),
+        migrations.CreateModel(
+            name='KurzMeny',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('datum', models.DateField()),
+                ('mena', models.CharField(max_length=3)),
+                ('kurz', models.DecimalField(decimal_places=6, max_digits=18)),
+            ],
+            options={
+                'verbose_name': 'Kurz měny',
+                'verbose_name_plural': 'Kurzy měn',
+                'ordering': ['-datum', 'mena'],
+                'unique_together': {('mena', 'datum')},
+            },
+        ),
+        migrations.RunPython(prepocitat_denni_marze, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:18
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+REALIZOVANE_STAVY = ['planovana', 'probiha', 'dokoncena', 'fakturace', 'uzavrena']
+UZAVRENE_STAVY = ['uzavrena', 'neprodano']
+
+
+def naplnit_statistiky(apps, schema_editor):
+    Preprava = apps.get_model('logistika', 'Preprava')
+    Dokument = apps.get_model('logistika', 'Dokument')
+    StatistikaPartnera = apps.get_model('logistika', 'StatistikaPartnera')
+    statistiky = {}
+
+    def statistika(pk):
+        if pk not in statistiky:
+            statistiky[pk] = StatistikaPartnera(partner_id=pk, pocty_podle_stavu={})
+        return statistiky[pk]
+
+    def zapocitat(s, role, p):
+        pocty = s.pocty_podle_stavu.setdefault(role, {})
+        pocty[p.stav] = pocty.get(p.stav, 0) + 1
+        if s.posledni_preprava is None or p.datum_vytvoreni > s.posledni_preprava:
+            s.posledni_preprava = p.datum_vytvoreni
+
+    dokumenty = defaultdict(int)
+    for preprava_id in Dokument.objects.values_list('preprava_id', flat=True).iterator(chunk_size=2000):
+        dokumenty[preprava_id] += 1
+
+    for p in Preprava.objects.iterator(chunk_size=2000):
+        z = statistika(p.zakaznik_id)
+        z.pocet_preprav_zakaznik += 1
+        pole = f'trzby_{p.mena_zakaznik.lower()}'
+        setattr(z, pole, Decimal(getattr(z, pole)) + p.celkova_cena_zakaznik)
+        zapocitat(z, 'zakaznik', p)
+        if p.dopravce_id:
+            d = statistika(p.dopravce_id)
+            d.pocet_preprav_dopravce += 1
+            d.pocet_realizovanych_dopravce += p.stav in REALIZOVANE_STAVY
+            pole = f'naklady_{p.mena_dopravce.lower()}'
+            setattr(d, pole, Decimal(getattr(d, pole)) + p.celkovy_naklad_dopravce)
+            zapocitat(d, 'dopravce', p)
+        if p.stav not in UZAVRENE_STAVY:
+            for pk in {p.zakaznik_id, p.dopravce_id} - {None}:
+                statistika(pk).otevrene_dokumenty += dokumenty[p.pk]
+    StatistikaPartnera.objects.bulk_create(statistiky.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logistika', '0033_kurzy_men'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatistikaPartnera',
+            fields=[
+                ('partner', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='statistika', serialize=False, to='logistika.partner')),
+                ('pocet_preprav_zakaznik', models.IntegerField(default=0, verbose_name='Přeprav jako zákazník')),
+                ('pocet_preprav_dopravce', models.IntegerField(default=0, verbose_name='Přeprav jako dopravce')),
+                ('pocet_realizovanych_dopravce', models.IntegerField(default=0, verbose_name='Realizovaných přeprav jako dopravce')),
+                ('pocty_podle_stavu', models.JSONField(default=dict, verbose_name='Počty podle stavů')),
+                ('trzby_czk', models.DecimalField(decimal_places=5, default=0, max_digits=18, verbose_name='Tržby (Kč)')),
+                ('trzby_eur', models.DecimalField(decimal_places=5, default=0, max_digits=18, verbose_name='Tržby (€)')),
+                ('naklady_czk', models.DecimalField(decimal_places=5, default=0, max_digits=18, verbose_name='Náklady (Kč)')),
+                ('naklady_eur', models.DecimalField(decimal_places=5, default=0, max_digits=18, verbose_name='Náklady (€)')),
+                ('posledni_preprava', models.DateTimeField(blank=True, null=True, verbose_name='Poslední přeprava')),
+                ('otevrene_dokumenty', models.IntegerField(default=0, verbose_name='Dokumenty otevřených přeprav')),
+            ],
+            options={
+                'verbose_name': 'Statistika partnera',
+                'verbose_name_plural': 'Statistiky partnerů',
+                'indexes': [models.Index(fields=['-pocet_preprav_zakaznik'], name='statistika_zakaznik_idx'), models.Index(fields=['-pocet_realizovanych_dopravce'], name='statistika_dopravce_idx')],
+            },
+        ),
+        migrations.RunPython(naplnit_statistiky, migrations.RunPython.noop),
+    ]
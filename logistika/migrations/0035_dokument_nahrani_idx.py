@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logistika', '0034_statistika_partnera'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dokument',
+            index=models.Index(fields=['-datum_nahrani', '-id'], name='dokument_nahrani_id_idx'),
+        ),
+    ]
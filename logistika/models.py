@@ -1,7 +1,10 @@
-from django.db import models
+from django.db import connection, models, transaction
 from django.utils import timezone
 from decimal import Decimal
 
+from .terminy import parse_termin
+from .vyhledavani import sestavit_hledaci_text
+
 class Partner(models.Model):
     TYP_PARTNERA_CHOICES = [
         ('zakaznik', 'Zákazník'),
@@ -22,6 +25,10 @@ class Partner(models.Model):
     fakturacni_udaje = models.TextField(blank=True, verbose_name="Fakturační údaje")
     splatnost_faktur_dny = models.IntegerField(null=True, blank=True, verbose_name="Splatnost faktur (dní)")
     typ_partnera = models.CharField(max_length=20, choices=TYP_PARTNERA_CHOICES, verbose_name="Typ partnera")
+    # Normalizovaný text pro fulltextové hledání (viz logistika.vyhledavani)
+    hledaci_text = models.TextField(blank=True, editable=False)
+
+    HLEDANA_POLE = ['nazev', 'ic', 'dic', 'kontaktni_osoba', 'email', 'telefon']
 
     class Meta:
         verbose_name = 'Partner'
@@ -30,19 +37,214 @@ class Partner(models.Model):
     def __str__(self):
         return self.nazev
 
+    def aktualizovat_hledaci_text(self):
+        self.hledaci_text = sestavit_hledaci_text(*(getattr(self, pole) for pole in self.HLEDANA_POLE))
+
+    def save(self, *args, **kwargs):
+        self.aktualizovat_hledaci_text()
+        super().save(*args, **kwargs)
+
+class CiselnaRada(models.Model):
+    """Počítadlo referenčních čísel přeprav pro jeden rok."""
+
+    rok = models.IntegerField(primary_key=True)
+    posledni_cislo = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Číselná řada'
+        verbose_name_plural = 'Číselné řady'
+
+    def __str__(self):
+        return f"{self.rok}: {self.posledni_cislo}"
+
+    @staticmethod
+    def _nejvyssi_pouzite_cislo(rok):
+        # Jednorázově při založení řady navážeme na čísla vydaná před jejím zavedením
+        cisla = Preprava.objects.filter(referencni_cislo__startswith=f'JAFA-{rok}-').values_list('referencni_cislo', flat=True)
+        return max((int(c.rsplit('-', 1)[-1]) for c in cisla.iterator() if c.rsplit('-', 1)[-1].isdigit()), default=0)
+
+    @classmethod
+    def rezervovat(cls, rok, pocet=1):
+        """
+        Atomicky rezervuje `pocet` po sobě jdoucích čísel v řadě roku a vrátí první z nich.
+
+        Na PostgreSQL se řádek řady zamkne přes SELECT ... FOR UPDATE. SQLite
+        řádkové zámky nemá, proto nejprve provedeme prázdný UPDATE, kterým
+        transakce získá zápisový zámek databáze dřív, než hodnotu přečte.
+        """
+        with transaction.atomic():
+            if connection.vendor == 'sqlite':
+                cls.objects.filter(rok=rok).update(posledni_cislo=models.F('posledni_cislo'))
+            rada, _ = cls.objects.select_for_update().get_or_create(
+                rok=rok, defaults={'posledni_cislo': lambda: cls._nejvyssi_pouzite_cislo(rok)}
+            )
+            prvni = rada.posledni_cislo + 1
+            rada.posledni_cislo += pocet
+            rada.save(update_fields=['posledni_cislo'])
+        return prvni
+
+class ObsahDokumentu(models.Model):
+    """
+    Soubor v úložišti sdílený všemi dokumenty se stejným obsahem (podle SHA-256).
+
+    Soubor se smaže, až když zmizí poslední dokument, který na něj odkazuje.
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    soubor = models.FileField(upload_to='dokumenty/%Y/%m/%d/')
+    velikost = models.BigIntegerField()
+    pocet_odkazu = models.PositiveIntegerField(default=0, verbose_name="Počet odkazů")
+    # Zmenšená verze a náhled fotek (logistika.obrazky), vznikají na pozadí
+    zmenseny = models.FileField(upload_to='dokumenty/zmensene/%Y/%m/%d/', blank=True, verbose_name="Zmenšená verze")
+    nahled = models.FileField(upload_to='dokumenty/nahledy/%Y/%m/%d/', blank=True, verbose_name="Náhled")
+    zpracovano = models.BooleanField(default=False, verbose_name="Zpracováno")
+
+    class Meta:
+        verbose_name = 'Obsah dokumentu'
+        verbose_name_plural = 'Obsahy dokumentů'
+
+    def __str__(self):
+        return f'{self.sha256[:12]} ({self.pocet_odkazu}×)'
+
+    def nazvy_souboru(self):
+        """Všechny soubory obsahu v úložišti (originál i odvozené verze)."""
+        return [f.name for f in (self.soubor, self.zmenseny, self.nahled) if f]
+
+class SouborKeSmazani(models.Model):
+    """Soubor čekající na smazání z úložiště; maže se po dávkách (logistika.dokumenty.smazat_naplanovane)."""
+    nazev = models.CharField(max_length=500)
+    datum_zarazeni = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Soubor ke smazání'
+        verbose_name_plural = 'Soubory ke smazání'
+
+    def __str__(self):
+        return self.nazev
+
 class Dokument(models.Model):
     preprava = models.ForeignKey('Preprava', related_name='dokumenty', on_delete=models.CASCADE)
     nazev = models.CharField(max_length=200)
+    # Název souboru je shodný s obsah.soubor; dokumenty bez obsahu ještě nejsou deduplikované
     soubor = models.FileField(upload_to='dokumenty/%Y/%m/%d/')
+    obsah = models.ForeignKey(ObsahDokumentu, null=True, blank=True, editable=False, related_name='dokumenty', on_delete=models.PROTECT)
     datum_nahrani = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         verbose_name = 'Dokument'
         verbose_name_plural = 'Dokumenty'
+        indexes = [
+            # Řazení a rozsahy dnů v adminu (date_hierarchy)
+            models.Index(fields=['-datum_nahrani', '-id'], name='dokument_nahrani_id_idx'),
+        ]
 
     def __str__(self):
         return self.nazev
 
+    @property
+    def url_k_zobrazeni(self):
+        """Odkaz na zmenšenou verzi, pokud existuje, jinak na originál (vyžaduje načtený obsah)."""
+        if self.obsah and self.obsah.zmenseny:
+            return self.obsah.zmenseny.url
+        return self.soubor.url
+
+    @property
+    def url_nahledu(self):
+        if self.obsah and self.obsah.nahled:
+            return self.obsah.nahled.url
+        return None
+
+class PrepravaQuerySet(models.QuerySet):
+    """Udržuje uložené částky přeprav (celková cena, náklad, marže) a souhrny DenniMarze a StatistikaPartnera i při hromadných operacích."""
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.prepocitat_castky()
+        return super().bulk_create(objs, *args, **kwargs)
+
+    @staticmethod
+    def _ovlivnuje_souhrny(pole):
+        # Cizí klíče lze zadat i jako zakaznik_id / dopravce_id. Uložené částky (CASTKY_POLE)
+        # se z přeprav vždy dopočítají, jejich přímý zápis (i z prepocitat_castky) souhrny nemění.
+        pole = {Preprava._meta.get_field(nazev).name for nazev in pole}
+        zdroje = set(Preprava.SOUHRNY_POLE) - set(Preprava.CASTKY_POLE) | set(Preprava.CASTKY_ZDROJ)
+        return bool(pole & zdroje)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        # Django provádí bulk_update přes update() po dávkách, souhrny tedy upraví update()
+        if set(fields) & set(Preprava.CASTKY_ZDROJ):
+            objs = list(objs)
+            for obj in objs:
+                obj.prepocitat_castky()
+            fields = [*fields, *(pole for pole in Preprava.CASTKY_POLE if pole not in fields)]
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
+    def update(self, **kwargs):
+        if not self._ovlivnuje_souhrny(kwargs):
+            return super().update(**kwargs)
+        from .statistiky_partneru import klic_dokumentu, presunout_dokumenty
+
+        # Po UPDATE už filtr nemusí vybrat tytéž řádky a příspěvky do souhrnů
+        # závisí i na měnách, proto si řádky a jejich příspěvky zapamatujeme předem
+        with transaction.atomic():
+            puvodni, klice_dokumentu = {}, {}
+            for preprava in self.only('pk', *Preprava.SOUHRNY_POLE).iterator(chunk_size=2000):
+                puvodni[preprava.pk] = preprava.prispevky_do_souhrnu()
+                klice_dokumentu[preprava.pk] = klic_dokumentu(preprava)
+            pocet = super().update(**kwargs)
+            pks = list(puvodni)
+            for i in range(0, len(pks), 900):
+                Preprava.objects.filter(pk__in=pks[i:i + 900]).prepocitat_castky(puvodni_prispevky=puvodni)
+            # Dokumenty se počítají partnerům otevřených přeprav, změna stavu či partnera je přesouvá
+            presunout_dokumenty(klice_dokumentu)
+        return pocet
+
+    def prepocitat_castky(self, davka=2000, ulozit=True, puvodni_prispevky=None):
+        """
+        Přepočítá uložené částky vybraných přeprav po dávkách a vrátí počet přeprav,
+        u kterých se lišily. Změny se promítnou i do DenniMarze a StatistikaPartnera;
+        `puvodni_prispevky` (pk -> příspěvky) předává update(), který zdrojová pole už přepsal.
+        """
+        from .statistiky import pricist_denni_marze
+        from .statistiky_partneru import pricist_statistiky
+
+        def zapsat(zmenene, nove, puvodni):
+            if ulozit and (zmenene or nove):
+                with transaction.atomic():
+                    Preprava.objects.bulk_update(zmenene, Preprava.CASTKY_POLE)
+                    pricist_denni_marze((n[0] for n in nove), odecist=(p[0] for p in puvodni))
+                    pricist_statistiky((n[1] for n in nove), odecist=(p[1] for p in puvodni))
+
+        zmenene, nove, puvodni, pocet = [], [], [], 0
+        prepravy = self.only('pk', *Preprava.SOUHRNY_POLE, *Preprava.CASTKY_ZDROJ, *Preprava.CASTKY_POLE)
+        for preprava in prepravy.iterator(chunk_size=davka):
+            pred = [getattr(preprava, pole) for pole in Preprava.CASTKY_POLE]
+            if puvodni_prispevky is not None:
+                puvodni_prispevek = puvodni_prispevky.get(preprava.pk, ({}, {}))
+            else:
+                puvodni_prispevek = preprava.prispevky_do_souhrnu()
+            preprava.prepocitat_castky()
+            if [getattr(preprava, pole) for pole in Preprava.CASTKY_POLE] != pred:
+                pocet += 1
+                zmenene.append(preprava)
+            novy_prispevek = preprava.prispevky_do_souhrnu()
+            if novy_prispevek != puvodni_prispevek:
+                nove.append(novy_prispevek)
+                puvodni.append(puvodni_prispevek)
+            if len(zmenene) >= davka or len(nove) >= davka:
+                zapsat(zmenene, nove, puvodni)
+                zmenene, nove, puvodni = [], [], []
+        zapsat(zmenene, nove, puvodni)
+        return pocet
+
+    def se_zapornou_marzi(self):
+        """Přepravy se zápornou marží (částečný index preprava_zaporna_marze_idx)."""
+        return self.filter(marze__lt=0)
+
+    def podle_marze(self):
+        return self.filter(marze__isnull=False).order_by('-marze')
+
+
 class Preprava(models.Model):
     TYP_VOZIDLA_CHOICES = [
         ('SKL', 'Sklápěč'),
@@ -65,13 +267,22 @@ class Preprava(models.Model):
         ('neprodano', 'Neprodáno'),
     ]
 
+    # Stavy, od kterých se přeprava počítá jako realizovaná (marže, statistiky)
+    REALIZOVANE_STAVY = ['planovana', 'probiha', 'dokoncena', 'fakturace', 'uzavrena']
+
     referencni_cislo = models.CharField(max_length=50, unique=True, blank=True)
     zakaznik = models.ForeignKey(Partner, on_delete=models.PROTECT, related_name='prepravy_zakaznik', limit_choices_to={'typ_partnera__in': ['zakaznik', 'zakaznik_dopravce']})
     dopravce = models.ForeignKey(Partner, on_delete=models.PROTECT, related_name='prepravy_dopravce', null=True, blank=True, limit_choices_to={'typ_partnera__in': ['dopravce', 'zakaznik_dopravce']})
     misto_nakladky = models.TextField()
     datum_cas_nakladky = models.CharField(max_length=50, verbose_name="Datum a čas nakládky")
+    datum_nakladky = models.DateField(null=True, blank=True, db_index=True, verbose_name="Datum nakládky")
+    cas_nakladky_od = models.TimeField(null=True, blank=True, verbose_name="Čas nakládky od")
+    cas_nakladky_do = models.TimeField(null=True, blank=True, verbose_name="Čas nakládky do")
     misto_vykladky = models.TextField()
     datum_cas_vykladky = models.CharField(max_length=50, verbose_name="Datum a čas vykládky")
+    datum_vykladky = models.DateField(null=True, blank=True, db_index=True, verbose_name="Datum vykládky")
+    cas_vykladky_od = models.TimeField(null=True, blank=True, verbose_name="Čas vykládky od")
+    cas_vykladky_do = models.TimeField(null=True, blank=True, verbose_name="Čas vykládky do")
     odesilatel_cmr = models.TextField(blank=True, verbose_name="Odesílatel CMR")
     prijemce_cmr = models.TextField(blank=True, verbose_name="Příjemce CMR")
     popis_zbozi = models.TextField()
@@ -86,38 +297,93 @@ class Preprava(models.Model):
     mena_dopravce = models.CharField(max_length=3, choices=MENA_CHOICES, default='CZK', verbose_name="Měna (dopravce)")
     stav = models.CharField(max_length=20, choices=STAV_CHOICES, default='nova')
     datum_vytvoreni = models.DateTimeField(auto_now_add=True)
-    @property
-    def celkova_cena_zakaznik(self):
-        hmotnost_t = (self.finalni_hmotnost_kg or self.odhadovana_hmotnost_kg) / 1000
-        if self.cena_za_tunu_zakaznik and hmotnost_t > 0:
-            return self.cena_za_tunu_zakaznik * Decimal(hmotnost_t)
-        return Decimal('0.00')
+    # Normalizovaný text pro fulltextové hledání včetně jmen zákazníka a dopravce (viz logistika.vyhledavani)
+    hledaci_text = models.TextField(blank=True, editable=False)
+    # Částky přesně (cena za tunu × kg / 1000), udržované v prepocitat_castky(), aby šly řadit, filtrovat a sčítat v SQL
+    celkova_cena_zakaznik = models.DecimalField(max_digits=18, decimal_places=5, default=0, editable=False, verbose_name="Celková cena pro zákazníka")
+    celkovy_naklad_dopravce = models.DecimalField(max_digits=18, decimal_places=5, default=0, editable=False, verbose_name="Celkový náklad pro dopravce")
+    # Prázdná, pokud se měna zákazníka a dopravce liší
+    marze = models.DecimalField(max_digits=18, decimal_places=5, null=True, blank=True, editable=False, verbose_name="Marže")
 
-    @property
-    def celkovy_naklad_dopravce(self):
-        hmotnost_t = (self.finalni_hmotnost_kg or self.odhadovana_hmotnost_kg) / 1000
-        if self.naklad_za_tunu_dopravce and hmotnost_t > 0:
-            return self.naklad_za_tunu_dopravce * Decimal(hmotnost_t)
-        return Decimal('0.00')
+    objects = PrepravaQuerySet.as_manager()
 
+    HLEDANA_POLE = ['referencni_cislo', 'misto_nakladky', 'misto_vykladky', 'odesilatel_cmr', 'prijemce_cmr', 'popis_zbozi']
+    # Sloupce, ze kterých se počítají uložené částky, a samotné uložené částky
+    CASTKY_ZDROJ = ['cena_za_tunu_zakaznik', 'naklad_za_tunu_dopravce', 'finalni_hmotnost_kg', 'odhadovana_hmotnost_kg', 'mena_zakaznik', 'mena_dopravce']
+    CASTKY_POLE = ['celkova_cena_zakaznik', 'celkovy_naklad_dopravce', 'marze']
 
-    @property
-    def marze(self):
-        if self.celkova_cena_zakaznik and self.celkovy_naklad_dopravce:
-            return self.celkova_cena_zakaznik - self.celkovy_naklad_dopravce
-        return Decimal('0.00')
+    # Sloupce, ze kterých se počítají příspěvky do DenniMarze a StatistikaPartnera
+    SOUHRNY_POLE = [
+        'datum_vytvoreni', 'stav', 'zakaznik', 'dopravce', 'mena_zakaznik', 'mena_dopravce', 'cena_za_tunu_zakaznik',
+        'naklad_za_tunu_dopravce', 'celkova_cena_zakaznik', 'celkovy_naklad_dopravce', 'marze',
+    ]
+
+    def prispevky_do_souhrnu(self):
+        """Dvojice (příspěvek do DenniMarze, příspěvek do StatistikaPartnera) bez dokumentů."""
+        from . import statistiky, statistiky_partneru
+
+        return statistiky.prispevek(self), statistiky_partneru.prispevek(self)
+
+    def prepocitat_castky(self):
+        """
+        Spočítá celkovou cenu, náklad a marži v přesné desítkové aritmetice.
+
+        Hmotnost je finální, nebo (dokud není známa) odhadovaná. Chybí-li
+        některá z cen za tunu, je marže nulová; při různých měnách prázdná.
+        """
+        hmotnost = Decimal(self.finalni_hmotnost_kg if self.finalni_hmotnost_kg is not None else self.odhadovana_hmotnost_kg)
+        cena, naklad = self.cena_za_tunu_zakaznik, self.naklad_za_tunu_dopravce
+        self.celkova_cena_zakaznik = Decimal(cena) * hmotnost / 1000 if cena is not None else Decimal('0')
+        self.celkovy_naklad_dopravce = Decimal(naklad) * hmotnost / 1000 if naklad is not None else Decimal('0')
+        if self.mena_zakaznik != self.mena_dopravce:
+            self.marze = None
+        elif cena is None or naklad is None:
+            self.marze = Decimal('0')
+        else:
+            self.marze = self.celkova_cena_zakaznik - self.celkovy_naklad_dopravce
+
+    @staticmethod
+    def format_referencni_cislo(rok, cislo):
+        return f'JAFA-{rok}-{cislo:04d}'
+
+    @classmethod
+    def rezervovat_referencni_cisla(cls, pocet, rok=None):
+        """Rezervuje blok referenčních čísel jedním zápisem do CiselnaRada (např. pro hromadný import)."""
+        rok = rok or timezone.now().year
+        prvni = CiselnaRada.rezervovat(rok, pocet)
+        return [cls.format_referencni_cislo(rok, cislo) for cislo in range(prvni, prvni + pocet)]
+
+    def aktualizovat_hledaci_text(self):
+        self.hledaci_text = sestavit_hledaci_text(
+            *(getattr(self, pole) for pole in self.HLEDANA_POLE),
+            self.zakaznik.nazev if self.zakaznik_id else '',
+            self.dopravce.nazev if self.dopravce_id else '',
+        )
+
+    def doplnit_terminy(self):
+        """Doplní chybějící strukturované termíny z volného textu datum_cas_nakladky/vykladky."""
+        reference = self.datum_vytvoreni.date() if self.datum_vytvoreni else None
+        zmeneno = False
+        for typ in ('nakladky', 'vykladky'):
+            if getattr(self, f'datum_{typ}') is not None:
+                continue
+            termin = parse_termin(getattr(self, f'datum_cas_{typ}'), reference)
+            if termin:
+                setattr(self, f'datum_{typ}', termin.datum)
+                setattr(self, f'cas_{typ}_od', termin.cas_od)
+                setattr(self, f'cas_{typ}_do', termin.cas_do)
+                zmeneno = True
+        return zmeneno
 
     def save(self, *args, **kwargs):
         if not self.referencni_cislo:
-            rok = timezone.now().year
-            posledni_preprava = Preprava.objects.filter(referencni_cislo__startswith=f'JAFA-{rok}').order_by('referencni_cislo').last()
-            if posledni_preprava:
-                posledni_cislo = int(posledni_preprava.referencni_cislo.split('-')[-1])
-                nove_cislo = posledni_cislo + 1
-            else:
-                nove_cislo = 1
-            self.referencni_cislo = f'JAFA-{rok}-{nove_cislo:04d}'
-        super().save(*args, **kwargs)
+            self.referencni_cislo = self.rezervovat_referencni_cisla(1)[0]
+        self.doplnit_terminy()
+        self.aktualizovat_hledaci_text()
+        self.prepocitat_castky()
+        # Souhrny (DenniMarze, StatistikaPartnera) se upravují v signálech ve stejné transakci
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
     def get_stav_badge_class(self):
         if self.stav == 'nova':
@@ -139,6 +405,14 @@ class Preprava(models.Model):
     class Meta:
         verbose_name = 'Přeprava'
         verbose_name_plural = 'Přepravy'
+        indexes = [
+            # Klíč pro stránkování seznamu přeprav (viz logistika.pagination)
+            models.Index(fields=['-datum_vytvoreni', '-id'], name='preprava_vytvoreni_id_idx'),
+            models.Index(fields=['stav', 'datum_vytvoreni'], name='preprava_stav_vytvoreni_idx'),
+            # Žebříčky podle marže a přepravy se ztrátou
+            models.Index(fields=['marze'], name='preprava_marze_idx'),
+            models.Index(fields=['datum_vytvoreni'], condition=models.Q(marze__lt=0), name='preprava_zaporna_marze_idx'),
+        ]
 
     def __str__(self):
         return self.referencni_cislo
@@ -158,3 +432,83 @@ class Holiday(models.Model):
 
     def __str__(self):
         return f"{self.date} - {self.name} ({self.country_code})"
+
+
+class DenniMarze(models.Model):
+    """Denní souhrn marží přeprav (den × měna × skupina stavů), udržovaný průběžně."""
+
+    SKUPINA_CHOICES = [
+        ('realizovane', 'Realizované'),
+        ('ostatni', 'Ostatní'),
+    ]
+
+    den = models.DateField()
+    mena = models.CharField(max_length=3, choices=Preprava.MENA_CHOICES)
+    skupina = models.CharField(max_length=20, choices=SKUPINA_CHOICES)
+    pocet_preprav = models.IntegerField(default=0)
+    marze = models.DecimalField(max_digits=18, decimal_places=5, default=0)
+    # Tržby a náklady v měně řádku včetně přeprav s různou měnou zákazníka a dopravce;
+    # slouží k přepočtu marže do jedné měny (statistiky.marze_ve_mene)
+    trzby = models.DecimalField(max_digits=18, decimal_places=5, default=0)
+    naklady = models.DecimalField(max_digits=18, decimal_places=5, default=0)
+
+    class Meta:
+        verbose_name = 'Denní marže'
+        verbose_name_plural = 'Denní marže'
+        unique_together = ('den', 'mena', 'skupina')
+
+    @staticmethod
+    def skupina_pro_stav(stav):
+        return 'realizovane' if stav in Preprava.REALIZOVANE_STAVY else 'ostatni'
+
+    def __str__(self):
+        return f"{self.den} {self.mena} {self.skupina}: {self.marze}"
+
+
+class KurzMeny(models.Model):
+    """Denní kurz ČNB: kolik Kč stojí jedna jednotka měny (kurz ČNB vydělený množstvím)."""
+
+    datum = models.DateField()
+    mena = models.CharField(max_length=3)
+    kurz = models.DecimalField(max_digits=18, decimal_places=6)
+
+    class Meta:
+        verbose_name = 'Kurz měny'
+        verbose_name_plural = 'Kurzy měn'
+        # Pořadí sloupců odpovídá dotazu "poslední kurz měny k danému dni"
+        unique_together = ('mena', 'datum')
+        ordering = ['-datum', 'mena']
+
+    def __str__(self):
+        return f"{self.datum} {self.mena}: {self.kurz}"
+
+
+class StatistikaPartnera(models.Model):
+    """
+    Průběžně udržované počty a součty přeprav partnera pro dashboard, seznamy
+    partnerů a admin (viz logistika.statistiky_partneru).
+    """
+
+    partner = models.OneToOneField(Partner, primary_key=True, related_name='statistika', on_delete=models.CASCADE)
+    pocet_preprav_zakaznik = models.IntegerField(default=0, verbose_name="Přeprav jako zákazník")
+    pocet_preprav_dopravce = models.IntegerField(default=0, verbose_name="Přeprav jako dopravce")
+    pocet_realizovanych_dopravce = models.IntegerField(default=0, verbose_name="Realizovaných přeprav jako dopravce")
+    # {"zakaznik": {"nova": 3, ...}, "dopravce": {"planovana": 1, ...}}
+    pocty_podle_stavu = models.JSONField(default=dict, verbose_name="Počty podle stavů")
+    trzby_czk = models.DecimalField(max_digits=18, decimal_places=5, default=0, verbose_name="Tržby (Kč)")
+    trzby_eur = models.DecimalField(max_digits=18, decimal_places=5, default=0, verbose_name="Tržby (€)")
+    naklady_czk = models.DecimalField(max_digits=18, decimal_places=5, default=0, verbose_name="Náklady (Kč)")
+    naklady_eur = models.DecimalField(max_digits=18, decimal_places=5, default=0, verbose_name="Náklady (€)")
+    posledni_preprava = models.DateTimeField(null=True, blank=True, verbose_name="Poslední přeprava")
+    otevrene_dokumenty = models.IntegerField(default=0, verbose_name="Dokumenty otevřených přeprav")
+
+    class Meta:
+        verbose_name = 'Statistika partnera'
+        verbose_name_plural = 'Statistiky partnerů'
+        indexes = [
+            models.Index(fields=['-pocet_preprav_zakaznik'], name='statistika_zakaznik_idx'),
+            models.Index(fields=['-pocet_realizovanych_dopravce'], name='statistika_dopravce_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.partner_id}: {self.pocet_preprav_zakaznik}/{self.pocet_preprav_dopravce}"
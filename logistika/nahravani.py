@@ -0,0 +1,139 @@
+"""
+Přímé nahrávání dokumentů z prohlížeče do S3 přes presigned URL.
+
+Průběh: zahajit_nahravani() vyhradí název souboru a vrátí podepsané URL
+(jedno pro PUT, u velkých souborů po jednom pro každou část multipart
+uploadu). Prohlížeč nahraje data rovnou do úložiště a zavolá
+dokoncit_nahravani(), která objekt v úložišti ověří a teprve pak vytvoří
+záznam Dokument. Gunicorn worker tak data souboru vůbec nepřenáší.
+
+Bucket musí povolit CORS pro PUT z domény aplikace a vystavit hlavičku ETag.
+Nedokončené multipart uploady je vhodné mazat pravidlem životního cyklu bucketu.
+"""
+import math
+import posixpath
+
+from django.core import signing
+from django.core.files.storage import default_storage
+
+from .models import Dokument
+
+# Soubory nad tuto velikost se nahrávají po částech (multipart upload)
+MULTIPART_OD = 32 * 1024 * 1024
+VELIKOST_CASTI = 16 * 1024 * 1024
+
+PLATNOST_URL = 60 * 60
+PLATNOST_TOKENU = 24 * 60 * 60
+_SALT = 'logistika.nahravani'
+
+
+class ChybaNahravani(Exception):
+    pass
+
+
+def prime_nahravani_dostupne():
+    """Přímé nahrávání umí jen S3 úložiště (django-storages S3Boto3Storage)."""
+    return hasattr(default_storage, 'bucket_name') and hasattr(default_storage, 'connection')
+
+
+def _klient():
+    return default_storage.connection.meta.client
+
+
+def _klic_v_bucketu(nazev):
+    return posixpath.join(default_storage.location, nazev) if default_storage.location else nazev
+
+
+def zahajit_nahravani(preprava, nazev, nazev_souboru, velikost, content_type):
+    """
+    Vyhradí název souboru pro nový dokument a vrátí instrukce pro prohlížeč.
+
+    Výsledek obsahuje podepsaný `token`, který se předává do dokoncit_nahravani(),
+    a buď `url` pro jeden PUT, nebo `casti` se seznamem URL pro multipart upload.
+    Podepsané URL pro PUT platí jen s přesně těmi hlavičkami, které vrací
+    `hlavicky`; prohlížeč je musí poslat beze změny. Prázdný `content_type`
+    se nepodepisuje, protože prohlížeč pak hlavičku Content-Type neposílá.
+    """
+    pole = Dokument._meta.get_field('soubor')
+    soubor = default_storage.get_available_name(pole.generate_filename(None, nazev_souboru), max_length=pole.max_length)
+    klic = _klic_v_bucketu(soubor)
+    bucket = default_storage.bucket_name
+    klient = _klient()
+
+    data = {'preprava': preprava.pk, 'nazev': nazev, 'soubor': soubor, 'velikost': velikost}
+    parametry = {'Bucket': bucket, 'Key': klic}
+    hlavicky = {}
+    if content_type:
+        parametry['ContentType'] = hlavicky['Content-Type'] = content_type
+    if velikost <= MULTIPART_OD:
+        url = klient.generate_presigned_url('put_object', Params=parametry, ExpiresIn=PLATNOST_URL)
+        return {'token': signing.dumps(data, salt=_SALT), 'url': url, 'hlavicky': hlavicky}
+
+    # Content-Type patří k celému objektu a zadává se při založení uploadu, části se posílají bez něj
+    upload_id = klient.create_multipart_upload(**parametry)['UploadId']
+    data['upload_id'] = upload_id
+    casti = [
+        klient.generate_presigned_url(
+            'upload_part',
+            Params={'Bucket': bucket, 'Key': klic, 'UploadId': upload_id, 'PartNumber': cislo},
+            ExpiresIn=PLATNOST_URL,
+        )
+        for cislo in range(1, math.ceil(velikost / VELIKOST_CASTI) + 1)
+    ]
+    return {'token': signing.dumps(data, salt=_SALT), 'casti': casti, 'velikost_casti': VELIKOST_CASTI, 'hlavicky': {}}
+
+
+def _nacist_token(preprava, token):
+    try:
+        data = signing.loads(token, salt=_SALT, max_age=PLATNOST_TOKENU)
+    except signing.BadSignature:
+        raise ChybaNahravani('Neplatný nebo prošlý token nahrávání.')
+    if data['preprava'] != preprava.pk:
+        raise ChybaNahravani('Token patří k jiné přepravě.')
+    return data
+
+
+def dokoncit_nahravani(preprava, token, casti=None):
+    """
+    Dokončí nahrávání a vytvoří Dokument, pokud objekt v úložišti existuje a má ohlášenou velikost.
+
+    `casti` je u multipart uploadu seznam ETagů jednotlivých částí v pořadí.
+    """
+    data = _nacist_token(preprava, token)
+    klic = _klic_v_bucketu(data['soubor'])
+    bucket = default_storage.bucket_name
+    klient = _klient()
+
+    if 'upload_id' in data:
+        if not casti:
+            raise ChybaNahravani('Chybí seznam nahraných částí.')
+        try:
+            klient.complete_multipart_upload(
+                Bucket=bucket,
+                Key=klic,
+                UploadId=data['upload_id'],
+                MultipartUpload={'Parts': [{'PartNumber': i, 'ETag': etag} for i, etag in enumerate(casti, start=1)]},
+            )
+        except klient.exceptions.ClientError as e:
+            raise ChybaNahravani(f'Multipart upload se nepodařilo dokončit: {e}')
+
+    try:
+        hlavicka = klient.head_object(Bucket=bucket, Key=klic)
+    except klient.exceptions.ClientError:
+        raise ChybaNahravani('Soubor v úložišti nebyl nalezen.')
+    if hlavicka['ContentLength'] != data['velikost']:
+        raise ChybaNahravani('Velikost nahraného souboru neodpovídá.')
+
+    dokument, _ = Dokument.objects.get_or_create(
+        preprava=preprava, soubor=data['soubor'], defaults={'nazev': data['nazev']},
+    )
+    return dokument
+
+
+def zrusit_nahravani(preprava, token):
+    """Zruší nedokončený multipart upload, aby v bucketu nezůstaly jeho části."""
+    data = _nacist_token(preprava, token)
+    if 'upload_id' in data:
+        _klient().abort_multipart_upload(
+            Bucket=default_storage.bucket_name, Key=_klic_v_bucketu(data['soubor']), UploadId=data['upload_id'],
+        )
@@ -0,0 +1,60 @@
+"""
+Zmenšené verze nahraných fotek a skenů.
+
+Fotky dokladů z telefonů mají často 5–10 MB. Pro zobrazení v aplikaci se
+z nich na pozadí (úloha logistika.zpracovat_obsah) vyrobí zmenšená verze
+a malý náhled; originál zůstává beze změny. Pillow se načítá až při
+zpracování, ne při startu aplikace.
+"""
+import io
+import posixpath
+
+from django.core.files.base import ContentFile
+
+PRIPONY_OBRAZKU = {'.jpg', '.jpeg', '.png', '.webp', '.tif', '.tiff', '.bmp'}
+
+MAX_ROZMER = 2000
+KVALITA = 80
+ROZMER_NAHLEDU = 320
+KVALITA_NAHLEDU = 70
+
+
+def je_obrazek(nazev):
+    return posixpath.splitext(nazev)[1].lower() in PRIPONY_OBRAZKU
+
+
+def _jpeg(obrazek, rozmer, kvalita):
+    from PIL import Image
+
+    kopie = obrazek.copy()
+    kopie.thumbnail((rozmer, rozmer), Image.Resampling.LANCZOS)
+    buf = io.BytesIO()
+    kopie.save(buf, 'JPEG', quality=kvalita, optimize=True, progressive=True)
+    return buf.getvalue()
+
+
+def zmensit(soubor, velikost_originalu):
+    """
+    Z otevřeného obrázku vyrobí (zmenšená verze, náhled) jako ContentFile.
+
+    Zmenšená verze je None, pokud by nebyla menší než originál. Soubor,
+    který Pillow nepřečte (poškozený nebo nepodporovaný formát), vrátí (None, None).
+    """
+    from PIL import Image, ImageOps
+
+    try:
+        with Image.open(soubor) as obrazek:
+            # U JPEG nechá dekodér obrázek rovnou zmenšit, což šetří paměť i čas
+            obrazek.draft('RGB', (MAX_ROZMER, MAX_ROZMER))
+            obrazek = ImageOps.exif_transpose(obrazek)
+            if obrazek.mode != 'RGB':
+                obrazek = obrazek.convert('RGB')
+            zmenseny = _jpeg(obrazek, MAX_ROZMER, KVALITA)
+            nahled = _jpeg(obrazek, ROZMER_NAHLEDU, KVALITA_NAHLEDU)
+    except (OSError, Image.DecompressionBombError):
+        return None, None
+
+    return (
+        ContentFile(zmenseny) if len(zmenseny) < velikost_originalu else None,
+        ContentFile(nahled),
+    )
@@ -0,0 +1,122 @@
+import base64
+import json
+from datetime import datetime
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+# Od kolika řádků odhadu se OdhadovanyPaginator spokojí s odhadem místo COUNT(*)
+PRAH_PRESNEHO_POCTU = 10000
+
+
+class KeysetPage:
+    """Jedna stránka výsledku stránkovaného podle klíče (datum_vytvoreni, id)."""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+def encode_cursor(obj):
+    raw = f'{obj.datum_vytvoreni.isoformat()}|{obj.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Vrátí dvojici (datum_vytvoreni, pk), případně None pro neplatný kurzor."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        datum, pk = raw.split('|')
+        return datetime.fromisoformat(datum), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def keyset_page(queryset, cursor=None, per_page=50):
+    """
+    Vrátí stránku záznamů seřazených od nejnovějších podle (datum_vytvoreni, id).
+
+    Kurzor má tvar "a<token>" (záznamy za tokenem) nebo "b<token>" (záznamy
+    před tokenem). Dotaz vždy čte nejvýše per_page + 1 řádků z indexu, takže
+    cena stránky nezávisí na velikosti tabulky ani na tom, jak hluboko jsme.
+    """
+    smer, klic = 'a', None
+    if cursor and cursor[0] in 'ab':
+        smer, klic = cursor[0], decode_cursor(cursor[1:])
+
+    if klic is None:
+        smer = 'a'
+        rows = list(queryset.order_by('-datum_vytvoreni', '-id')[:per_page + 1])
+        ma_dalsi, ma_predchozi = len(rows) > per_page, False
+        rows = rows[:per_page]
+    elif smer == 'a':
+        datum, pk = klic
+        rows = list(
+            queryset.filter(Q(datum_vytvoreni__lt=datum) | Q(datum_vytvoreni=datum, id__lt=pk))
+            .order_by('-datum_vytvoreni', '-id')[:per_page + 1]
+        )
+        ma_dalsi, ma_predchozi = len(rows) > per_page, True
+        rows = rows[:per_page]
+    else:
+        datum, pk = klic
+        rows = list(
+            queryset.filter(Q(datum_vytvoreni__gt=datum) | Q(datum_vytvoreni=datum, id__gt=pk))
+            .order_by('datum_vytvoreni', 'id')[:per_page + 1]
+        )
+        ma_dalsi, ma_predchozi = True, len(rows) > per_page
+        rows = rows[:per_page][::-1]
+
+    next_cursor = 'a' + encode_cursor(rows[-1]) if rows and ma_dalsi else None
+    previous_cursor = 'b' + encode_cursor(rows[0]) if rows and ma_predchozi else None
+    return KeysetPage(rows, next_cursor, previous_cursor)
+
+
+def odhad_poctu(queryset):
+    """Počet řádků dotazu podle odhadu plánovače PostgreSQL (EXPLAIN), bez čtení tabulky."""
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class OdhadovanyPaginator(Paginator):
+    """
+    Paginator pro admin nad velkými tabulkami.
+
+    Na PostgreSQL nejdřív zjistí odhad počtu řádků z plánovače; přesahuje-li
+    PRAH_PRESNEHO_POCTU, použije ho místo COUNT(*), který by musel projít celou
+    tabulku. Menší výsledky (typicky po filtrování) a ostatní databáze se
+    počítají přesně. Počet stránek je pak jen přibližný, což u tisíců
+    stránek v adminu nevadí.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if hasattr(queryset, 'query') and connections[queryset.db].vendor == 'postgresql':
+            odhad = odhad_poctu(queryset)
+            if odhad > PRAH_PRESNEHO_POCTU:
+                return odhad
+        return super().count
@@ -0,0 +1,280 @@
+"""
+Generování PDF podkladů k přepravě.
+
+Vykreslení je rozdělené na dva kroky: data_podkladu() z přepravy vytáhne
+prosté hodnoty (bez přístupu k DB) a vykreslit_podklady_pdf() z nich vyrobí
+PDF. Díky tomu lze vykreslování pustit v oddělených procesech.
+"""
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import posixpath
+import zipfile
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import cache
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+FONTS_DIR = os.path.join(os.path.dirname(__file__), 'static', 'fonts')
+
+
+# Zvyšte při změně vzhledu podkladů, aby se zneplatnily uložené PDF v cache
+VERZE_PODKLADU = 1
+
+CACHE_ADRESAR = 'podklady_cache'
+
+
+def nazev_souboru(data):
+    return f"podklady_{data['referencni_cislo']}.pdf"
+
+
+def data_podkladu(preprava):
+    """Vrátí hodnoty, které se tisknou do podkladů (přeprava musí mít načteného zákazníka i dopravce)."""
+    dopravce = preprava.dopravce
+    zakaznik = preprava.zakaznik
+    return {
+        'referencni_cislo': preprava.referencni_cislo,
+        'preprava': {
+            "Místo nakládky": preprava.misto_nakladky,
+            "Datum a čas nakládky": preprava.datum_cas_nakladky,
+            "Místo vykládky": preprava.misto_vykladky,
+            "Datum a čas vykládky": preprava.datum_cas_vykladky,
+            "Zboží": preprava.popis_zbozi,
+            "Typ vozidla": preprava.get_typ_vozidla_display(),
+            "Odhadovaná hmotnost": f"{preprava.odhadovana_hmotnost_kg} kg",
+            "Finální hmotnost": f"{preprava.finalni_hmotnost_kg} kg" if preprava.finalni_hmotnost_kg else "-",
+        },
+        'dopravce': {
+            "Dopravce": dopravce.nazev if dopravce else "NEPŘIŘAZEN",
+            "Kontaktní osoba": dopravce.kontaktni_osoba if dopravce else "-",
+            "Telefon": dopravce.telefon if dopravce else "-",
+            "E-mail": dopravce.email if dopravce else "-",
+            "Náklad za tunu": f"{preprava.naklad_za_tunu_dopravce} {preprava.get_mena_dopravce_display()}" if preprava.naklad_za_tunu_dopravce else "-",
+            "Celkový náklad": f"{preprava.celkovy_naklad_dopravce:.2f} {preprava.get_mena_dopravce_display()}" if preprava.celkovy_naklad_dopravce else "-",
+        },
+        'zakaznik': {
+            "Zákazník": zakaznik.nazev,
+            "IČ": zakaznik.ic,
+            "DIČ": zakaznik.dic,
+            "Fakturační údaje": zakaznik.fakturacni_udaje or zakaznik.adresa,
+            "Splatnost faktur (dní)": zakaznik.splatnost_faktur_dny or "-",
+            "Cena za tunu": f"{preprava.cena_za_tunu_zakaznik} {preprava.get_mena_zakaznik_display()}",
+            "Celková cena": f"{preprava.celkova_cena_zakaznik:.2f} {preprava.get_mena_zakaznik_display()}",
+        },
+    }
+
+
+@cache
+def _zaregistrovat_fonty():
+    """
+    Načte ReportLab a zaregistruje font podporující diakritiku.
+
+    Děje se to až při prvním vykreslení a jen jednou za proces; import
+    aplikace (gunicorn worker, manage.py příkazy) tak ReportLab ani TTF
+    soubory vůbec nenačítá.
+    """
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    pdfmetrics.registerFont(TTFont('DejaVu', os.path.join(FONTS_DIR, 'DejaVuSans.ttf')))
+    pdfmetrics.registerFont(TTFont('DejaVu-Bold', os.path.join(FONTS_DIR, 'DejaVuSans-Bold.ttf')))
+
+
+def vykreslit_podklady_pdf(data):
+    """Vykreslí podklady z výsledku data_podkladu() a vrátí obsah PDF."""
+    _zaregistrovat_fonty()
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.units import inch
+    from reportlab.pdfgen import canvas
+
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf, pagesize=letter)
+    c.setFont('DejaVu', 10)
+
+    # Výška stránky
+    height = letter[1]
+
+    # --- Helper funkce pro kreslení --- #
+    def draw_section(title, data, y_start):
+        c.setFont("DejaVu-Bold", 16)
+        c.drawString(inch, y_start, title)
+        c.line(inch, y_start - 5, letter[0] - inch, y_start - 5)
+        y = y_start - 30
+        c.setFont("DejaVu", 10)
+        line_height = 15
+        for key, value in data.items():
+            c.drawString(inch, y, f"{key}:")
+
+            # Zpracování víceřádkového textu
+            lines = str(value).splitlines()
+            if not lines:
+                lines = ['-'] # Zobrazí pomlčku, pokud je hodnota prázdná
+
+            # Vykreslení prvního řádku na stejné úrovni jako klíč
+            c.drawString(inch * 3, y, lines[0])
+
+            # Vykreslení dalších řádků pod sebou
+            for i, line in enumerate(lines[1:]):
+                y -= line_height
+                c.drawString(inch * 3, y, line)
+
+            y -= line_height
+        return y + line_height # Vrátí pozici pro další sekci
+
+    # --- Titulek --- #
+    c.setFont("DejaVu-Bold", 18)
+    c.drawCentredString(letter[0] / 2, 1 * inch, f"Podklady pro přepravu {data['referencni_cislo']}")
+
+    y_position = height - 1.5 * inch
+
+    # --- Detaily přepravy (společné) --- #
+    y_position = draw_section("Informace o přepravě", data['preprava'], y_position)
+
+    # --- Podklady pro objednávku dopravci --- #
+    y_position = draw_section("Podklady pro objednávku dopravci", data['dopravce'], y_position - 0.5 * inch)
+
+    # --- Podklady pro fakturaci zákazníkovi --- #
+    draw_section("Podklady pro fakturaci zákazníkovi", data['zakaznik'], y_position - 0.5 * inch)
+
+    c.showPage()
+    c.save()
+    return buf.getvalue()
+
+
+def klic_podkladu(data):
+    """Otisk dat vstupujících do podkladů; slouží jako klíč cache i ETag."""
+    obsah = json.dumps([VERZE_PODKLADU, data], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(obsah.encode()).hexdigest()
+
+
+def cesta_v_cache(pk, klic):
+    return posixpath.join(CACHE_ADRESAR, str(pk), f'{klic}.pdf')
+
+
+def nacist_z_cache(pk, klic):
+    """Vrátí otevřené PDF podkladů přepravy `pk` s otiskem `klic` z cache, nebo None."""
+    cesta = cesta_v_cache(pk, klic)
+    if not default_storage.exists(cesta):
+        return None
+    return default_storage.open(cesta, 'rb')
+
+
+def ulozit_do_cache(pk, data):
+    """
+    Zajistí, že PDF podklady přepravy `pk` jsou v cache ve výchozím úložišti, a vrátí jeho cestu.
+
+    PDF se ukládá pod cestou odvozenou z otisku dat, takže dokud se přeprava,
+    zákazník ani dopravce nezmění, stačí ho přečíst. Při vykreslení nové verze
+    se starší verze téže přepravy z úložiště smažou.
+    """
+    cesta = cesta_v_cache(pk, klic_podkladu(data))
+    if not default_storage.exists(cesta):
+        ulozeno = default_storage.save(cesta, ContentFile(vykreslit_podklady_pdf(data)))
+        if ulozeno != cesta:
+            # Souběžné vykreslení mezitím uložilo totéž PDF pod kanonickou cestou
+            # a úložiště bez přepisování (AWS_S3_FILE_OVERWRITE=False) přidalo příponu
+            default_storage.delete(ulozeno)
+        smazat_podklady_z_cache(pk, ponechat=cesta)
+    return cesta
+
+
+def smazat_podklady_z_cache(pk, ponechat=None):
+    adresar = posixpath.join(CACHE_ADRESAR, str(pk))
+    try:
+        _, soubory = default_storage.listdir(adresar)
+    except FileNotFoundError:
+        return
+    for soubor in soubory:
+        cesta = posixpath.join(adresar, soubor)
+        if cesta != ponechat:
+            default_storage.delete(cesta)
+
+
+def _vykreslit_s_nazvem(data):
+    return nazev_souboru(data), vykreslit_podklady_pdf(data)
+
+
+def _kontext_procesu():
+    metody = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in metody else 'spawn')
+
+
+def podklady_prepravy(prepravy, workers=2):
+    """
+    Pro přepravy (s načteným zákazníkem a dopravcem) vrací dvojice (název souboru, PDF)
+    v pořadí vstupu.
+
+    PDF, která už jsou v cache (viz ulozit_do_cache), se jen přečtou z úložiště,
+    chybějící se vykreslí v poolu procesů. Rozpracovaných je nejvýše 2 × workers
+    dokumentů, takže vstup se čte průběžně a paměť nezávisí na počtu přeprav.
+
+    Procesy se nespouštějí přes fork: gunicorn gthread worker je vícevláknový
+    a forkovaný potomek by mohl zdědit zámek držený jiným vláknem. Pool je
+    spouští až s první úlohou, takže když je všechno v cache, nevznikne žádný.
+    """
+    with ProcessPoolExecutor(max_workers=workers, mp_context=_kontext_procesu()) as executor:
+        fronta = deque()
+        for preprava in prepravy:
+            data = data_podkladu(preprava)
+            soubor = nacist_z_cache(preprava.pk, klic_podkladu(data))
+            if soubor is None:
+                fronta.append(executor.submit(_vykreslit_s_nazvem, data))
+            else:
+                with soubor:
+                    fronta.append(_hotovo((nazev_souboru(data), soubor.read())))
+            if len(fronta) >= 2 * workers:
+                yield fronta.popleft().result()
+        while fronta:
+            yield fronta.popleft().result()
+
+
+def _hotovo(vysledek):
+    future = Future()
+    future.set_result(vysledek)
+    return future
+
+
+class _ZipProud:
+    """Nepřevíjitelný výstup pro zipfile, ze kterého se zapsaná data průběžně odebírají."""
+
+    def __init__(self):
+        self._buf = io.BytesIO()
+
+    def write(self, data):
+        return self._buf.write(data)
+
+    def flush(self):
+        pass
+
+    def odebrat(self):
+        data = self._buf.getvalue()
+        self._buf.seek(0)
+        self._buf.truncate()
+        return data
+
+
+def zip_proud(soubory):
+    """
+    Z dvojic (název, obsah) průběžně skládá ZIP a vrací ho po kouscích.
+
+    Obsah je buď bytes, nebo iterátor bloků bytes (velké soubory čtené
+    z úložiště). Každý blok se odešle hned, jak je zapsaný, takže klient
+    dostává první bajty okamžitě a paměť nezávisí na velikosti souborů.
+    """
+    proud = _ZipProud()
+    with zipfile.ZipFile(proud, mode='w', compression=zipfile.ZIP_DEFLATED) as zf:
+        for nazev, obsah in soubory:
+            if isinstance(obsah, bytes):
+                zf.writestr(nazev, obsah)
+            else:
+                # Velikost předem neznáme, proto rovnou ZIP64
+                with zf.open(nazev, mode='w', force_zip64=True) as cil:
+                    for blok in obsah:
+                        cil.write(blok)
+                        yield proud.odebrat()
+            yield proud.odebrat()
+    yield proud.odebrat()
@@ -0,0 +1,150 @@
+"""
+Výpočet svátků z pravidel a čtení svátků z iCalendar souborů.
+
+Pravidla pokrývají CZ a DE včetně svátků jednotlivých spolkových zemí;
+pohyblivé svátky se odvozují od data Velikonoc. Názvy odpovídají datům
+z migrace 0017_load_holidays, takže opakované vložení stejného roku narazí
+na unique_together tabulky Holiday a nic nezdvojí. Další země se doplňují
+importem iCalendar souborů.
+"""
+from datetime import date, datetime, timedelta
+
+
+def velikonocni_nedele(rok):
+    """Datum Velikonoční neděle v gregoriánském kalendáři (anonymní algoritmus)."""
+    a = rok % 19
+    b, c = divmod(rok, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    mesic, den = divmod(h + l - 7 * m + 114, 31)
+    return date(rok, mesic, den + 1)
+
+
+def _den_pokani(rok):
+    """Buß- und Bettag: středa před 23. listopadem."""
+    den = date(rok, 11, 22)
+    return den - timedelta(days=(den.weekday() - 2) % 7)
+
+
+# (země, název, datum, regiony, od roku)
+#   datum: (měsíc, den), posun ve dnech od Velikonoční neděle, nebo funkce roku
+#   regiony: řetězec kódů spolkových zemí ('' = celostátní), nebo seznam
+#            dvojic (od roku, regiony), pokud se rozsah v čase měnil
+PRAVIDLA = [
+    ('CZ', 'Nový rok / Den obnovy samostatného českého státu', (1, 1), '', None),
+    ('CZ', 'Velký pátek', -2, '', 2016),
+    ('CZ', 'Velikonoční pondělí', 1, '', None),
+    ('CZ', 'Svátek práce', (5, 1), '', None),
+    ('CZ', 'Den vítězství', (5, 8), '', None),
+    ('CZ', 'Den slovanských věrozvěstů Cyrila a Metoděje', (7, 5), '', None),
+    ('CZ', 'Den upálení mistra Jana Husa', (7, 6), '', None),
+    ('CZ', 'Den české státnosti', (9, 28), '', None),
+    ('CZ', 'Den vzniku samostatného československého státu', (10, 28), '', None),
+    ('CZ', 'Den boje za svobodu a demokracii', (11, 17), '', None),
+    ('CZ', 'Štědrý den', (12, 24), '', None),
+    ('CZ', '1. svátek vánoční', (12, 25), '', None),
+    ('CZ', '2. svátek vánoční', (12, 26), '', None),
+
+    ('DE', 'Nový rok', (1, 1), '', None),
+    ('DE', 'Tři králové', (1, 6), 'BW,BY,ST', None),
+    ('DE', 'Mezinárodní den žen', (3, 8), [(2019, 'BE'), (2023, 'BE,MV')], 2019),
+    ('DE', 'Velký pátek', -2, '', None),
+    ('DE', 'Velikonoční pondělí', 1, '', None),
+    ('DE', 'Svátek práce', (5, 1), '', None),
+    ('DE', 'Nanebevstoupení Páně', 39, '', None),
+    ('DE', 'Svatodušní pondělí', 50, '', None),
+    ('DE', 'Boží Tělo', 60, 'BW,BY,HE,NW,RP,SL,SN,TH', None),
+    ('DE', 'Nanebevzetí Panny Marie', (8, 15), 'BY,SL', None),
+    ('DE', 'Světový den dětí', (9, 20), 'TH', 2019),
+    ('DE', 'Den německé jednoty', (10, 3), '', 1990),
+    # K 500. výročí reformace byl v roce 2017 jednorázově svátkem v celém Německu
+    ('DE', 'Den reformace', (10, 31), [(0, 'BB,MV,SN,ST,TH'), (2017, ''), (2018, 'BB,HB,HH,MV,NI,SH,SN,ST,TH')], None),
+    ('DE', 'Svátek Všech svatých', (11, 1), 'BW,BY,NW,RP,SL', None),
+    ('DE', 'Den pokání a modliteb', _den_pokani, 'SN', None),
+    ('DE', '1. svátek vánoční', (12, 25), '', None),
+    ('DE', '2. svátek vánoční', (12, 26), '', None),
+]
+
+ZEME_S_PRAVIDLY = sorted({pravidlo[0] for pravidlo in PRAVIDLA})
+
+
+def _datum(pravidlo, rok):
+    if isinstance(pravidlo, tuple):
+        return date(rok, *pravidlo)
+    if isinstance(pravidlo, int):
+        return velikonocni_nedele(rok) + timedelta(days=pravidlo)
+    return pravidlo(rok)
+
+
+def _regiony(regiony, rok):
+    if isinstance(regiony, str):
+        return regiony
+    return [r for od_roku, r in regiony if od_roku <= rok][-1]
+
+
+def generovat_svatky(rok, zeme=None):
+    """Trojice (datum, název, země, regiony) svátků roku podle PRAVIDLA, volitelně jen pro vybrané země."""
+    for kod, nazev, datum, regiony, od_roku in PRAVIDLA:
+        if zeme and kod not in zeme:
+            continue
+        if od_roku and rok < od_roku:
+            continue
+        yield _datum(datum, rok), nazev, kod, _regiony(regiony, rok)
+
+
+def _odescapovat(text):
+    vysledek = []
+    znaky = iter(text)
+    for znak in znaky:
+        if znak == '\\':
+            dalsi = next(znaky, '')
+            vysledek.append('\n' if dalsi in 'nN' else dalsi)
+        else:
+            vysledek.append(znak)
+    return ''.join(vysledek)
+
+
+def _logicke_radky(radky):
+    """Spojí zalomené řádky iCalendar (pokračování začíná mezerou nebo tabulátorem)."""
+    aktualni = None
+    for radek in radky:
+        radek = radek.rstrip('\r\n')
+        if radek[:1] in (' ', '\t') and aktualni is not None:
+            aktualni += radek[1:]
+            continue
+        if aktualni is not None:
+            yield aktualni
+        aktualni = radek
+    if aktualni:
+        yield aktualni
+
+
+def cist_ical(radky):
+    """
+    Z řádků iCalendar souboru průběžně vrací dvojice (datum, název) událostí.
+
+    Soubor se čte po řádcích, takže paměť nezávisí na jeho délce. Události
+    s opakováním (RRULE) se vrátí jen v den DTSTART; svátkové kalendáře
+    obvykle uvádějí každý výskyt zvlášť.
+    """
+    udalost = None
+    for radek in _logicke_radky(radky):
+        nazev, _, hodnota = radek.partition(':')
+        vlastnost = nazev.split(';', 1)[0].upper()
+        if vlastnost == 'BEGIN' and hodnota.upper() == 'VEVENT':
+            udalost = {}
+        elif udalost is None:
+            continue
+        elif vlastnost == 'END' and hodnota.upper() == 'VEVENT':
+            if 'DTSTART' in udalost and udalost.get('SUMMARY'):
+                yield udalost['DTSTART'], udalost['SUMMARY']
+            udalost = None
+        elif vlastnost == 'DTSTART':
+            udalost['DTSTART'] = datetime.strptime(hodnota[:8], '%Y%m%d').date()
+        elif vlastnost == 'SUMMARY':
+            udalost['SUMMARY'] = _odescapovat(hodnota).strip()
@@ -0,0 +1,146 @@
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from fronta.registr import zaradit
+
+from . import kalendar, kurzy, statistiky_partneru
+from .dokumenty import uvolnit_soubor
+from .models import Dokument, Holiday, KurzMeny, ObsahDokumentu, Partner, Preprava
+from .statistiky import PRISPEVEK_POLE, prispevek, upravit_denni_marze
+from .svatky import zneplatnit_cache
+from .vyhledavani import aktualizovat_index, odstranit_z_indexu
+
+
+@receiver(pre_save, sender=Preprava)
+def zapamatovat_puvodni_prispevek(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    puvodni = None
+    if instance.pk:
+        pole = set(PRISPEVEK_POLE) | set(statistiky_partneru.PRISPEVEK_POLE)
+        puvodni = Preprava.objects.only(*pole).filter(pk=instance.pk).first()
+    instance._puvodni_prispevek = prispevek(puvodni) if puvodni else {}
+    instance._puvodni_preprava = puvodni
+
+
+@receiver(post_save, sender=Preprava)
+def aktualizovat_denni_marze(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    upravit_denni_marze(getattr(instance, '_puvodni_prispevek', None), prispevek(instance))
+    instance._puvodni_prispevek = prispevek(instance)
+
+
+@receiver(post_save, sender=Preprava)
+def aktualizovat_statistiky_partneru(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    puvodni = getattr(instance, '_puvodni_preprava', None)
+    pocet_dokumentu = 0
+    if puvodni is not None and statistiky_partneru.klic_dokumentu(puvodni) != statistiky_partneru.klic_dokumentu(instance):
+        # Dokumenty přepravy se přesouvají mezi partnery nebo mezi otevřené a uzavřené
+        pocet_dokumentu = Dokument.objects.filter(preprava_id=instance.pk).count()
+    statistiky_partneru.upravit_statistiky(
+        statistiky_partneru.prispevek(puvodni, pocet_dokumentu) if puvodni is not None else {},
+        statistiky_partneru.prispevek(instance, pocet_dokumentu),
+    )
+    instance._puvodni_preprava = None
+
+
+@receiver(post_delete, sender=Preprava)
+def odecist_denni_marze(sender, instance, **kwargs):
+    upravit_denni_marze(prispevek(instance), None)
+
+
+@receiver(post_delete, sender=Preprava)
+def odecist_statistiky_partneru(sender, instance, **kwargs):
+    # Dokumenty už odečetlo jejich mazání (kaskáda maže dokumenty dřív než přepravu)
+    statistiky_partneru.upravit_statistiky(statistiky_partneru.prispevek(instance), None)
+
+
+@receiver(post_save, sender=Preprava)
+def aktualizovat_hledani_prepravy(sender, instance, **kwargs):
+    aktualizovat_index(instance)
+
+
+@receiver(post_delete, sender=Preprava)
+def odstranit_prepravu_z_hledani(sender, instance, **kwargs):
+    odstranit_z_indexu(instance)
+
+
+@receiver(post_delete, sender=Preprava)
+def smazat_podklady_prepravy(sender, instance, **kwargs):
+    zaradit('logistika.smazat_podklady', preprava_pk=instance.pk)
+
+
+@receiver(pre_save, sender=Partner)
+def zapamatovat_puvodni_nazev(sender, instance, raw=False, **kwargs):
+    if raw or not instance.pk:
+        instance._puvodni_nazev = None
+        return
+    instance._puvodni_nazev = Partner.objects.filter(pk=instance.pk).values_list('nazev', flat=True).first()
+
+
+@receiver(post_save, sender=Partner)
+def aktualizovat_hledani_partnera(sender, instance, created=False, **kwargs):
+    aktualizovat_index(instance)
+    puvodni_nazev = getattr(instance, '_puvodni_nazev', None)
+    if not created and puvodni_nazev is not None and puvodni_nazev != instance.nazev:
+        # Jméno partnera je součástí hledaci_text jeho přeprav
+        prepravy = Preprava.objects.filter(Q(zakaznik=instance) | Q(dopravce=instance)).select_related('zakaznik', 'dopravce')
+        davka = []
+        for preprava in prepravy.iterator(chunk_size=500):
+            preprava.aktualizovat_hledaci_text()
+            aktualizovat_index(preprava)
+            davka.append(preprava)
+            if len(davka) >= 500:
+                Preprava.objects.bulk_update(davka, ['hledaci_text'])
+                davka = []
+        Preprava.objects.bulk_update(davka, ['hledaci_text'])
+
+
+@receiver(post_delete, sender=Partner)
+def odstranit_partnera_z_hledani(sender, instance, **kwargs):
+    odstranit_z_indexu(instance)
+
+
+@receiver(post_save, sender=Dokument)
+def deduplikovat_novy_dokument(sender, instance, created=False, raw=False, **kwargs):
+    if created and not raw and instance.obsah_id is None:
+        zaradit('logistika.deduplikovat_dokument', dokument_pk=instance.pk)
+
+
+@receiver(post_delete, sender=Dokument)
+def uvolnit_soubor_dokumentu(sender, instance, **kwargs):
+    uvolnit_soubor(instance)
+
+
+@receiver(post_save, sender=ObsahDokumentu)
+def zpracovat_novy_obsah(sender, instance, created=False, raw=False, **kwargs):
+    if created and not raw:
+        zaradit('logistika.zpracovat_obsah', obsah_pk=instance.pk)
+
+
+@receiver(post_save, sender=Holiday)
+@receiver(post_delete, sender=Holiday)
+def zneplatnit_svatky(sender, **kwargs):
+    zneplatnit_cache()
+    kalendar.zneplatnit_cache()
+
+
+@receiver(post_save, sender=KurzMeny)
+@receiver(post_delete, sender=KurzMeny)
+def zneplatnit_kurzy(sender, **kwargs):
+    kurzy.zneplatnit_cache()
+
+
+@receiver(post_save, sender=Dokument)
+def pricist_dokument_partnerum(sender, instance, created=False, raw=False, **kwargs):
+    if created and not raw:
+        statistiky_partneru.upravit_dokumenty(instance.preprava_id, 1)
+
+
+@receiver(post_delete, sender=Dokument)
+def odecist_dokument_partnerum(sender, instance, **kwargs):
+    statistiky_partneru.upravit_dokumenty(instance.preprava_id, -1)
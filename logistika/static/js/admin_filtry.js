@@ -0,0 +1,15 @@
+'use strict';
+// Filtry s našeptávačem v adminu (logistika.admin.AutocompleteFilter):
+// po výběru záznamu přejde na seznam vyfiltrovaný podle jeho pk.
+django.jQuery(function($) {
+    $('.autocomplete-filtr select').on('change', function() {
+        const params = new URLSearchParams(window.location.search);
+        params.delete('p');
+        if (this.value) {
+            params.set(this.name, this.value);
+        } else {
+            params.delete(this.name);
+        }
+        window.location.search = params.toString();
+    });
+});
@@ -0,0 +1,265 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, Func, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, TruncMonth, TruncWeek, TruncYear
+from django.utils import timezone
+
+from .models import DenniMarze, KurzMeny, Preprava
+
+REALIZOVANE_STAVY = Preprava.REALIZOVANE_STAVY
+
+# Stavy, jejichž počty se zobrazují na dashboardu
+POCITANE_STAVY = {
+    'nove': 'nova',
+    'planovane': 'planovana',
+    'probihajici': 'probiha',
+    'k_fakturaci': 'fakturace',
+}
+
+MENY = ['CZK', 'EUR']
+
+# Sloupce přepravy, ze kterých se počítá její příspěvek do DenniMarze
+PRISPEVEK_POLE = [
+    'datum_vytvoreni', 'stav', 'mena_zakaznik', 'mena_dopravce', 'cena_za_tunu_zakaznik', 'naklad_za_tunu_dopravce',
+    'celkova_cena_zakaznik', 'celkovy_naklad_dopravce', 'marze',
+]
+
+KURZ_POLE = DecimalField(max_digits=24, decimal_places=12)
+CASTKA_POLE = DecimalField(max_digits=18, decimal_places=5)
+
+TRUNC_OBDOBI = {
+    'tyden': TruncWeek,
+    'mesic': TruncMonth,
+    'rok': TruncYear,
+}
+
+
+def business_timezone():
+    return ZoneInfo(settings.BUSINESS_TIME_ZONE)
+
+
+def business_today():
+    return timezone.localtime(timezone=business_timezone()).date()
+
+
+def _pulnoc(den, tz):
+    return datetime.combine(den, time.min, tzinfo=tz)
+
+
+def obdobi(den=None):
+    """
+    Vrátí polootevřené intervaly [od, do) pro aktuální den, týden a měsíc.
+
+    Hranice jsou půlnoci v obchodním časovém pásmu (BUSINESS_TIME_ZONE), takže
+    se dají porovnávat přímo se sloupcem datum_vytvoreni a použít index.
+    """
+    tz = business_timezone()
+    den = den or business_today()
+    zacatek_tydne = den - timedelta(days=den.weekday())
+    zacatek_mesice = den.replace(day=1)
+    dalsi_mesic = (zacatek_mesice + timedelta(days=32)).replace(day=1)
+    return {
+        'den': (_pulnoc(den, tz), _pulnoc(den + timedelta(days=1), tz)),
+        'tyden': (_pulnoc(zacatek_tydne, tz), _pulnoc(zacatek_tydne + timedelta(days=7), tz)),
+        'mesic': (_pulnoc(zacatek_mesice, tz), _pulnoc(dalsi_mesic, tz)),
+    }
+
+
+def prispevek(preprava):
+    """
+    Vrátí příspěvek přepravy do DenniMarze jako slovník
+    {(den, mena, skupina): (pocet_preprav, marze, trzby, naklady)}.
+
+    Přeprava se počítá pod měnou zákazníka. Marže se sčítá jen u přeprav se
+    stejnou měnou zákazníka a dopravce (u ostatních je None, viz
+    Preprava.prepocitat_castky()); tržby a náklady se sčítají vždy, každé ve
+    své měně, takže přepočet do jedné měny (marze_ve_mene()) zahrne i přepravy
+    nakoupené v jiné měně, než ve které se prodávají. Dokud chybí některá
+    z cen za tunu, tržby ani náklady se nepočítají, stejně jako marže.
+    """
+    if preprava.datum_vytvoreni is None:
+        return {}
+    den = timezone.localtime(preprava.datum_vytvoreni, business_timezone()).date()
+    skupina = DenniMarze.skupina_pro_stav(preprava.stav)
+    oceneno = preprava.cena_za_tunu_zakaznik is not None and preprava.naklad_za_tunu_dopravce is not None
+    trzby = preprava.celkova_cena_zakaznik if oceneno else Decimal('0')
+    naklady = preprava.celkovy_naklad_dopravce if oceneno else Decimal('0')
+    if preprava.mena_zakaznik == preprava.mena_dopravce:
+        return {(den, preprava.mena_zakaznik, skupina): (1, preprava.marze, trzby, naklady)}
+    hodnoty = {(den, preprava.mena_zakaznik, skupina): (1, Decimal('0'), trzby, Decimal('0'))}
+    if naklady:
+        hodnoty[(den, preprava.mena_dopravce, skupina)] = (0, Decimal('0'), Decimal('0'), naklady)
+    return hodnoty
+
+
+def _novy_souhrn():
+    return defaultdict(lambda: [0, Decimal('0'), Decimal('0'), Decimal('0')])
+
+
+def _pricist(souhrn, hodnoty, znamenko=1):
+    for klic, cisla in (hodnoty or {}).items():
+        radek = souhrn[klic]
+        for i, cislo in enumerate(cisla):
+            radek[i] += znamenko * cislo
+
+
+def upravit_denni_marze(puvodni, novy):
+    """Promítne změnu příspěvku jedné přepravy (puvodni -> novy) do DenniMarze."""
+    if (puvodni or {}) == (novy or {}):
+        return
+    zmeny = _novy_souhrn()
+    _pricist(zmeny, puvodni, -1)
+    _pricist(zmeny, novy)
+    _zapsat_zmeny_marze(zmeny)
+
+
+def pricist_denni_marze(prispevky, odecist=()):
+    """
+    Přičte do DenniMarze příspěvky přeprav (a odečte původní příspěvky `odecist`)
+    při hromadných změnách, jedním zápisem za řádek souhrnu.
+    """
+    zmeny = _novy_souhrn()
+    for znamenko, hodnoty in ((1, prispevky), (-1, odecist)):
+        for hodnota in hodnoty:
+            _pricist(zmeny, hodnota, znamenko)
+    _zapsat_zmeny_marze(zmeny)
+
+
+def _zapsat_zmeny_marze(zmeny):
+    with transaction.atomic():
+        for (den, mena, skupina), (pocet, marze, trzby, naklady) in zmeny.items():
+            if not (pocet or marze or trzby or naklady):
+                continue
+            radek, _ = DenniMarze.objects.get_or_create(den=den, mena=mena, skupina=skupina)
+            DenniMarze.objects.filter(pk=radek.pk).update(
+                pocet_preprav=F('pocet_preprav') + pocet,
+                marze=F('marze') + marze,
+                trzby=F('trzby') + trzby,
+                naklady=F('naklady') + naklady,
+            )
+
+
+def spocitat_denni_marze():
+    """Spočítá obsah DenniMarze z přeprav; čte je po dávkách, v paměti drží jen souhrn."""
+    souhrn = _novy_souhrn()
+    for preprava in Preprava.objects.only(*PRISPEVEK_POLE).iterator(chunk_size=2000):
+        _pricist(souhrn, prispevek(preprava))
+    return souhrn
+
+
+class _Realne(Func):
+    """
+    Na SQLite převede hodnotu na REAL. Celé kurzy (např. 25) a konstanta 1 se tam
+    ukládají a předávají jako INTEGER a dělení by bylo celočíselné; jinde beze změny.
+    """
+
+    template = '%(expressions)s'
+    output_field = KURZ_POLE
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, template='CAST(%(expressions)s AS REAL)', **extra_context)
+
+
+def _kurz_ke_dni(mena):
+    """Poslední známý kurz měny (kód nebo OuterRef) ke dni řádku DenniMarze, v Kč za jednotku."""
+    return _Realne(Subquery(
+        KurzMeny.objects.filter(mena=mena, datum__lte=OuterRef('den')).order_by('-datum').values('kurz')[:1],
+        output_field=KURZ_POLE,
+    ))
+
+
+def prepocet_do_meny(cilova):
+    """
+    Výraz nad DenniMarze: kolik jednotek měny `cilova` odpovídá jedné jednotce měny řádku
+    ke dni řádku. Bez kurzu je NULL (viz chybi_kurz v souhrn_dashboardu()).
+    """
+    jedna = _Realne(Value(Decimal('1')))
+    if cilova == 'CZK':
+        return Case(When(mena='CZK', then=jedna), default=_kurz_ke_dni(OuterRef('mena')), output_field=KURZ_POLE)
+    return Case(
+        When(mena=cilova, then=jedna),
+        When(mena='CZK', then=jedna / _kurz_ke_dni(cilova)),
+        default=_kurz_ke_dni(OuterRef('mena')) / _kurz_ke_dni(cilova),
+        output_field=KURZ_POLE,
+    )
+
+
+def marze_podle_obdobi(od, do, obdobi='tyden', skupina='realizovane'):
+    """
+    Řada marží seskupená po týdnech, měsících nebo letech pro dny v intervalu [od, do).
+
+    Čte pouze z DenniMarze, takže např. 52týdenní trend je jeden malý dotaz.
+    """
+    return (
+        DenniMarze.objects.filter(den__gte=od, den__lt=do, skupina=skupina)
+        .annotate(obdobi=TRUNC_OBDOBI[obdobi]('den'))
+        .values('obdobi', 'mena')
+        .annotate(marze=Sum('marze'), pocet_preprav=Sum('pocet_preprav'))
+        .order_by('obdobi', 'mena')
+    )
+
+
+def _prepoctena_marze(**filtr):
+    return Sum(
+        (F('trzby') - F('naklady')) * F('kurz_prepoctu'),
+        filter=Q(**filtr),
+        output_field=CASTKA_POLE,
+    )
+
+
+def marze_ve_mene(od, do, mena=None, obdobi='tyden', skupina='realizovane'):
+    """
+    Řada marží všech přeprav (i s různou měnou zákazníka a dopravce) přepočtená
+    do jedné měny, výchozí je MENA_VYKAZU.
+
+    Tržby a náklady řádků DenniMarze se násobí kurzem ke dni řádku přímo v SQL
+    (korelovaný poddotaz do KurzMeny přes index mena+datum), takže je to stále
+    jeden malý dotaz nad souhrnnou tabulkou.
+    """
+    mena = mena or settings.MENA_VYKAZU
+    return (
+        DenniMarze.objects.filter(den__gte=od, den__lt=do, skupina=skupina)
+        .annotate(kurz_prepoctu=prepocet_do_meny(mena), obdobi=TRUNC_OBDOBI[obdobi]('den'))
+        .values('obdobi')
+        .annotate(marze=_prepoctena_marze(), chybi_kurz=Count('pk', filter=Q(kurz_prepoctu__isnull=True)))
+        .order_by('obdobi')
+    )
+
+
+def souhrn_dashboardu(den=None):
+    """Spočítá počty podle stavů a marže za den/týden/měsíc pro dashboard."""
+    souhrn = Preprava.objects.filter(stav__in=POCITANE_STAVY.values()).aggregate(**{
+        klic: Count('id', filter=Q(stav=stav))
+        for klic, stav in POCITANE_STAVY.items()
+    })
+
+    intervaly = {
+        nazev: (od.date(), do.date())
+        for nazev, (od, do) in obdobi(den).items()
+    }
+    nejstarsi = min(od for od, _ in intervaly.values())
+    agregace = {}
+    for nazev, (od, do) in intervaly.items():
+        for mena in MENY:
+            agregace[f'marze_{nazev}_{mena.lower()}'] = Coalesce(
+                Sum('marze', filter=Q(den__gte=od, den__lt=do, mena=mena)),
+                Decimal('0.00'),
+                output_field=CASTKA_POLE,
+            )
+        # Všechny přepravy včetně smíšených měn, přepočtené ve stejném dotazu
+        agregace[f'marze_{nazev}_vykazna'] = Coalesce(
+            _prepoctena_marze(den__gte=od, den__lt=do), Decimal('0.00'), output_field=CASTKA_POLE,
+        )
+    agregace['chybi_kurz'] = Count('pk', filter=Q(kurz_prepoctu__isnull=True) & ~Q(trzby=F('naklady')))
+    souhrn.update(
+        DenniMarze.objects.filter(skupina='realizovane', den__gte=nejstarsi)
+        .annotate(kurz_prepoctu=prepocet_do_meny(settings.MENA_VYKAZU))
+        .aggregate(**agregace)
+    )
+    souhrn['mena_vykazu'] = settings.MENA_VYKAZU
+    return souhrn
@@ -0,0 +1,215 @@
+"""
+Počty a součty přeprav partnerů v tabulce StatistikaPartnera.
+
+Tabulka se udržuje průběžně stejně jako DenniMarze: při uložení či smazání
+přepravy (signály), při hromadném importu a při přepočtu částek se do ní
+promítne rozdíl mezi původním a novým příspěvkem přepravy, v téže
+transakci. Dashboard, seznamy partnerů a admin pak čtou hotové hodnoty
+místo počítání přes všechny přepravy. Odchylky opraví
+`manage.py rebuild_partner_stats`.
+"""
+from collections import Counter, defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Max, Q
+
+from .models import Dokument, Preprava, StatistikaPartnera
+
+# Sloupce přepravy, ze kterých se počítá její příspěvek do StatistikaPartnera
+PRISPEVEK_POLE = [
+    'datum_vytvoreni', 'stav', 'zakaznik', 'dopravce', 'mena_zakaznik', 'mena_dopravce',
+    'celkova_cena_zakaznik', 'celkovy_naklad_dopravce',
+]
+
+CITACE = [
+    'pocet_preprav_zakaznik', 'pocet_preprav_dopravce', 'pocet_realizovanych_dopravce',
+    'trzby_czk', 'trzby_eur', 'naklady_czk', 'naklady_eur', 'otevrene_dokumenty',
+]
+
+# Dokumenty uzavřených a neprodaných přeprav se do otevřených nepočítají
+UZAVRENE_STAVY = ['uzavrena', 'neprodano']
+
+
+def prispevek(preprava, pocet_dokumentu=0):
+    """
+    Vrátí příspěvek přepravy partnerům jako slovník {pk partnera: {klíč: hodnota}}.
+
+    Klíče jsou názvy sloupců StatistikaPartnera, dvojice (role, stav) pro
+    pocty_podle_stavu a 'posledni_preprava' s datem vytvoření přepravy.
+    Dokumenty se započítají, jen když je `pocet_dokumentu` zadán a přeprava
+    je otevřená.
+    """
+    if preprava.datum_vytvoreni is None:
+        return {}
+    hodnoty = {}
+    if preprava.zakaznik_id:
+        hodnoty[preprava.zakaznik_id] = {
+            'pocet_preprav_zakaznik': 1,
+            f'trzby_{preprava.mena_zakaznik.lower()}': preprava.celkova_cena_zakaznik,
+            ('zakaznik', preprava.stav): 1,
+        }
+    if preprava.dopravce_id:
+        dopravce = hodnoty.setdefault(preprava.dopravce_id, {})
+        dopravce.update({
+            'pocet_preprav_dopravce': 1,
+            'pocet_realizovanych_dopravce': int(preprava.stav in Preprava.REALIZOVANE_STAVY),
+            f'naklady_{preprava.mena_dopravce.lower()}': preprava.celkovy_naklad_dopravce,
+            ('dopravce', preprava.stav): 1,
+        })
+    for hodnota in hodnoty.values():
+        hodnota['posledni_preprava'] = preprava.datum_vytvoreni
+        if pocet_dokumentu and preprava.stav not in UZAVRENE_STAVY:
+            hodnota['otevrene_dokumenty'] = pocet_dokumentu
+    return hodnoty
+
+
+def klic_dokumentu(preprava):
+    """Na čem závisí, kterým partnerům se dokumenty přepravy počítají jako otevřené."""
+    return preprava.zakaznik_id, preprava.dopravce_id, preprava.stav not in UZAVRENE_STAVY
+
+
+def _nova_zmena():
+    return {'hodnoty': defaultdict(int), 'data': Counter()}
+
+
+def _pricist(zmeny, prispevky, znamenko=1):
+    for pk, hodnoty in (prispevky or {}).items():
+        zmena = zmeny[pk]
+        for klic, hodnota in hodnoty.items():
+            if klic == 'posledni_preprava':
+                zmena['data'][hodnota] += znamenko
+            else:
+                zmena['hodnoty'][klic] += znamenko * hodnota
+
+
+def upravit_statistiky(puvodni, novy):
+    """Promítne změnu příspěvku jedné přepravy (puvodni -> novy) do StatistikaPartnera."""
+    if (puvodni or {}) == (novy or {}):
+        return
+    zmeny = defaultdict(_nova_zmena)
+    _pricist(zmeny, puvodni, -1)
+    _pricist(zmeny, novy)
+    _zapsat_zmeny(zmeny)
+
+
+def pricist_statistiky(prispevky, odecist=()):
+    """Přičte příspěvky přeprav (a odečte původní `odecist`) při hromadných změnách, jedním zápisem za partnera."""
+    zmeny = defaultdict(_nova_zmena)
+    for znamenko, hodnoty in ((1, prispevky), (-1, odecist)):
+        for hodnota in hodnoty:
+            _pricist(zmeny, hodnota, znamenko)
+    _zapsat_zmeny(zmeny)
+
+
+def _posledni_preprava(pk):
+    return Preprava.objects.filter(Q(zakaznik_id=pk) | Q(dopravce_id=pk)).aggregate(posledni=Max('datum_vytvoreni'))['posledni']
+
+
+def _zapsat_zmeny(zmeny):
+    with transaction.atomic():
+        # Zámky řádků vždy ve stejném pořadí, aby se souběžné zápisy nezablokovaly navzájem
+        for pk in sorted(zmeny):
+            hodnoty = {k: v for k, v in zmeny[pk]['hodnoty'].items() if v}
+            data = {d: n for d, n in zmeny[pk]['data'].items() if n}
+            if not hodnoty and not data:
+                continue
+            statistika, _ = StatistikaPartnera.objects.select_for_update().get_or_create(partner_id=pk)
+            for klic, hodnota in hodnoty.items():
+                if isinstance(klic, tuple):
+                    role, stav = klic
+                    pocty = statistika.pocty_podle_stavu.setdefault(role, {})
+                    pocty[stav] = pocty.get(stav, 0) + hodnota
+                    if not pocty[stav]:
+                        del pocty[stav]
+                    if not pocty:
+                        # spocitat_statistiky() roli bez přeprav vůbec neuvádí
+                        del statistika.pocty_podle_stavu[role]
+                else:
+                    setattr(statistika, klic, getattr(statistika, klic) + hodnota)
+            pridana = [d for d, n in data.items() if n > 0]
+            if pridana:
+                statistika.posledni_preprava = max(d for d in [statistika.posledni_preprava, *pridana] if d)
+            if statistika.posledni_preprava and any(n < 0 and d >= statistika.posledni_preprava for d, n in data.items()):
+                # Ubyla nejnovější přeprava, další nejnovější je potřeba dohledat
+                statistika.posledni_preprava = _posledni_preprava(pk)
+            statistika.save()
+
+
+def upravit_dokumenty(preprava_pk, zmena):
+    """Promítne přidání (zmena=1) nebo smazání (zmena=-1) dokumentu přepravy."""
+    preprava = Preprava.objects.filter(pk=preprava_pk).values('zakaznik_id', 'dopravce_id', 'stav').first()
+    if preprava is None or preprava['stav'] in UZAVRENE_STAVY:
+        return
+    partneri = {preprava['zakaznik_id'], preprava['dopravce_id']} - {None}
+    _zapsat_zmeny({pk: {'hodnoty': {'otevrene_dokumenty': zmena}, 'data': {}} for pk in partneri})
+
+
+def _otevrene_dokumenty(klic, pocet):
+    zakaznik_id, dopravce_id, otevrena = klic
+    if not otevrena:
+        return {}
+    return {pk: {'otevrene_dokumenty': pocet} for pk in {zakaznik_id, dopravce_id} - {None}}
+
+
+def presunout_dokumenty(puvodni_klice):
+    """
+    Po hromadné změně přeprav přesune jejich dokumenty mezi partnery (nebo mezi
+    otevřené a uzavřené). `puvodni_klice` je {pk přepravy: klic_dokumentu()} před změnou.
+    """
+    pks = list(puvodni_klice)
+    for i in range(0, len(pks), 900):
+        nove_klice = {
+            p.pk: klic_dokumentu(p)
+            for p in Preprava.objects.filter(pk__in=pks[i:i + 900]).only('pk', 'zakaznik', 'dopravce', 'stav')
+        }
+        zmenene = [pk for pk, klic in nove_klice.items() if klic != puvodni_klice[pk]]
+        if not zmenene:
+            continue
+        pocty = dict(
+            Dokument.objects.filter(preprava_id__in=zmenene).values('preprava_id')
+            .annotate(pocet=Count('pk')).order_by().values_list('preprava_id', 'pocet')
+        )
+        pricist_statistiky(
+            (_otevrene_dokumenty(nove_klice[pk], pocet) for pk, pocet in pocty.items()),
+            odecist=(_otevrene_dokumenty(puvodni_klice[pk], pocet) for pk, pocet in pocty.items()),
+        )
+
+
+def spocitat_statistiky():
+    """
+    Spočítá obsah StatistikaPartnera z přeprav a dokumentů; vrací {pk partnera: {sloupec: hodnota}}.
+
+    Přepravy se čtou po dávkách a částky se sčítají v Pythonu v Decimal stejně
+    jako v statistiky.spocitat_denni_marze(): SQL Sum na SQLite vrací float,
+    takže by se výsledek lišil od průběžně udržovaných hodnot.
+    """
+    zmeny = defaultdict(_nova_zmena)
+    for preprava in Preprava.objects.only(*PRISPEVEK_POLE).iterator(chunk_size=2000):
+        _pricist(zmeny, prispevek(preprava))
+
+    dokumenty = (
+        Dokument.objects.exclude(preprava__stav__in=UZAVRENE_STAVY)
+        .values('preprava__zakaznik_id', 'preprava__dopravce_id')
+        .annotate(pocet=Count('pk'))
+        .order_by()
+    )
+    for r in dokumenty:
+        for pk in {r['preprava__zakaznik_id'], r['preprava__dopravce_id']} - {None}:
+            zmeny[pk]['hodnoty']['otevrene_dokumenty'] += r['pocet']
+
+    souhrn = {}
+    for pk, zmena in zmeny.items():
+        radek = {
+            **{pole: Decimal('0') if pole.startswith(('trzby_', 'naklady_')) else 0 for pole in CITACE},
+            'pocty_podle_stavu': {},
+            'posledni_preprava': max(zmena['data'], default=None),
+        }
+        for klic, hodnota in zmena['hodnoty'].items():
+            if isinstance(klic, tuple):
+                role, stav = klic
+                radek['pocty_podle_stavu'].setdefault(role, {})[stav] = hodnota
+            else:
+                radek[klic] += hodnota
+        souhrn[pk] = radek
+    return souhrn
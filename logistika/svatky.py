@@ -0,0 +1,42 @@
+"""
+Svátky pro boční panel, držené v paměti procesu.
+
+Seznam nejbližších svátků se mění jednou za den, proto se drží v cache
+klíčované obchodním datem (a volitelně zemí). Změny tabulky Holiday cache
+vyprázdní přes signály; ostatní procesy (gunicorn workery) se dorovnají
+nejpozději po PLATNOST_CACHE.
+"""
+import threading
+import time
+
+from .models import Holiday
+from .statistiky import business_today
+
+POCET_NADCHAZEJICICH = 3
+PLATNOST_CACHE = 10 * 60
+
+_cache = {}
+# gunicorn gthread obsluhuje požadavky ve vláknech, cache se mění jen pod zámkem
+_zamek = threading.Lock()
+
+
+def nadchazejici_svatky(zeme=None):
+    dnes = business_today()
+    klic = (dnes, zeme)
+    zaznam = _cache.get(klic)
+    if zaznam is None or zaznam[0] < time.monotonic():
+        svatky = Holiday.objects.filter(date__gte=dnes)
+        if zeme:
+            svatky = svatky.filter(country_code=zeme)
+        zaznam = (time.monotonic() + PLATNOST_CACHE, list(svatky.order_by('date')[:POCET_NADCHAZEJICICH]))
+        with _zamek:
+            # Záznamy z předchozích dnů už nikdo nepotřebuje
+            for stary in [k for k in _cache if k[0] != dnes]:
+                del _cache[stary]
+            _cache[klic] = zaznam
+    return zaznam[1]
+
+
+def zneplatnit_cache():
+    with _zamek:
+        _cache.clear()
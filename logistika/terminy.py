@@ -0,0 +1,61 @@
+import re
+from collections import namedtuple
+from datetime import date, time, timedelta
+
+Termin = namedtuple('Termin', ['datum', 'cas_od', 'cas_do'])
+
+_ISO_DATUM = re.compile(r'(?<!\d)(\d{4})-(\d{1,2})-(\d{1,2})(?!\d)')
+_CESKE_DATUM = re.compile(r'(?<![\d.])(\d{1,2})\.\s*(\d{1,2})\.(?:\s*(\d{4}|\d{2})(?![\d:.]))?')
+_CAS = re.compile(r'(?<![\d.:])(\d{1,2})[:.](\d{2})(?![\d.])')
+_HODINY_ROZSAH = re.compile(r'(?<![\d.:])(\d{1,2})\s*[-–]\s*(\d{1,2})(?![\d.:])\s*(?:h|hod)?')
+
+
+def _najit_datum(text, reference):
+    m = _ISO_DATUM.search(text)
+    if m:
+        return date(int(m[1]), int(m[2]), int(m[3])), m.span()
+    m = _CESKE_DATUM.search(text)
+    if not m:
+        return None, None
+    den, mesic, rok = int(m[1]), int(m[2]), m[3]
+    if rok:
+        rok = int(rok) + (2000 if len(rok) == 2 else 0)
+        return date(rok, mesic, den), m.span()
+    # Bez roku: bereme nejbližší výskyt dne vzhledem k referenčnímu datu
+    datum = date(reference.year, mesic, den)
+    if datum < reference - timedelta(days=180):
+        datum = date(reference.year + 1, mesic, den)
+    return datum, m.span()
+
+
+def parse_termin(text, reference=None):
+    """
+    Rozpozná datum a volitelné časové okno ve volném textu termínu nakládky/vykládky.
+
+    Zvládá např. "2025-10-14 08:00", "14.10.2025 8:00-12:00", "14. 10. 7.30"
+    nebo "14.10. 6-14 h". Datum bez roku se doplní podle `reference` (typicky
+    datum vytvoření přepravy). Vrátí Termin, nebo None, pokud text datum neobsahuje.
+    """
+    if not text:
+        return None
+    reference = reference or date.today()
+    try:
+        datum, rozsah = _najit_datum(text, reference)
+    except ValueError:
+        return None
+    if datum is None:
+        return None
+
+    # Časy hledáme ve zbytku textu bez samotného data
+    zbytek = text[:rozsah[0]] + ' ' + text[rozsah[1]:]
+    casy = []
+    for m in _CAS.finditer(zbytek):
+        hodina, minuta = int(m[1]), int(m[2])
+        if hodina < 24 and minuta < 60:
+            casy.append(time(hodina, minuta))
+    if not casy:
+        m = _HODINY_ROZSAH.search(zbytek)
+        if m and int(m[1]) < 24 and int(m[2]) <= 24:
+            casy = [time(int(m[1])), time(min(int(m[2]), 23), 59 if int(m[2]) == 24 else 0)]
+
+    return Termin(datum, casy[0] if casy else None, casy[1] if len(casy) > 1 else None)
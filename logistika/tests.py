@@ -1,3 +1,343 @@
-from django.test import TestCase
+import io
+import posixpath
+import tempfile
+import zipfile
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from storages.backends.s3boto3 import S3Boto3Storage
+
+from fronta.models import Uloha
+
+from . import nahravani, podklady, views
+from .models import DenniMarze, Dokument, KurzMeny, ObsahDokumentu, Partner, Preprava, StatistikaPartnera
+from .podklady import cesta_v_cache, data_podkladu, klic_podkladu, ulozit_do_cache
+from .pravidla_svatku import generovat_svatky
+from .statistiky import marze_ve_mene
+from .vyhledavani import je_prefix_referencniho_cisla
+
+
+def podepsane_hlavicky(url):
+    return set(parse_qs(urlsplit(url).query)['X-Amz-SignedHeaders'][0].split(';'))
+
+
+def hlavicky_prohlizece(hlavicky):
+    # fetch() v preprava_detail.html posílá k PUT jen hlavičky z plánu, Host doplní prohlížeč
+    return {'host'} | {nazev.lower() for nazev in hlavicky}
+
+
+class PresignedNahravaniTest(SimpleTestCase):
+    def setUp(self):
+        uloziste = S3Boto3Storage(
+            bucket_name='spedice', region_name='eu-central-1', signature_version='s3v4',
+            access_key='klic', secret_key='tajne',
+        )
+        patcher = mock.patch.object(nahravani, 'default_storage', uloziste)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # Dostupnost názvu by se ověřovala dotazem do bucketu
+        patcher = mock.patch.object(uloziste, 'get_available_name', lambda nazev, max_length=None: nazev)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.preprava = Preprava(pk=1)
+
+    def test_bez_content_type_se_hlavicka_nepodepisuje(self):
+        plan = nahravani.zahajit_nahravani(self.preprava, 'CMR', 'cmr.bin', 1024, '')
+        self.assertEqual(plan['hlavicky'], {})
+        self.assertEqual(podepsane_hlavicky(plan['url']), hlavicky_prohlizece(plan['hlavicky']))
+
+    def test_content_type_posila_prohlizec_stejny_jako_v_podpisu(self):
+        plan = nahravani.zahajit_nahravani(self.preprava, 'CMR', 'cmr.pdf', 1024, 'application/pdf')
+        self.assertEqual(plan['hlavicky'], {'Content-Type': 'application/pdf'})
+        self.assertEqual(podepsane_hlavicky(plan['url']), hlavicky_prohlizece(plan['hlavicky']))
+
+    def test_casti_multipart_uploadu_se_podepisuji_bez_hlavicek(self):
+        klient = nahravani.default_storage.connection.meta.client
+        with mock.patch.object(klient, 'create_multipart_upload', return_value={'UploadId': 'u1'}) as zalozit:
+            plan = nahravani.zahajit_nahravani(
+                self.preprava, 'Video', 'video.mp4', nahravani.MULTIPART_OD + 1, 'video/mp4',
+            )
+        self.assertEqual(zalozit.call_args.kwargs['ContentType'], 'video/mp4')
+        self.assertEqual(len(plan['casti']), 3)
+        for url in plan['casti']:
+            self.assertEqual(podepsane_hlavicky(url), hlavicky_prohlizece(plan['hlavicky']))
+
+
+class PrimeNahravaniZahajitTest(TestCase):
+    def test_hash_od_klienta_nenahrazuje_nahrani(self):
+        preprava = Preprava.objects.create(
+            zakaznik=Partner.objects.create(nazev='Zákazník', adresa='Praha', typ_partnera='zakaznik'),
+            dopravce=Partner.objects.create(nazev='Dopravce', adresa='Brno', typ_partnera='dopravce'),
+            misto_nakladky='Praha', datum_cas_nakladky='1.10.2026', misto_vykladky='Brno',
+            datum_cas_vykladky='2.10.2026', popis_zbozi='Palety',
+        )
+        obsah = ObsahDokumentu.objects.create(sha256='a' * 64, soubor='obsah/cizi.pdf', velikost=1024)
+        self.client.force_login(User.objects.create_user('dispecer'))
+
+        with mock.patch.object(views, 'prime_nahravani_dostupne', return_value=True), \
+                mock.patch.object(views, 'zahajit_nahravani', return_value={'url': 'https://s3/put'}) as zahajit:
+            odpoved = self.client.post(reverse('dokument_nahrat_zahajit', args=[preprava.pk]), {
+                'nazev': 'CMR', 'nazev_souboru': 'cmr.pdf', 'velikost': 1024,
+                'content_type': 'application/pdf', 'sha256': obsah.sha256,
+            })
+        # Obsah se připojí až podle hashe spočítaného serverem z nahraného souboru
+        self.assertEqual(odpoved.json(), {'url': 'https://s3/put'})
+        zahajit.assert_called_once()
+        self.assertFalse(Dokument.objects.exists())
+
+
+# Manifest statických souborů existuje až po collectstatic
+@override_settings(FRONTA_SYNCHRONNE=False, STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class PodkladyPdfTest(TestCase):
+    def setUp(self):
+        zakaznik = Partner.objects.create(nazev='Zákazník', adresa='Praha', typ_partnera='zakaznik')
+        dopravce = Partner.objects.create(nazev='Dopravce', adresa='Brno', typ_partnera='dopravce')
+        self.preprava = Preprava.objects.create(
+            zakaznik=zakaznik, dopravce=dopravce, misto_nakladky='Praha', datum_cas_nakladky='1.10.2026',
+            misto_vykladky='Brno', datum_cas_vykladky='2.10.2026', popis_zbozi='Palety',
+        )
+        self.url = reverse('podklady_pdf', args=[self.preprava.pk])
+        self.client.force_login(User.objects.create_user('dispecer'))
+
+    def ulohy(self):
+        return Uloha.objects.filter(klic__startswith=f'podklady:{self.preprava.pk}:')
+
+    def test_opakovane_dotazy_nezaradi_dalsi_ulohu(self):
+        odpoved = self.client.get(self.url)
+        self.assertEqual(odpoved.status_code, 202)
+        self.assertEqual(odpoved.context['dalsi_pokus'], 1)
+        self.client.get(self.url, {'pokus': 1})
+        self.assertEqual(self.ulohy().count(), 1)
+
+        self.ulohy().update(stav=Uloha.BEZI)
+        self.client.get(self.url, {'pokus': 2})
+        self.assertEqual(self.ulohy().count(), 1)
+
+    def test_obnovovani_s_rostoucim_odkladem_a_limitem(self):
+        odklady = [self.client.get(self.url, {'pokus': pokus}).context['odklad_ms'] for pokus in range(5)]
+        self.assertEqual(odklady, sorted(odklady))
+        self.assertLess(odklady[0], odklady[-1])
+
+        odpoved = self.client.get(self.url, {'pokus': views.MAX_OBNOVENI_PODKLADU})
+        self.assertEqual(odpoved.status_code, 202)
+        self.assertNotIn('dalsi_pokus', odpoved.context)
+        self.assertNotContains(odpoved, 'location.replace', status_code=202)
+
+    def test_chyba_ulohy_zastavi_obnovovani(self):
+        self.client.get(self.url)
+        self.ulohy().update(stav=Uloha.CHYBA)
+
+        odpoved = self.client.get(self.url, {'pokus': 1})
+        self.assertEqual(odpoved.status_code, 200)
+        self.assertTrue(odpoved.context['chyba'])
+        self.assertNotContains(odpoved, 'location.replace')
+        self.assertEqual(self.ulohy().count(), 1)
+
+        odpoved = self.client.post(self.url)
+        self.assertRedirects(odpoved, self.url, fetch_redirect_response=False)
+        self.assertEqual(self.ulohy().filter(stav=Uloha.CEKA).count(), 1)
+
+    def test_zmena_prepravy_zaradi_novou_ulohu(self):
+        self.client.get(self.url)
+        self.ulohy().update(stav=Uloha.CHYBA)
+
+        Preprava.objects.filter(pk=self.preprava.pk).update(popis_zbozi='Palety a krabice')
+        odpoved = self.client.get(self.url)
+        self.assertEqual(odpoved.status_code, 202)
+        self.assertEqual(self.ulohy().filter(stav=Uloha.CEKA).count(), 1)
+        self.assertEqual(self.ulohy().count(), 2)
+
+
+class MarzeVeMeneTest(TestCase):
+    def setUp(self):
+        den = date(2026, 3, 2)
+        # Celý kurz se na SQLite ukládá jako INTEGER, dělení jím nesmí být celočíselné
+        KurzMeny.objects.create(mena='EUR', datum=den, kurz=Decimal('25'))
+        KurzMeny.objects.create(mena='USD', datum=den, kurz=Decimal('20'))
+        for mena, trzby, naklady in [('CZK', '1000', '500'), ('EUR', '100', '60'), ('USD', '50', '0')]:
+            DenniMarze.objects.create(
+                den=den, mena=mena, skupina='realizovane', trzby=Decimal(trzby), naklady=Decimal(naklady),
+            )
+
+    def marze(self, mena):
+        radky = list(marze_ve_mene(date(2026, 1, 1), date(2027, 1, 1), mena=mena, obdobi='rok'))
+        self.assertEqual(len(radky), 1)
+        return radky[0]['marze']
+
+    def test_prepocet_do_czk(self):
+        self.assertAlmostEqual(self.marze('CZK'), Decimal('500') + 40 * 25 + 50 * 20, places=4)
+
+    def test_prepocet_z_czk_i_mezi_cizimi_menami(self):
+        self.assertAlmostEqual(self.marze('EUR'), Decimal('20') + 40 + Decimal('40'), places=4)
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class HledaniTest(TestCase):
+    def setUp(self):
+        zakaznik = Partner.objects.create(nazev='Zákazník', adresa='Praha', typ_partnera='zakaznik')
+        self.preprava = Preprava.objects.create(
+            zakaznik=zakaznik, misto_nakladky='Praha', datum_cas_nakladky='1.10.2026',
+            misto_vykladky='D-80331 München', datum_cas_vykladky='2.10.2026', popis_zbozi='Palety',
+        )
+        self.client.force_login(User.objects.create_user('dispecer'))
+
+    def test_prefix_referencniho_cisla(self):
+        for dotaz in ('JAFA-2026', 'jafa-2026-00', ' JAFA-2026-0001 '):
+            self.assertTrue(je_prefix_referencniho_cisla(dotaz), dotaz)
+        for dotaz in ('D-80331', 'CZ-110', 'JAFA', 'JAFA-', 'Praha'):
+            self.assertFalse(je_prefix_referencniho_cisla(dotaz), dotaz)
+
+    def test_hledani_podle_referencniho_cisla_i_psc(self):
+        for dotaz in (self.preprava.referencni_cislo[:9].lower(), 'D-80331'):
+            odpoved = self.client.get(reverse('hledani'), {'q': dotaz})
+            self.assertEqual([p.pk for p in odpoved.context['prepravy']], [self.preprava.pk], dotaz)
+
+
+class HromadnaZmenaPrepravTest(TestCase):
+    def setUp(self):
+        self.zakaznik = Partner.objects.create(nazev='Zákazník', adresa='Praha', typ_partnera='zakaznik')
+        self.dopravce = Partner.objects.create(nazev='Dopravce', adresa='Brno', typ_partnera='dopravce')
+        self.preprava = Preprava.objects.create(
+            zakaznik=self.zakaznik, dopravce=self.dopravce, misto_nakladky='Praha', datum_cas_nakladky='1.10.2026',
+            misto_vykladky='Brno', datum_cas_vykladky='2.10.2026', popis_zbozi='Palety', stav='probiha',
+            cena_za_tunu_zakaznik=Decimal('1000.50'), naklad_za_tunu_dopravce=Decimal('800.25'),
+        )
+        Dokument.objects.create(preprava=self.preprava, nazev='CMR', soubor='dokumenty/cmr.pdf')
+
+    def zkontrolovat_souhrny(self):
+        call_command('rebuild_margin_rollup', check=True, stdout=io.StringIO())
+        call_command('rebuild_partner_stats', check=True, stdout=io.StringIO())
+
+    def test_update_stavu(self):
+        Preprava.objects.filter(pk=self.preprava.pk).update(stav='uzavrena')
+        self.zkontrolovat_souhrny()
+        self.assertEqual(StatistikaPartnera.objects.get(pk=self.zakaznik.pk).otevrene_dokumenty, 0)
+
+    def test_update_data_vytvoreni_a_stavu(self):
+        Preprava.objects.filter(pk=self.preprava.pk).update(
+            stav='nova', datum_vytvoreni=self.preprava.datum_vytvoreni.replace(year=2025),
+        )
+        self.zkontrolovat_souhrny()
+
+    def test_bulk_update_stavu(self):
+        self.preprava.stav = 'uzavrena'
+        Preprava.objects.bulk_update([self.preprava], ['stav'])
+        self.zkontrolovat_souhrny()
+
+
+class StatistikaPartneraTest(TestCase):
+    def setUp(self):
+        self.zakaznik = Partner.objects.create(nazev='Zákazník', adresa='Praha', typ_partnera='zakaznik')
+        self.dopravce = Partner.objects.create(nazev='Dopravce', adresa='Brno', typ_partnera='dopravce')
+        self.jiny_dopravce = Partner.objects.create(nazev='Jiný dopravce', adresa='Ostrava', typ_partnera='dopravce')
+        self.preprava = Preprava.objects.create(
+            zakaznik=self.zakaznik, dopravce=self.dopravce, misto_nakladky='Praha', datum_cas_nakladky='1.10.2026',
+            misto_vykladky='Brno', datum_cas_vykladky='2.10.2026', popis_zbozi='Palety',
+        )
+
+    def test_smazani_jedine_prepravy(self):
+        self.preprava.delete()
+        call_command('rebuild_partner_stats', check=True, stdout=io.StringIO())
+        self.assertEqual(StatistikaPartnera.objects.get(pk=self.zakaznik.pk).pocty_podle_stavu, {})
+
+    def test_zmena_dopravce_jedine_prepravy(self):
+        self.preprava.dopravce = self.jiny_dopravce
+        self.preprava.save()
+        call_command('rebuild_partner_stats', check=True, stdout=io.StringIO())
+        self.assertEqual(StatistikaPartnera.objects.get(pk=self.dopravce.pk).pocty_podle_stavu, {})
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class PodkladyZipTest(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        nastaveni = override_settings(MEDIA_ROOT=media.name)
+        nastaveni.enable()
+        self.addCleanup(nastaveni.disable)
+
+        zakaznik = Partner.objects.create(nazev='Zákazník', adresa='Praha', typ_partnera='zakaznik')
+        dopravce = Partner.objects.create(nazev='Dopravce', adresa='Brno', typ_partnera='dopravce')
+        self.prepravy = [
+            Preprava.objects.create(
+                zakaznik=zakaznik, dopravce=dopravce, misto_nakladky='Praha', datum_cas_nakladky='1.10.2026',
+                datum_nakladky=date(2026, 10, 1), misto_vykladky='Brno', datum_cas_vykladky='2.10.2026',
+                popis_zbozi='Palety',
+            )
+            for _ in range(2)
+        ]
+        self.url = reverse('podklady_zip')
+        self.filtr = {'nakladka_od': '2026-10-01', 'nakladka_do': '2026-10-31'}
+        self.client.force_login(User.objects.create_user('dispecer'))
+
+    def zprava(self, odpoved):
+        return [str(m) for m in get_messages(odpoved.wsgi_request)]
+
+    def test_bez_filtru_se_nic_negeneruje(self):
+        odpoved = self.client.get(self.url)
+        self.assertRedirects(odpoved, reverse('seznam_preprav') + '?', fetch_redirect_response=False)
+        self.assertIn('vyberte přepravy filtrem', self.zprava(odpoved)[0])
+
+    def test_nad_limit_odkaze_na_prikaz(self):
+        with mock.patch.object(views, 'MAX_PODKLADU_V_ZIPU', 1):
+            odpoved = self.client.get(self.url, self.filtr)
+        self.assertEqual(odpoved.status_code, 302)
+        self.assertIn('generate_podklady', self.zprava(odpoved)[0])
+
+    def test_pdf_z_cache_se_nevykresluji(self):
+        for preprava in self.prepravy:
+            cesta = cesta_v_cache(preprava.pk, klic_podkladu(data_podkladu(preprava)))
+            default_storage.save(cesta, ContentFile(b'%PDF-z-cache ' + preprava.referencni_cislo.encode()))
+
+        with mock.patch('logistika.podklady.ProcessPoolExecutor.submit') as vykreslit:
+            odpoved = self.client.get(self.url, self.filtr)
+            archiv = zipfile.ZipFile(io.BytesIO(b''.join(odpoved.streaming_content)))
+        vykreslit.assert_not_called()
+        for preprava in self.prepravy:
+            obsah = archiv.read(f'podklady_{preprava.referencni_cislo}.pdf')
+            self.assertEqual(obsah, b'%PDF-z-cache ' + preprava.referencni_cislo.encode())
+
+
+class CachePodkladuTest(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        nastaveni = override_settings(MEDIA_ROOT=media.name)
+        nastaveni.enable()
+        self.addCleanup(nastaveni.disable)
+        self.data = data_podkladu(Preprava(
+            pk=7, zakaznik=Partner(nazev='Zákazník', adresa='Praha'), dopravce=Partner(nazev='Dopravce', adresa='Brno'),
+            misto_nakladky='Praha', datum_cas_nakladky='1.10.2026', misto_vykladky='Brno',
+            datum_cas_vykladky='2.10.2026', popis_zbozi='Palety',
+        ))
+
+    def test_soubezne_ulozeni_nesmaze_kanonickou_cestu(self):
+        cesta = cesta_v_cache(7, klic_podkladu(self.data))
+        default_storage.save(cesta_v_cache(7, 'stara-verze'), ContentFile(b'%PDF-stare'))
+        default_storage.save(cesta, ContentFile(b'%PDF-souseda'))
+
+        # Souběžné vykreslení ještě kanonickou cestu nevidělo, úložiště pak přidá příponu
+        with mock.patch.object(podklady, 'vykreslit_podklady_pdf', return_value=b'%PDF-nove'), \
+                mock.patch.object(default_storage, 'exists', side_effect=[False, True, False]):
+            self.assertEqual(ulozit_do_cache(7, self.data), cesta)
+
+        self.assertEqual(default_storage.listdir(posixpath.dirname(cesta))[1], [posixpath.basename(cesta)])
+
+
+class PravidlaSvatkuTest(SimpleTestCase):
+    def regiony_reformace(self, rok):
+        return [regiony for _, nazev, _, regiony in generovat_svatky(rok, ['DE']) if nazev == 'Den reformace']
+
+    def test_den_reformace_2017_celostatne(self):
+        self.assertEqual(self.regiony_reformace(2016), ['BB,MV,SN,ST,TH'])
+        self.assertEqual(self.regiony_reformace(2017), [''])
+        self.assertEqual(self.regiony_reformace(2018), ['BB,HB,HH,MV,NI,SH,SN,ST,TH'])
@@ -0,0 +1,33 @@
+"""Úlohy zpracovávané na pozadí workerem aplikace fronta."""
+from fronta.registr import uloha
+
+from .dokumenty import deduplikovat, smazat_naplanovane, vytvorit_zmensene_verze
+from .models import Preprava
+from .podklady import data_podkladu, smazat_podklady_z_cache, ulozit_do_cache
+
+
+@uloha('logistika.vykreslit_podklady')
+def vykreslit_podklady(preprava_pk):
+    preprava = Preprava.objects.select_related('zakaznik', 'dopravce').filter(pk=preprava_pk).first()
+    if preprava is not None:
+        ulozit_do_cache(preprava.pk, data_podkladu(preprava))
+
+
+@uloha('logistika.smazat_podklady')
+def smazat_podklady(preprava_pk):
+    smazat_podklady_z_cache(preprava_pk)
+
+
+@uloha('logistika.smazat_soubory', max_pokusu=10)
+def smazat_soubory():
+    smazat_naplanovane()
+
+
+@uloha('logistika.deduplikovat_dokument')
+def deduplikovat_dokument(dokument_pk):
+    deduplikovat(dokument_pk)
+
+
+@uloha('logistika.zpracovat_obsah', max_pokusu=3)
+def zpracovat_obsah(obsah_pk):
+    vytvorit_zmensene_verze(obsah_pk)
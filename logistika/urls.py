@@ -5,6 +5,7 @@ urlpatterns = [
     path('', views.dashboard, name='dashboard'),
     path('prepravy/', views.seznam_preprav, name='seznam_preprav'),
     path('prepravy/nova/', views.preprava_create, name='preprava_create'),
+    path('prepravy/import/', views.import_preprav, name='import_preprav'),
     path('prepravy/<int:pk>/', views.preprava_detail, name='preprava_detail'),
     path('prepravy/<int:pk>/podklady-pdf/', views.generovat_podklady_pdf, name='podklady_pdf'),
     path('prepravy/<int:pk>/upravit/', views.preprava_update, name='preprava_update'),
@@ -13,7 +14,16 @@ urlpatterns = [
     path('zakaznici/', views.seznam_zakazniku, name='seznam_zakazniku'),
     path('dopravci/', views.seznam_dopravcu, name='seznam_dopravcu'),
     path('prepravy/export/', views.export_aktivnich_preprav, name='export_preprav'),
+    path('prepravy/export-archiv/', views.export_preprav_soubor, name='export_preprav_soubor'),
+    path('partneri/export/', views.export_partneru, name='export_partneru'),
+    path('prepravy/podklady-zip/', views.podklady_zip, name='podklady_zip'),
+    path('prepravy/dokumenty-zip/', views.dokumenty_vybranych_zip, name='dokumenty_vybranych_zip'),
+    path('prepravy/<int:pk>/dokumenty-zip/', views.dokumenty_zip, name='dokumenty_zip'),
+    path('prepravy/<int:pk>/dokumenty/nahrat/zahajit/', views.dokument_nahrat_zahajit, name='dokument_nahrat_zahajit'),
+    path('prepravy/<int:pk>/dokumenty/nahrat/dokoncit/', views.dokument_nahrat_dokoncit, name='dokument_nahrat_dokoncit'),
+    path('prepravy/<int:pk>/dokumenty/nahrat/zrusit/', views.dokument_nahrat_zrusit, name='dokument_nahrat_zrusit'),
     path('dokument/<int:pk>/smazat/', views.dokument_delete, name='dokument_delete'),
     path('preprava/<int:pk>/smazat/', views.preprava_delete, name='preprava_delete'),
     path('svatky/', views.seznam_svatku, name='seznam_svatku'),
+    path('hledat/', views.hledani, name='hledani'),
 ]
@@ -1,157 +1,140 @@
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import FileResponse
+from django.urls import reverse
+from django.http import FileResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
 from django.conf import settings
+from django.utils.http import parse_etags
 from django.views.decorators.http import require_POST
-import io
-import os
-from reportlab.pdfgen import canvas
-from reportlab.lib.units import inch
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-
-# Registrace fontu podporujícího diakritiku
-font_path = os.path.join(settings.BASE_DIR, 'logistika', 'static', 'fonts', 'DejaVuSans.ttf')
-font_path_bold = os.path.join(settings.BASE_DIR, 'logistika', 'static', 'fonts', 'DejaVuSans-Bold.ttf')
-pdfmetrics.registerFont(TTFont('DejaVu', font_path))
-pdfmetrics.registerFont(TTFont('DejaVu-Bold', font_path_bold))
-from django.db.models import Count, Sum, F, ExpressionWrapper, DecimalField, Q
-from django.db.models.functions import Coalesce
+from django.db.models import F
+from django.db.models.functions import Substr
 from django.utils import timezone
-from datetime import timedelta
-from decimal import Decimal
 from .models import Preprava, Partner, Dokument, Holiday
-from .forms import PrepravaForm, PartnerForm, DopravceAssignForm, StavChangeForm, DokumentForm, PrepravaFilterForm
+from .kalendar import kalendar, upozorneni_k_terminum
+from .kurzy import marze_prepravy
+from .export import FORMATY, SLOUPCE_PARTNERU, SLOUPCE_PREPRAV, radky_partneru, radky_preprav
+from .import_preprav import POVINNE_SLOUPCE, ChybaImportu, cist_soubor, importovat
+from .dokumenty import soubory_do_archivu, ulozit_dokument
+from .nahravani import ChybaNahravani, dokoncit_nahravani, prime_nahravani_dostupne, zahajit_nahravani, zrusit_nahravani
+from .pagination import keyset_page
+from fronta.registr import posledni_uloha, zaradit
+from .podklady import data_podkladu, klic_podkladu, nacist_z_cache, nazev_souboru, podklady_prepravy, zip_proud
+from .statistiky import REALIZOVANE_STAVY, souhrn_dashboardu
+from .vyhledavani import VYSLEDKU_NA_HLEDANI, hledat, je_prefix_referencniho_cisla
+from .forms import PrepravaForm, PartnerForm, DopravceAssignForm, StavChangeForm, DokumentForm, PrepravaFilterForm, PrimeNahravaniForm, ImportPrepravForm, ImportRadekForm
 
 @login_required
 def dashboard(request):
-    # Původní statistiky stavů
-    nove = Preprava.objects.filter(stav='nova').count()
-    planovane = Preprava.objects.filter(stav='planovana').count()
-    probihajici = Preprava.objects.filter(stav='probiha').count()
-    k_fakturaci = Preprava.objects.filter(stav='fakturace').count()
+    # Počty podle stavů i marže za den/týden/měsíc jedním agregačním dotazem
+    context = souhrn_dashboardu()
 
     # Poslední realizované přepravy (od plánovaných dál)
-    realizovane_stavy = ['planovana', 'probiha', 'dokoncena', 'fakturace', 'uzavrena']
-    posledni_realizovane = Preprava.objects.filter(stav__in=realizovane_stavy).order_by('-datum_vytvoreni')[:10]
-
-    # Výpočty marží
-    now = timezone.now()
-    today = now.date()
-    start_of_week = today - timedelta(days=today.weekday())
-    start_of_month = today.replace(day=1)
-
-    def calculate_marze(queryset):
-        # Vytvoříme anotaci pro marži, ale pouze tam, kde jsou měny stejné
-        marze_query = queryset.filter(mena_zakaznik=F('mena_dopravce')).annotate(
-            hmotnost_t=ExpressionWrapper(
-                Coalesce(F('finalni_hmotnost_kg'), F('odhadovana_hmotnost_kg')) / 1000.0,
-                output_field=DecimalField()
-            )
-        ).annotate(
-            celkova_cena=F('hmotnost_t') * F('cena_za_tunu_zakaznik'),
-            celkovy_naklad=F('hmotnost_t') * F('naklad_za_tunu_dopravce')
-        ).annotate(
-            marze=F('celkova_cena') - F('celkovy_naklad')
-        )
-        # Sečteme marže pro CZK a EUR odděleně
-        marze_czk = marze_query.filter(mena_zakaznik='CZK').aggregate(total=Coalesce(Sum('marze'), Decimal('0.00')))['total']
-        marze_eur = marze_query.filter(mena_zakaznik='EUR').aggregate(total=Coalesce(Sum('marze'), Decimal('0.00')))['total']
-        return marze_czk, marze_eur
-
-    marze_den_czk, marze_den_eur = calculate_marze(Preprava.objects.filter(datum_vytvoreni__date=today, stav__in=realizovane_stavy))
-    marze_tyden_czk, marze_tyden_eur = calculate_marze(Preprava.objects.filter(datum_vytvoreni__date__gte=start_of_week, stav__in=realizovane_stavy))
-    marze_mesic_czk, marze_mesic_eur = calculate_marze(Preprava.objects.filter(datum_vytvoreni__date__gte=start_of_month, stav__in=realizovane_stavy))
+    posledni_realizovane = Preprava.objects.select_related('zakaznik').filter(stav__in=REALIZOVANE_STAVY).order_by('-datum_vytvoreni')[:10]
 
-    # Nejlepší zákazníci a dopravci
-    nejlepsi_zakaznici = Partner.objects.filter(prepravy_zakaznik__isnull=False).annotate(
-        pocet_preprav=Count('prepravy_zakaznik')
-    ).order_by('-pocet_preprav')[:5]
+    # Nejlepší zákazníci a dopravci z předpočítaných statistik (indexy na počtech)
+    nejlepsi_zakaznici = Partner.objects.filter(statistika__pocet_preprav_zakaznik__gt=0).annotate(
+        pocet_preprav=F('statistika__pocet_preprav_zakaznik')
+    ).order_by('-statistika__pocet_preprav_zakaznik')[:5]
 
-    nejlepsi_dopravci = Partner.objects.filter(prepravy_dopravce__isnull=False, prepravy_dopravce__stav__in=realizovane_stavy).annotate(
-        pocet_preprav=Count('prepravy_dopravce')
-    ).order_by('-pocet_preprav')[:5]
+    nejlepsi_dopravci = Partner.objects.filter(statistika__pocet_realizovanych_dopravce__gt=0).annotate(
+        pocet_preprav=F('statistika__pocet_realizovanych_dopravce')
+    ).order_by('-statistika__pocet_realizovanych_dopravce')[:5]
 
-    context = {
-        'nove': nove,
-        'planovane': planovane,
-        'probihajici': probihajici,
-        'k_fakturaci': k_fakturaci,
+    context.update({
         'posledni_realizovane': posledni_realizovane,
-        'marze_den_czk': marze_den_czk,
-        'marze_den_eur': marze_den_eur,
-        'marze_tyden_czk': marze_tyden_czk,
-        'marze_tyden_eur': marze_tyden_eur,
-        'marze_mesic_czk': marze_mesic_czk,
-        'marze_mesic_eur': marze_mesic_eur,
         'nejlepsi_zakaznici': nejlepsi_zakaznici,
         'nejlepsi_dopravci': nejlepsi_dopravci,
-    }
+    })
     return render(request, 'logistika/dashboard.html', context)
 
+# Počet znaků, na které se zkracují dlouhé textové sloupce v seznamu přeprav
+NAHLED_DELKA = 80
+PREPRAV_NA_STRANKU = 50
+
+
+def _odkaz_na_stranku(request, parametr, kurzor):
+    params = request.GET.copy()
+    params[parametr] = kurzor
+    return '?' + params.urlencode()
+
+
+def _prepravy_pro_seznam():
+    # Načítáme jen sloupce, které seznamy zobrazují; dlouhé texty jen jako zkrácený náhled
+    return Preprava.objects.select_related('zakaznik').only(
+        'referencni_cislo', 'datum_cas_nakladky', 'typ_vozidla', 'stav', 'datum_vytvoreni',
+        'zakaznik__nazev',
+    ).annotate(
+        misto_nakladky_nahled=Substr('misto_nakladky', 1, NAHLED_DELKA + 1),
+        misto_vykladky_nahled=Substr('misto_vykladky', 1, NAHLED_DELKA + 1),
+        popis_zbozi_nahled=Substr('popis_zbozi', 1, NAHLED_DELKA + 1),
+    )
+
+
 @login_required
 def seznam_preprav(request):
-    base_query = Preprava.objects.select_related('zakaznik').all()
+    base_query = _prepravy_pro_seznam()
     form = PrepravaFilterForm(request.GET)
 
     if form.is_valid():
-        if form.cleaned_data['referencni_cislo']:
-            base_query = base_query.filter(referencni_cislo__icontains=form.cleaned_data['referencni_cislo'])
-        if form.cleaned_data['zakaznik']:
-            base_query = base_query.filter(zakaznik=form.cleaned_data['zakaznik'])
-        if form.cleaned_data['stav']:
-            base_query = base_query.filter(stav=form.cleaned_data['stav'])
+        base_query = form.filtrovat(base_query)
 
     aktivni_stavy = ['nova', 'planovana', 'probiha']
     archivni_stavy = ['dokoncena', 'fakturace', 'uzavrena', 'neprodano']
 
-    aktivni_prepravy = base_query.filter(stav__in=aktivni_stavy).order_by('-datum_vytvoreni')
-    archivni_prepravy = base_query.filter(stav__in=archivni_stavy).order_by('-datum_vytvoreni')
+    aktivni_prepravy = keyset_page(base_query.filter(stav__in=aktivni_stavy), request.GET.get('aktivni'), PREPRAV_NA_STRANKU)
+    archivni_prepravy = keyset_page(base_query.filter(stav__in=archivni_stavy), request.GET.get('archiv'), PREPRAV_NA_STRANKU)
 
     context = {
         'form': form,
         'aktivni_prepravy': aktivni_prepravy,
-        'archivni_prepravy': archivni_prepravy
+        'archivni_prepravy': archivni_prepravy,
+        'nahled_delka': NAHLED_DELKA,
+        'aktivni_dalsi_url': _odkaz_na_stranku(request, 'aktivni', aktivni_prepravy.next_cursor) if aktivni_prepravy.has_next else None,
+        'aktivni_predchozi_url': _odkaz_na_stranku(request, 'aktivni', aktivni_prepravy.previous_cursor) if aktivni_prepravy.has_previous else None,
+        'archiv_dalsi_url': _odkaz_na_stranku(request, 'archiv', archivni_prepravy.next_cursor) if archivni_prepravy.has_next else None,
+        'archiv_predchozi_url': _odkaz_na_stranku(request, 'archiv', archivni_prepravy.previous_cursor) if archivni_prepravy.has_previous else None,
     }
     return render(request, 'logistika/seznam_preprav.html', context)
 
 @login_required
-def seznam_zakazniku(request):
+def hledani(request):
+    query = request.GET.get('q', '').strip()
+    if not query:
+        prepravy = Preprava.objects.none()
+    else:
+        prepravy = []
+        if je_prefix_referencniho_cisla(query):
+            # Začátek referenčního čísla hledáme přímo v unikátním indexu
+            prepravy = list(_prepravy_pro_seznam().filter(referencni_cislo__startswith=query.upper()).order_by('referencni_cislo')[:VYSLEDKU_NA_HLEDANI])
+        if not prepravy:
+            # Nic nenalezeno (nebo nejde o referenční číslo), zkusíme fulltext
+            prepravy = hledat(_prepravy_pro_seznam(), query, razeni=('-datum_vytvoreni',))
+    context = {
+        'prepravy': prepravy,
+        'search_query': query,
+        'nahled_delka': NAHLED_DELKA,
+        'limit': VYSLEDKU_NA_HLEDANI,
+    }
+    return render(request, 'logistika/hledani.html', context)
+
+def _seznam_partneru(request, typy, nadpis, typ_exportu):
     query = request.GET.get('q')
-    zakaznici = Partner.objects.filter(typ_partnera__in=['zakaznik', 'zakaznik_dopravce'])
+    partneri = Partner.objects.filter(typ_partnera__in=typy).select_related('statistika')
 
     if query:
-        zakaznici = zakaznici.filter(
-            Q(nazev__icontains=query) |
-            Q(ic__icontains=query) |
-            Q(dic__icontains=query) |
-            Q(kontaktni_osoba__icontains=query) |
-            Q(email__icontains=query) |
-            Q(telefon__icontains=query)
-        ).distinct()
-
-    zakaznici = zakaznici.order_by('nazev')
-    return render(request, 'logistika/seznam_partneru.html', {'partneri': zakaznici, 'typ': 'Zákazníci', 'search_query': query})
+        # Seřazeno podle relevance a omezeno na VYSLEDKU_NA_HLEDANI záznamů
+        partneri = hledat(partneri, query, razeni=('nazev',))
+    else:
+        partneri = partneri.order_by('nazev')
+    return render(request, 'logistika/seznam_partneru.html', {'partneri': partneri, 'typ': nadpis, 'typ_exportu': typ_exportu, 'search_query': query})
 
 @login_required
-def seznam_dopravcu(request):
-    query = request.GET.get('q')
-    dopravci = Partner.objects.filter(typ_partnera__in=['dopravce', 'zakaznik_dopravce'])
+def seznam_zakazniku(request):
+    return _seznam_partneru(request, ['zakaznik', 'zakaznik_dopravce'], 'Zákazníci', 'zakaznici')
 
-    if query:
-        dopravci = dopravci.filter(
-            Q(nazev__icontains=query) |
-            Q(ic__icontains=query) |
-            Q(dic__icontains=query) |
-            Q(kontaktni_osoba__icontains=query) |
-            Q(email__icontains=query) |
-            Q(telefon__icontains=query)
-        ).distinct()
-
-    dopravci = dopravci.order_by('nazev')
-    return render(request, 'logistika/seznam_partneru.html', {'partneri': dopravci, 'typ': 'Dopravci', 'search_query': query})
+@login_required
+def seznam_dopravcu(request):
+    return _seznam_partneru(request, ['dopravce', 'zakaznik_dopravce'], 'Dopravci', 'dopravci')
 
 @login_required
 def preprava_detail(request, pk):
@@ -180,7 +163,7 @@ def preprava_detail(request, pk):
         if dokument_form.is_valid():
             dokument = dokument_form.save(commit=False)
             dokument.preprava = preprava
-            dokument.save()
+            ulozit_dokument(dokument, dokument_form.cleaned_data['soubor'])
             messages.success(request, f'Dokument "{dokument.nazev}" byl úspěšně nahrán.')
             return redirect('preprava_detail', pk=pk)
     else:
@@ -191,9 +174,52 @@ def preprava_detail(request, pk):
         'dopravce_form': dopravce_form,
         'stav_form': stav_form,
         'dokument_form': dokument_form,
+        'dokumenty': preprava.dokumenty.select_related('obsah'),
+        'prime_nahravani': prime_nahravani_dostupne(),
+        'upozorneni_k_terminum': upozorneni_k_terminum(preprava.datum_nakladky, preprava.datum_vykladky),
     }
+    if preprava.datum_nakladky and preprava.datum_vykladky:
+        context['pracovnich_dnu'] = kalendar().pocet_pracovnich_dnu(preprava.datum_nakladky, preprava.datum_vykladky)
+    if preprava.marze is None:
+        context['marze_vykazna'] = marze_prepravy(preprava)
+        context['mena_vykazu'] = settings.MENA_VYKAZU
     return render(request, 'logistika/preprava_detail.html', context)
 
+@login_required
+@require_POST
+def dokument_nahrat_zahajit(request, pk):
+    preprava = get_object_or_404(Preprava, pk=pk)
+    if not prime_nahravani_dostupne():
+        return JsonResponse({'chyba': 'Úložiště nepodporuje přímé nahrávání.'}, status=400)
+    form = PrimeNahravaniForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse({'chyba': form.errors.as_text()}, status=400)
+    d = form.cleaned_data
+    return JsonResponse(zahajit_nahravani(
+        preprava, d['nazev'], d['nazev_souboru'], d['velikost'], d['content_type'],
+    ))
+
+@login_required
+@require_POST
+def dokument_nahrat_dokoncit(request, pk):
+    preprava = get_object_or_404(Preprava, pk=pk)
+    try:
+        dokument = dokoncit_nahravani(preprava, request.POST.get('token', ''), request.POST.getlist('casti'))
+    except ChybaNahravani as e:
+        return JsonResponse({'chyba': str(e)}, status=400)
+    messages.success(request, f'Dokument "{dokument.nazev}" byl úspěšně nahrán.')
+    return JsonResponse({'presmerovat': reverse('preprava_detail', args=[preprava.pk])})
+
+@login_required
+@require_POST
+def dokument_nahrat_zrusit(request, pk):
+    preprava = get_object_or_404(Preprava, pk=pk)
+    try:
+        zrusit_nahravani(preprava, request.POST.get('token', ''))
+    except ChybaNahravani as e:
+        return JsonResponse({'chyba': str(e)}, status=400)
+    return JsonResponse({})
+
 @login_required
 def preprava_create(request):
     if request.method == 'POST':
@@ -201,11 +227,41 @@ def preprava_create(request):
         if form.is_valid():
             preprava = form.save()
             messages.success(request, f'Přeprava {preprava.referencni_cislo} byla úspěšně vytvořena.')
+            for text in upozorneni_k_terminum(preprava.datum_nakladky, preprava.datum_vykladky):
+                messages.warning(request, text)
             return redirect('seznam_preprav')
     else:
         form = PrepravaForm()
     return render(request, 'logistika/preprava_form.html', {'form': form, 'title': 'Vytvořit novou přepravu'})
 
+# Kolik chybných řádků importu se vypíše na stránce
+ZOBRAZIT_CHYB_IMPORTU = 500
+
+@login_required
+def import_preprav(request):
+    vysledek = None
+    if request.method == 'POST':
+        form = ImportPrepravForm(request.POST, request.FILES)
+        if form.is_valid():
+            soubor = form.cleaned_data['soubor']
+            try:
+                vysledek = importovat(cist_soubor(soubor, soubor.name), jen_kontrola=form.cleaned_data['jen_kontrola'])
+            except ChybaImportu as e:
+                form.add_error('soubor', str(e))
+            else:
+                if vysledek.vlozeno:
+                    messages.success(request, f'Naimportováno {vysledek.vlozeno} přeprav.')
+    else:
+        form = ImportPrepravForm()
+    context = {
+        'form': form,
+        'vysledek': vysledek,
+        'chyby': vysledek.chyby[:ZOBRAZIT_CHYB_IMPORTU] if vysledek else [],
+        'povinne_sloupce': POVINNE_SLOUPCE,
+        'volitelne_sloupce': [nazev for nazev in ImportRadekForm.base_fields if nazev not in POVINNE_SLOUPCE],
+    }
+    return render(request, 'logistika/import_preprav.html', context)
+
 @login_required
 def preprava_update(request, pk):
     preprava = get_object_or_404(Preprava, pk=pk)
@@ -214,95 +270,108 @@ def preprava_update(request, pk):
         if form.is_valid():
             form.save()
             messages.success(request, f'Přeprava {preprava.referencni_cislo} byla úspěšně upravena.')
+            for text in upozorneni_k_terminum(preprava.datum_nakladky, preprava.datum_vykladky):
+                messages.warning(request, text)
             return redirect('preprava_detail', pk=preprava.pk)
     else:
         form = PrepravaForm(instance=preprava)
     return render(request, 'logistika/preprava_form.html', {'form': form, 'title': f'Upravit přepravu {preprava.referencni_cislo}'})
 
+# Stránka s čekáním na PDF se obnovuje s rostoucím odkladem, po posledním pokusu přestane
+ODKLAD_OBNOVENI_PODKLADU = 2
+MAX_ODKLAD_OBNOVENI_PODKLADU = 30
+MAX_OBNOVENI_PODKLADU = 15
+
 @login_required
 def generovat_podklady_pdf(request, pk):
     preprava = get_object_or_404(Preprava.objects.select_related('zakaznik', 'dopravce'), pk=pk)
-    buf = io.BytesIO()
-    c = canvas.Canvas(buf, pagesize=letter)
-    c.setFont('DejaVu', 10)
-
-    # Výška stránky
-    height = letter[1]
-
-    # --- Helper funkce pro kreslení --- #
-    def draw_section(title, data, y_start):
-        c.setFont("DejaVu-Bold", 16)
-        c.drawString(inch, y_start, title)
-        c.line(inch, y_start - 5, letter[0] - inch, y_start - 5)
-        y = y_start - 30
-        c.setFont("DejaVu", 10)
-        line_height = 15
-        for key, value in data.items():
-            c.drawString(inch, y, f"{key}:")
-            
-            # Zpracování víceřádkového textu
-            lines = str(value).splitlines()
-            if not lines:
-                lines = ['-'] # Zobrazí pomlčku, pokud je hodnota prázdná
-
-            # Vykreslení prvního řádku na stejné úrovni jako klíč
-            c.drawString(inch * 3, y, lines[0])
-            
-            # Vykreslení dalších řádků pod sebou
-            for i, line in enumerate(lines[1:]):
-                y -= line_height
-                c.drawString(inch * 3, y, line)
-
-            y -= line_height
-        return y + line_height # Vrátí pozici pro další sekci
-
-    # --- Titulek --- #
-    c.setFont("DejaVu-Bold", 18)
-    c.drawCentredString(letter[0] / 2, 1 * inch, f"Podklady pro přepravu {preprava.referencni_cislo}")
-
-    y_position = height - 1.5 * inch
-
-    # --- Detaily přepravy (společné) --- #
-    preprava_data = {
-        "Místo nakládky": preprava.misto_nakladky,
-        "Datum a čas nakládky": preprava.datum_cas_nakladky,
-        "Místo vykládky": preprava.misto_vykladky,
-        "Datum a čas vykládky": preprava.datum_cas_vykladky,
-        "Zboží": preprava.popis_zbozi,
-        "Typ vozidla": preprava.get_typ_vozidla_display(),
-        "Odhadovaná hmotnost": f"{preprava.odhadovana_hmotnost_kg} kg",
-        "Finální hmotnost": f"{preprava.finalni_hmotnost_kg} kg" if preprava.finalni_hmotnost_kg else "-",
-    }
-    y_position = draw_section("Informace o přepravě", preprava_data, y_position)
-
-    # --- Podklady pro objednávku dopravci --- #
-    dopravce_data = {
-        "Dopravce": preprava.dopravce.nazev if preprava.dopravce else "NEPŘIŘAZEN",
-        "Kontaktní osoba": preprava.dopravce.kontaktni_osoba if preprava.dopravce else "-",
-        "Telefon": preprava.dopravce.telefon if preprava.dopravce else "-",
-        "E-mail": preprava.dopravce.email if preprava.dopravce else "-",
-        "Náklad za tunu": f"{preprava.naklad_za_tunu_dopravce} {preprava.get_mena_dopravce_display()}" if preprava.naklad_za_tunu_dopravce else "-",
-        "Celkový náklad": f"{preprava.celkovy_naklad_dopravce} {preprava.get_mena_dopravce_display()}" if preprava.celkovy_naklad_dopravce else "-",
-    }
-    y_position = draw_section("Podklady pro objednávku dopravci", dopravce_data, y_position - 0.5 * inch)
-
-    # --- Podklady pro fakturaci zákazníkovi --- #
-    zakaznik_data = {
-        "Zákazník": preprava.zakaznik.nazev,
-        "IČ": preprava.zakaznik.ic,
-        "DIČ": preprava.zakaznik.dic,
-        "Fakturační údaje": preprava.zakaznik.fakturacni_udaje or preprava.zakaznik.adresa,
-        "Splatnost faktur (dní)": preprava.zakaznik.splatnost_faktur_dny or "-",
-        "Cena za tunu": f"{preprava.cena_za_tunu_zakaznik} {preprava.get_mena_zakaznik_display()}",
-        "Celková cena": f"{preprava.celkova_cena_zakaznik} {preprava.get_mena_zakaznik_display()}",
-    }
-    draw_section("Podklady pro fakturaci zákazníkovi", zakaznik_data, y_position - 0.5 * inch)
+    data = data_podkladu(preprava)
+    klic = klic_podkladu(data)
+    etag = f'"{klic}"'
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+    else:
+        soubor = nacist_z_cache(preprava.pk, klic)
+        if soubor is None:
+            # Po změně přepravy se zařadí nová úloha, stará chyba ani běh na ni nemají vliv
+            klic_ulohy = f'podklady:{preprava.pk}:{klic}'
+            posledni = posledni_uloha(klic_ulohy)
+            if request.method != 'POST' and posledni is not None and posledni.stav == posledni.CHYBA:
+                # Opakované zařazení by jen znovu selhalo, uživatel ho může vyvolat tlačítkem
+                return render(request, 'logistika/podklady_pripravuji.html', {'preprava': preprava, 'chyba': True})
+            zaradit('logistika.vykreslit_podklady', klic=klic_ulohy, preprava_pk=preprava.pk)
+            if request.method == 'POST':
+                return redirect('podklady_pdf', pk=preprava.pk)
+            # Při synchronní frontě je PDF už vykreslené
+            soubor = nacist_z_cache(preprava.pk, klic)
+        if soubor is None:
+            try:
+                pokus = max(int(request.GET.get('pokus', 0)), 0)
+            except ValueError:
+                pokus = 0
+            context = {'preprava': preprava}
+            if pokus < MAX_OBNOVENI_PODKLADU:
+                context['dalsi_pokus'] = pokus + 1
+                context['odklad_ms'] = int(1000 * min(ODKLAD_OBNOVENI_PODKLADU * 1.5 ** pokus, MAX_ODKLAD_OBNOVENI_PODKLADU))
+            return render(request, 'logistika/podklady_pripravuji.html', context, status=202)
+        response = FileResponse(soubor, as_attachment=True, filename=nazev_souboru(data), content_type='application/pdf')
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+# Víc podkladů najednou se v požadavku negeneruje, větší dávky řeší příkaz generate_podklady
+MAX_PODKLADU_V_ZIPU = 500
 
-    c.showPage()
-    c.save()
-    buf.seek(0)
+@login_required
+def podklady_zip(request):
+    # Hromadné podklady pro přepravy vybrané stejným filtrem jako v seznamu přeprav
+    form = PrepravaFilterForm(request.GET)
+    seznam = f"{reverse('seznam_preprav')}?{request.GET.urlencode()}"
+    if not form.is_valid():
+        messages.error(request, 'Neplatný filtr pro hromadné podklady.')
+        return redirect(seznam)
+    if not any(form.cleaned_data.values()):
+        messages.error(request, 'Pro hromadné podklady vyberte přepravy filtrem, např. podle data nakládky.')
+        return redirect(seznam)
+    prepravy = form.filtrovat(Preprava.objects.select_related('zakaznik', 'dopravce')).order_by('pk')
+    pocet = prepravy.count()
+    if pocet > MAX_PODKLADU_V_ZIPU:
+        messages.error(
+            request,
+            f'Filtru odpovídá {pocet} přeprav, najednou lze stáhnout nejvýše {MAX_PODKLADU_V_ZIPU}. '
+            'Zužte filtr, nebo větší dávku vygenerujte příkazem manage.py generate_podklady.',
+        )
+        return redirect(seznam)
+    soubory = podklady_prepravy(prepravy.iterator(chunk_size=200), workers=settings.PODKLADY_PDF_WORKERS)
+    response = StreamingHttpResponse(zip_proud(soubory), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="podklady_{timezone.now():%Y%m%d_%H%M}.zip"'
+    return response
 
-    return FileResponse(buf, as_attachment=True, filename=f'podklady_{preprava.referencni_cislo}.pdf')
+@login_required
+def dokumenty_zip(request, pk):
+    preprava = get_object_or_404(Preprava, pk=pk)
+    dokumenty = preprava.dokumenty.only('nazev', 'soubor').order_by('datum_nahrani', 'pk')
+    response = StreamingHttpResponse(zip_proud(soubory_do_archivu(dokumenty.iterator())), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="dokumenty_{preprava.referencni_cislo}.zip"'
+    return response
+
+@login_required
+def dokumenty_vybranych_zip(request):
+    # Dokumenty přeprav vybraných stejným filtrem jako v seznamu přeprav, po složkách podle přepravy
+    form = PrepravaFilterForm(request.GET)
+    if not form.is_valid():
+        messages.error(request, 'Neplatný filtr pro hromadné stažení dokumentů.')
+        return redirect('seznam_preprav')
+    dokumenty = (
+        Dokument.objects.filter(preprava__in=form.filtrovat(Preprava.objects.all()).values('pk'))
+        .select_related('preprava')
+        .only('nazev', 'soubor', 'preprava__referencni_cislo')
+        .order_by('preprava__referencni_cislo', 'datum_nahrani', 'pk')
+    )
+    soubory = soubory_do_archivu(dokumenty.iterator(chunk_size=200), slozka_podle_prepravy=True)
+    response = StreamingHttpResponse(zip_proud(soubory), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="dokumenty_{timezone.now():%Y%m%d_%H%M}.zip"'
+    return response
 
 @login_required
 def partner_update(request, pk):
@@ -322,19 +391,50 @@ def partner_update(request, pk):
 
 @login_required
 def export_aktivnich_preprav(request):
-    volne_prepravy = Preprava.objects.filter(stav='nova').order_by('datum_cas_nakladky')
+    volne_prepravy = Preprava.objects.filter(stav='nova').order_by(
+        F('datum_nakladky').asc(nulls_last=True), F('cas_nakladky_od').asc(nulls_last=True), 'datum_cas_nakladky'
+    )
     context = {
         'prepravy': volne_prepravy
     }
     return render(request, 'logistika/export_preprav.html', context)
 
+def _odpoved_exportu(format_, hlavicka, radky, nazev):
+    content_type, proud = FORMATY[format_]
+    response = StreamingHttpResponse(proud(hlavicka, radky), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{nazev}_{timezone.now():%Y%m%d_%H%M}.{format_}"'
+    return response
+
+@login_required
+def export_preprav_soubor(request):
+    # Archiv přeprav vybraných stejným filtrem jako v seznamu přeprav, včetně cen a marže
+    form = PrepravaFilterForm(request.GET)
+    format_ = request.GET.get('format', 'csv')
+    if not form.is_valid() or format_ not in FORMATY:
+        messages.error(request, 'Neplatný filtr nebo formát exportu.')
+        return redirect('seznam_preprav')
+    prepravy = form.filtrovat(Preprava.objects.all())
+    return _odpoved_exportu(format_, SLOUPCE_PREPRAV, radky_preprav(prepravy), 'prepravy')
+
+@login_required
+def export_partneru(request):
+    format_ = request.GET.get('format', 'csv')
+    typy = {'zakaznici': ['zakaznik', 'zakaznik_dopravce'], 'dopravci': ['dopravce', 'zakaznik_dopravce']}
+    if format_ not in FORMATY:
+        messages.error(request, 'Neplatný formát exportu.')
+        return redirect('dashboard')
+    partneri = Partner.objects.all()
+    typ = request.GET.get('typ')
+    if typ in typy:
+        partneri = partneri.filter(typ_partnera__in=typy[typ])
+    return _odpoved_exportu(format_, SLOUPCE_PARTNERU, radky_partneru(partneri), typ or 'partneri')
+
 @login_required
 @require_POST
 def dokument_delete(request, pk):
     dokument = get_object_or_404(Dokument, pk=pk)
-    preprava_pk = dokument.preprava.pk
-    dokument.soubor.delete(save=False) # Smaže soubor
-    dokument.delete() # Smaže záznam z DB
+    preprava_pk = dokument.preprava_id
+    dokument.delete() # Soubor smaže worker, až na něj nebude odkazovat žádný dokument
     messages.success(request, f'Dokument "{dokument.nazev}" byl úspěšně smazán.')
     return redirect('preprava_detail', pk=preprava_pk)
 
@@ -0,0 +1,130 @@
+"""
+Fulltextové vyhledávání nad modely se sloupcem `hledaci_text`.
+
+Sloupec obsahuje normalizovaný text (malá písmena bez diakritiky), takže
+"dvorak" najde "Dvořák". Na PostgreSQL nad ním stojí GIN index s trigramy
+(pg_trgm), na SQLite pomocná FTS5 tabulka `<db_table>_fts` s trigramovým
+tokenizerem, kterou udržují signály v logistika.signals.
+"""
+import re
+import unicodedata
+
+from django.db import connection
+from django.db.models import F, FloatField, Func, Value
+from django.db.models.expressions import RawSQL
+
+VYSLEDKU_NA_HLEDANI = 50
+
+# Trigramový index umí hledat jen výrazy o délce alespoň tři znaky
+MIN_DELKA_VYRAZU = 3
+
+# Začátek referenčního čísla přepravy, např. "JAFA-2026-01" (viz Preprava.format_referencni_cislo).
+# Obecnější vzor by zachytil i PSČ jako "D-80331" nebo "CZ-110".
+_PREFIX_REFERENCNIHO_CISLA = re.compile(r'^JAFA-\d[\d-]*$', re.IGNORECASE)
+
+
+def je_prefix_referencniho_cisla(dotaz):
+    return bool(_PREFIX_REFERENCNIHO_CISLA.match((dotaz or '').strip()))
+
+
+def normalizovat_text(text):
+    rozlozeny = unicodedata.normalize('NFKD', text or '')
+    return ''.join(znak for znak in rozlozeny if not unicodedata.combining(znak)).casefold()
+
+
+def sestavit_hledaci_text(*hodnoty):
+    return normalizovat_text(' '.join(str(h) for h in hodnoty if h))
+
+
+def fts_tabulka(model):
+    return f'{model._meta.db_table}_fts'
+
+
+def vyfiltrovat(queryset, dotaz):
+    """
+    Vyfiltruje queryset na záznamy, jejichž hledaci_text obsahuje všechny výrazy dotazu.
+
+    Výsledek nese anotaci `relevance` (vyšší = lepší shoda), ale není seřazený.
+    """
+    vyrazy = normalizovat_text(dotaz).split()
+    if not vyrazy:
+        return queryset.none()
+
+    if connection.vendor == 'sqlite':
+        return _hledat_sqlite(queryset, vyrazy)
+
+    for vyraz in vyrazy:
+        queryset = queryset.filter(hledaci_text__contains=vyraz)
+    if connection.vendor == 'postgresql':
+        relevance = Func(Value(' '.join(vyrazy)), F('hledaci_text'), function='word_similarity', output_field=FloatField())
+    else:
+        relevance = Value(0.0, output_field=FloatField())
+    return queryset.annotate(relevance=relevance)
+
+
+def hledat(queryset, dotaz, razeni=('pk',), limit=VYSLEDKU_NA_HLEDANI):
+    """
+    Vrátí nejvýše `limit` záznamů odpovídajících dotazu, seřazených podle relevance.
+
+    Při shodné relevanci rozhoduje `razeni`.
+    """
+    return vyfiltrovat(queryset, dotaz).order_by('-relevance', *razeni)[:limit]
+
+
+def _hledat_sqlite(queryset, vyrazy):
+    tabulka = fts_tabulka(queryset.model)
+    db_table = queryset.model._meta.db_table
+    dlouhe = [v for v in vyrazy if len(v) >= MIN_DELKA_VYRAZU]
+    for vyraz in vyrazy:
+        if len(vyraz) < MIN_DELKA_VYRAZU:
+            queryset = queryset.filter(hledaci_text__contains=vyraz)
+    if not dlouhe:
+        return queryset.annotate(relevance=Value(0.0, output_field=FloatField()))
+
+    match = ' AND '.join('"%s"' % v.replace('"', '""') for v in dlouhe)
+    return queryset.filter(
+        pk__in=RawSQL(f'SELECT rowid FROM {tabulka} WHERE {tabulka} MATCH %s', [match])
+    ).annotate(relevance=RawSQL(
+        f'SELECT -rank FROM {tabulka} WHERE {tabulka} MATCH %s AND rowid = {db_table}.id',
+        [match],
+        output_field=FloatField(),
+    ))
+
+
+def aktualizovat_index(instance):
+    """Promítne hledaci_text záznamu do FTS tabulky (jen SQLite, PostgreSQL indexuje sloupec přímo)."""
+    if connection.vendor != 'sqlite':
+        return
+    tabulka = fts_tabulka(type(instance))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {tabulka} WHERE rowid = %s', [instance.pk])
+        cursor.execute(f'INSERT INTO {tabulka} (rowid, hledaci_text) VALUES (%s, %s)', [instance.pk, instance.hledaci_text])
+
+
+def pridat_do_indexu(instances):
+    """Vloží do FTS tabulky nově vytvořené záznamy jedním dávkovým příkazem (jen SQLite)."""
+    if connection.vendor != 'sqlite' or not instances:
+        return
+    tabulka = fts_tabulka(type(instances[0]))
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {tabulka} (rowid, hledaci_text) VALUES (%s, %s)',
+            [(instance.pk, instance.hledaci_text) for instance in instances],
+        )
+
+
+def odstranit_z_indexu(instance):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {fts_tabulka(type(instance))} WHERE rowid = %s', [instance.pk])
+
+
+def prebudovat_index(model):
+    """Znovu naplní FTS tabulku modelu ze sloupce hledaci_text (jen SQLite)."""
+    if connection.vendor != 'sqlite':
+        return
+    tabulka = fts_tabulka(model)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {tabulka}')
+        cursor.execute(f'INSERT INTO {tabulka} (rowid, hledaci_text) SELECT id, hledaci_text FROM {model._meta.db_table}')
@@ -50,6 +50,7 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
 
     'logistika',
+    'fronta',
     'crispy_forms',
     'storages', # Přidáno pro django-storages
 ]
@@ -133,6 +134,12 @@ LANGUAGE_CODE = 'en-us'
 
 TIME_ZONE = 'UTC'
 
+# Časové pásmo, ve kterém se počítají hranice dnů/týdnů/měsíců pro přehledy
+BUSINESS_TIME_ZONE = 'Europe/Prague'
+
+# Měna, do které se přepočítávají marže přeprav s různou měnou zákazníka a dopravce (kurzy ČNB)
+MENA_VYKAZU = os.environ.get('MENA_VYKAZU', 'CZK')
+
 USE_I18N = True
 
 USE_TZ = True
@@ -152,16 +159,23 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 # Konfigurace WhiteNoise
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
-# Nastavení pro AWS S3 (použije se pouze v produkci na Renderu)
-if 'RENDER' in os.environ:
+# S3 kompatibilní úložiště mimo AWS (např. MinIO nebo moto_server pro lokální testování)
+AWS_S3_ENDPOINT_URL = os.environ.get('AWS_S3_ENDPOINT_URL')
+
+# Nastavení pro AWS S3 (použije se v produkci na Renderu, lokálně při zadaném AWS_S3_ENDPOINT_URL)
+if 'RENDER' in os.environ or AWS_S3_ENDPOINT_URL:
     # Nastavení pro ukládání médií na S3
     DEFAULT_FILE_STORAGE = 'storages.backends.s3boto3.S3Boto3Storage'
     AWS_STORAGE_BUCKET_NAME = os.environ.get('AWS_STORAGE_BUCKET_NAME')
     AWS_S3_REGION_NAME = os.environ.get('AWS_S3_REGION_NAME')
     AWS_ACCESS_KEY_ID = os.environ.get('AWS_ACCESS_KEY_ID')
     AWS_SECRET_ACCESS_KEY = os.environ.get('AWS_SECRET_ACCESS_KEY')
-    AWS_S3_CUSTOM_DOMAIN = f'{AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com'
+    AWS_S3_CUSTOM_DOMAIN = None if AWS_S3_ENDPOINT_URL else f'{AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com'
     AWS_S3_FILE_OVERWRITE = False
+    # Presigned URL pro přímé nahrávání z prohlížeče (logistika.nahravani)
+    AWS_S3_SIGNATURE_VERSION = 's3v4'
+    if AWS_S3_ENDPOINT_URL:
+        AWS_S3_ADDRESSING_STYLE = 'path'
 
 
 if 'RENDER' in os.environ:
@@ -179,5 +193,14 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 CRISPY_TEMPLATE_PACK = 'bootstrap5'
 
+# Počet procesů pro hromadné generování PDF podkladů
+PODKLADY_PDF_WORKERS = int(os.environ.get('PODKLADY_PDF_WORKERS', 2))
+
+# Fronta úloh na pozadí (aplikace fronta, worker: manage.py run_worker).
+# Bez běžícího workeru (lokální vývoj) se úlohy spouští hned po commitu.
+FRONTA_SYNCHRONNE = os.environ.get('FRONTA_SYNCHRONNE', str('RENDER' not in os.environ)).lower() == 'true'
+FRONTA_WORKERS = int(os.environ.get('FRONTA_WORKERS', 2))
+FRONTA_UCHOVAT_HOTOVE_DNI = 7
+
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/accounts/login/'